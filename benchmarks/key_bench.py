@@ -0,0 +1,81 @@
+# key_bench.py - Game Mode key output: what reaches the OS per frame
+#
+# First checks KeyState against the in-memory backend on a scripted run of
+# frames (hold gas, steer, let go...): only transitions may be sent, releases
+# before presses, one batch per frame that changed and none for a frame that
+# did not. Any difference stops the script with the frame that broke it.
+#
+# Then, given a trace, replays it through Game Mode and compares the OS calls
+# of the old per-frame churn (release all five keys, press the held ones)
+# with the batched transitions:
+#
+#   python benchmarks/key_bench.py session.trace
+
+import argparse
+import os
+
+from pipeline_bench import load_mode
+from common.trace import TraceReplay
+
+SCRIPT = [
+    # (keys held this frame, batch expected at flush; None = no OS call)
+    ({"W"},      [("W", True)]),
+    ({"W"},      None),
+    ({"W", "A"}, [("A", True)]),
+    ({"W", "D"}, [("A", False), ("D", True)]),
+    ({"S", "D"}, [("W", False), ("S", True)]),
+    ({"S", "D"}, None),
+    (set(),      [("S", False), ("D", False)]),      # codes ascending within releases / presses
+    (set(),      None),
+]
+
+
+def check_transitions(gamekeys, codes):
+    backend = gamekeys.RecordingBackend()
+    keys = gamekeys.KeyState(backend)
+    for frame, (held, expected) in enumerate(SCRIPT):
+        sent = len(backend.batches)
+        keys.begin()
+        for name in held:
+            keys.hold(codes[name])
+        keys.flush()
+        got = backend.batches[sent:]
+        want = [] if expected is None else [[(codes[name], down) for name, down in expected]]
+        if got != want:
+            raise SystemExit(f"frame {frame} holding {sorted(held)}: sent {got}, expected {want}")
+    print(f"  transitions: {len(SCRIPT)} frames, {keys.flushes} batches, {keys.transitions} key events - ok")
+
+
+def compare(path, nitro):
+    mode = load_mode("game", load_model=False)
+    keys = mode.keys
+    churn = 0
+    replay = TraceReplay(path)
+    for t, landmarks, labels, scores in replay:
+        mode.decide(mode.load_hands(landmarks, labels, scores, replay.width, replay.height, t), t)
+        # Before: every key released, every held key pressed, nitro pressed and released
+        churn += 5 + len(keys.down) + (nitro in keys.down)
+    mode.close()
+    frames = len(replay)
+    print(f"\n{os.path.basename(path)}: {frames} frames")
+    print(f"  {'':<12}{'OS calls':>10}{'per frame':>11}")
+    print(f"  {'churn':<12}{churn:>10}{churn / frames:>11.2f}")
+    print(f"  {'batched':<12}{keys.flushes:>10}{keys.flushes / frames:>11.2f}"
+          f"   ({keys.transitions} key events)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check and measure Game Mode key output")
+    parser.add_argument("trace", nargs="?", help="Landmark trace to replay through Game Mode")
+    args = parser.parse_args()
+
+    load_mode("game", load_model=False)   # puts game_mode on the path
+    import gamekeys
+    from gamedirectkeys import W, A, S, D, SPACE
+    check_transitions(gamekeys, {"W": W, "A": A, "S": S, "D": D})
+    if args.trace:
+        compare(args.trace, SPACE)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+# motion_bench.py - Per-frame cost of common.motion as templates are added
+#
+# Drives LandmarkHistory + MotionRecognizer with synthetic hands (a wandering
+# hand with a swipe every couple of seconds) and times update() with 1, 4,
+# 16... active templates. Every template beyond the built-in ones is a random
+# direction sequence, so the work per template is the same as a real one.
+# Reports p50 / p95 microseconds per frame and the cost relative to the
+# smallest library; with all templates in one array the per-frame cost
+# should stay nearly flat until the arrays themselves get large.
+#
+#   python benchmarks/motion_bench.py --templates 1 4 16 64 256 --hands 2
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from common.history import LandmarkHistory
+from common.motion import LENGTH, MotionRecognizer, Template, TEMPLATES
+
+FPS = 30
+
+
+def library(count, rng):
+    """count templates: the built-in ones first, then random direction sequences."""
+    templates = list(TEMPLATES[:count])
+    for n in range(len(templates), count):
+        angles = np.cumsum(rng.normal(0, 0.4, LENGTH)) + rng.uniform(0, 2 * np.pi)
+        templates.append(Template(f"random_{n}", np.stack([np.cos(angles), np.sin(angles)], axis=1)))
+    return templates
+
+
+def synthetic_hands(frames, hands, rng):
+    """(frames, hands, 21, 3) pixel landmarks: a drifting hand that swipes every 2 s."""
+    hand = np.zeros((21, 3), dtype=np.float32)
+    hand[:, :2] = rng.normal(0, 30, (21, 2))
+    hand[0, :2] = (0, 0)
+    hand[9, :2] = (0, -80)                                     # wrist -> middle MCP, one hand length
+    paths = np.cumsum(rng.normal(0, 3, (frames, hands, 2)), axis=0) + (320, 240)
+    swipe = (1 - np.cos(np.linspace(0, np.pi, 10))) / 2 * 300
+    for start in range(30, frames - 10, 2 * FPS):
+        paths[start:start + 10, :, 0] -= swipe[:, None]
+        paths[start + 10:, :, 0] -= 300
+    out = np.repeat(hand[None, None], frames, axis=0).repeat(hands, axis=1)
+    out[..., :2] += paths[:, :, None, :]
+    return out
+
+
+def run(count, frames, hands, rng):
+    history = LandmarkHistory()
+    recognizer = MotionRecognizer(history, templates=library(count, rng))
+    matches = []
+    recognizer.subscribe(matches.append)
+    keys = ["Left", "Right", "Left#1", "Right#1"][:hands]
+    landmarks = synthetic_hands(frames, hands, rng)
+    times = np.empty(frames)
+    for i in range(frames):
+        history.push(landmarks[i], keys, i / FPS)
+        t = time.perf_counter()
+        recognizer.update()
+        times[i] = time.perf_counter() - t
+    times = times[FPS:] * 1e6                                   # skip warm-up
+    return np.percentile(times, 50), np.percentile(times, 95), len(matches)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Motion recognizer cost per frame vs template count")
+    parser.add_argument("--templates", type=int, nargs="+", default=[1, 4, 16, 64, 256])
+    parser.add_argument("--hands", type=int, default=2, choices=[1, 2, 3, 4])
+    parser.add_argument("--seconds", type=float, default=60.0, help="Synthetic frames per run, in seconds")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    frames = int(args.seconds * FPS)
+    print(f"\n{args.hands} hand(s), {frames} frames per run, template length {LENGTH}\n")
+    print(f"  {'templates':>10}{'p50 us':>10}{'p95 us':>10}{'x first':>10}{'matches':>10}")
+    base = None
+    for count in args.templates:
+        p50, p95, matches = run(count, frames, args.hands, np.random.default_rng(args.seed))
+        base = base or p50
+        print(f"  {count:>10}{p50:>10.1f}{p95:>10.1f}{p50 / base:>10.2f}{matches:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+# null_output.py - No-op stand-in for pyautogui so gesture logic runs headless
+#
+# The benchmarks drive the real GestureManagers, which talk to pyautogui. On a
+# CPU-only box with no display pyautogui cannot even be imported, and we never
+# want a benchmark to move the real mouse anyway, so install() registers this
+# do-nothing module under the pyautogui name before any mode code is imported.
+
+import sys
+import types
+from collections import namedtuple
+
+Size = namedtuple("Size", "width height")
+SCREEN_SIZE = Size(1920, 1080)
+
+
+def _noop(*args, **kwargs):
+    return None
+
+
+def _counting(name, counter):
+    def call(*args, **kwargs):
+        counter[name] = counter.get(name, 0) + 1
+    return call
+
+
+def install(screen_size=SCREEN_SIZE, counter=None):
+    """counter: optional dict that collects how often each output call was made."""
+    module = types.ModuleType("pyautogui")
+    module.FAILSAFE = False
+    module.PAUSE = 0
+    module.size = lambda: Size(*screen_size)
+    module.position = lambda: Size(screen_size[0] // 2, screen_size[1] // 2)
+    for name in ("moveTo", "moveRel", "click", "doubleClick", "rightClick", "mouseDown", "mouseUp",
+                 "scroll", "hscroll", "press", "keyDown", "keyUp", "hotkey"):
+        setattr(module, name, _noop if counter is None else _counting(name, counter))
+    sys.modules["pyautogui"] = module
+    return module
@@ -0,0 +1,248 @@
+# pipeline_bench.py - Headless end-to-end benchmark of each mode over recorded clips
+#
+# Feeds video files through a mode's full per-frame pipeline (resize/flip,
+# color conversion, hands.process, landmark extraction, gesture logic with a
+# no-op output backend, overlay drawing) and reports frames/sec, per-stage
+# p50/p95/p99 latency, peak RSS and full-frame buffer allocations per frame
+# (--trace-alloc adds the peak of all transient Python/NumPy allocations per
+# frame, via tracemalloc). No camera or display is needed.
+#
+#   python benchmarks/pipeline_bench.py clip.mp4 --mode general game \
+#       --model-complexity 0 1 --max-hands 1 2 --pacing max realtime
+#
+# Every configuration runs in a fresh process so peak RSS is per configuration.
+
+import argparse
+import importlib
+import itertools
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+
+MODES = {
+    "general": ("general_mode", "general_main", "GeneralMode"),
+    "game": ("game_mode", "game_main", "GameMode"),
+    "presentation": ("presentation_mode", "presentation_main", "PresentationMode"),
+}
+STAGES = ["decode", "preprocess", "color", "inference", "landmarks", "gestures", "overlay"]
+
+
+for _path in (ROOT, BENCH_DIR):
+    if _path not in sys.path:
+        sys.path.insert(0, _path)
+
+
+def load_mode(mode_key, output_counter=None, key_counter=None, **settings):
+    """
+    Import a mode's pipeline class headless: pyautogui is a no-op stand-in and
+    game keys are only recorded. Pass dicts/Counters to count the calls that were made
+    (key_counter: times each game key was pressed).
+    """
+    import null_output
+    null_output.install(counter=output_counter)
+
+    folder, module_name, class_name = MODES[mode_key]
+    mode_dir = os.path.join(ROOT, folder)
+    if mode_dir not in sys.path:
+        sys.path.insert(0, mode_dir)
+    cls = getattr(importlib.import_module(module_name), class_name)
+    if mode_key == "game":
+        gamekeys = importlib.import_module("gamekeys")
+        settings.setdefault("keys", gamekeys.KeyState(gamekeys.RecordingBackend(key_counter, keep=False)))
+    return cls(**settings)
+
+
+def _rss_peak_mb():
+    try:
+        import resource
+    except ImportError:  # Windows
+        return float("nan")
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_config(cfg):
+    """Benchmark one (clip, mode, settings, pacing) combination. Runs in a child process."""
+    import cv2
+    import numpy as np
+    import tracemalloc
+    from common.landmarks import mirror_results
+
+    mode = load_mode(cfg["mode"], max_hands=cfg["max_hands"], detection_con=cfg["detection_con"],
+                     tracking_con=cfg["tracking_con"], model_complexity=cfg["model_complexity"])
+
+    src = cv2.VideoCapture(cfg["clip"])
+    if not src.isOpened():
+        return dict(cfg, error=f"cannot open {cfg['clip']}")
+    mode.mirror_landmarks = cfg["mirror_landmarks"]
+    src_fps = src.get(cv2.CAP_PROP_FPS) or 30.0
+    interval = 1.0 / src_fps
+    realtime = cfg["pacing"] == "realtime"
+
+    times = {stage: [] for stage in STAGES}
+    totals = []
+    transient = []
+    frames = skipped = with_hands = 0
+    allocs_at_warmup = None
+    frame = None
+    index = -1
+    if cfg["trace_alloc"]:
+        tracemalloc.start()
+    clock = time.perf_counter
+    start = clock()
+
+    while cfg["limit"] <= 0 or frames < cfg["limit"]:
+        t0 = clock()
+        ok, frame = src.read(frame)  # decode into the previous frame's buffer
+        if not ok:
+            break
+        index += 1
+        t1 = clock()
+
+        if realtime:
+            # Behave like a live camera: wait for the frame's due time, and drop
+            # it if we are more than a frame behind (latest-frame capture does too)
+            due = start + index * interval
+            if t1 < due:
+                time.sleep(due - t1)
+            elif t1 - due > interval:
+                skipped += 1
+                continue
+
+        if cfg["trace_alloc"]:
+            base = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        a = clock()
+        small = mode.fit(frame)
+        img = mode.preprocess(small)
+        b = clock()
+        rgb = mode.to_rgb(small if mode.mirror_landmarks else img)
+        c = clock()
+        results = mode.infer(rgb)
+        if mode.mirror_landmarks:
+            mirror_results(results)
+        d = clock()
+        features = mode.extract(img)
+        e = clock()
+        status = mode.decide(features)
+        f = clock()
+        mode.render(img, status, mode.snapshot())
+        g = clock()
+
+        if cfg["trace_alloc"]:
+            transient.append(tracemalloc.get_traced_memory()[1] - base)
+
+        frames += 1
+        if frames <= cfg["warmup"]:
+            continue
+        if allocs_at_warmup is None:
+            allocs_at_warmup = (mode.buffers.allocations, mode.buffers.allocated_bytes)
+        for stage, dt in zip(STAGES, (t1 - t0, b - a, c - b, d - c, e - d, f - e, g - f)):
+            times[stage].append(dt * 1000.0)
+        totals.append((g - a) * 1000.0)
+        if mode.detector.results.multi_hand_landmarks:
+            with_hands += 1
+
+    elapsed = clock() - start
+    if cfg["trace_alloc"]:
+        tracemalloc.stop()
+    src.release()
+    mode.close()
+
+    measured = max(len(totals), 1)
+    result = dict(cfg)
+    result.update(
+        frames=frames,
+        skipped=skipped,
+        fps=frames / elapsed if elapsed > 0 else 0.0,
+        hand_rate=with_hands / measured,
+        peak_rss_mb=_rss_peak_mb(),
+        allocs_per_frame=(mode.buffers.allocations - allocs_at_warmup[0]) / measured if allocs_at_warmup else 0.0,
+        alloc_bytes_per_frame=(mode.buffers.allocated_bytes - allocs_at_warmup[1]) / measured if allocs_at_warmup else 0.0,
+        transient_kb=float(np.median(transient[cfg["warmup"]:])) / 1024 if len(transient) > cfg["warmup"] else None,
+        stages={},
+    )
+    for stage, values in list(times.items()) + [("total", totals)]:
+        if values:
+            p50, p95, p99 = np.percentile(values, [50, 95, 99])
+            result["stages"][stage] = {"p50": p50, "p95": p95, "p99": p99}
+    return result
+
+
+def print_result(r):
+    if "error" in r:
+        print(f"\n[{r['mode']}] {r['clip']}: {r['error']}")
+        return
+    print(f"\n[{r['mode']}] {os.path.basename(r['clip'])}  pacing={r['pacing']}  "
+          f"complexity={r['model_complexity']}  hands={r['max_hands']}  "
+          f"det={r['detection_con']}  track={r['tracking_con']}")
+    print(f"  {r['fps']:.1f} fps  |  {r['frames']} frames, {r['skipped']} skipped  |  "
+          f"hands in {r['hand_rate'] * 100:.0f}% of frames  |  peak RSS {r['peak_rss_mb']:.0f} MB")
+    alloc = f"  {r['allocs_per_frame']:.2f} buffer allocations/frame ({r['alloc_bytes_per_frame'] / 1024:.0f} KB)"
+    if r["transient_kb"] is not None:
+        alloc += f"  |  transient allocations p50 {r['transient_kb']:.0f} KB/frame"
+    print(alloc + ("  |  mirrored landmarks" if r["mirror_landmarks"] else ""))
+    print(f"  {'stage':<12}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for stage, p in r["stages"].items():
+        print(f"  {stage:<12}{p['p50']:>9.2f}{p['p95']:>9.2f}{p['p99']:>9.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless pipeline benchmark over recorded clips")
+    parser.add_argument("clips", nargs="+", help="Video files to feed through the pipeline")
+    parser.add_argument("--mode", nargs="+", choices=sorted(MODES), default=sorted(MODES))
+    parser.add_argument("--model-complexity", nargs="+", type=int, default=[1])
+    parser.add_argument("--max-hands", nargs="+", type=int, default=[2])
+    parser.add_argument("--detection-con", nargs="+", type=float, default=[None],
+                        help="Defaults to each mode's own setting")
+    parser.add_argument("--tracking-con", nargs="+", type=float, default=[None],
+                        help="Defaults to each mode's own setting")
+    parser.add_argument("--pacing", nargs="+", choices=["max", "realtime"], default=["max", "realtime"])
+    parser.add_argument("--warmup", type=int, default=5, help="Frames excluded from latency stats")
+    parser.add_argument("--limit", type=int, default=0, help="Stop after N processed frames (0 = whole clip)")
+    parser.add_argument("--mirror-landmarks", action="store_true", help="Run the model on the unmirrored frame")
+    parser.add_argument("--trace-alloc", action="store_true",
+                        help="Measure transient allocations per frame with tracemalloc (slower)")
+    parser.add_argument("--json", help="Also write all results to this file")
+    args = parser.parse_args()
+
+    defaults = {"general": 0.75, "game": 0.8, "presentation": 0.8}
+    ctx = multiprocessing.get_context("spawn")
+    results = []
+
+    for clip, mode, complexity, hands, det, track, pacing in itertools.product(
+            args.clips, args.mode, args.model_complexity, args.max_hands,
+            args.detection_con, args.tracking_con, args.pacing):
+        cfg = {
+            "clip": os.path.abspath(clip),
+            "mode": mode,
+            "model_complexity": complexity,
+            "max_hands": hands,
+            "detection_con": det if det is not None else defaults[mode],
+            "tracking_con": track if track is not None else defaults[mode],
+            "pacing": pacing,
+            "warmup": args.warmup,
+            "limit": args.limit,
+            "mirror_landmarks": args.mirror_landmarks,
+            "trace_alloc": args.trace_alloc,
+        }
+        # One process per configuration keeps models and peak RSS independent
+        with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+            result = pool.submit(run_config, cfg).result()
+        print_result(result)
+        results.append(result)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+# replay_trace.py - Re-run gesture logic from a recorded landmark trace
+#
+# Drives a mode's decision logic (GestureManager.process_gesture for General /
+# Presentation, the racing controls for Game) straight from a file written with
+# --record-landmarks. No camera, no MediaPipe, no real mouse or keyboard, so a
+# threshold can be tried against the same hand motion thousands of times
+# faster than real time:
+#
+#   python benchmarks/replay_trace.py session.trace --mode general \
+#       --set scroll_sensitivity=8 --set zoom_smoothing=0.5 --repeat 50
+
+import argparse
+import ast
+import os
+import sys
+import time
+from collections import Counter
+
+from pipeline_bench import MODES, load_mode
+from common.trace import TraceReplay
+
+
+def apply_setting(mode, assignment):
+    """name=value -> first of manager attribute, mode attribute, mode module constant."""
+    name, _, raw = assignment.partition("=")
+    try:
+        value = ast.literal_eval(raw)
+    except (ValueError, SyntaxError):
+        value = raw
+    manager = getattr(mode, "manager", None)
+    if manager is not None and hasattr(manager, name):
+        setattr(manager, name, value)
+        return f"manager.{name}"
+    if hasattr(mode, name):
+        setattr(mode, name, value)
+        return f"mode.{name}"
+    module = sys.modules[type(mode).__module__]
+    if hasattr(module, name):
+        setattr(module, name, value)
+        return f"{module.__name__}.{name}"
+    raise SystemExit(f"Unknown setting '{name}' for {type(mode).__name__}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a landmark trace through gesture logic")
+    parser.add_argument("trace")
+    parser.add_argument("--mode", choices=sorted(MODES), required=True)
+    parser.add_argument("--set", action="append", default=[], metavar="NAME=VALUE",
+                        help="Override a threshold, e.g. STEER_THRESHOLD=14")
+    parser.add_argument("--repeat", type=int, default=1, help="Replay the trace this many times")
+    args = parser.parse_args()
+
+    outputs = Counter()
+    keys = Counter()
+    mode = load_mode(args.mode, load_model=False, output_counter=outputs, key_counter=keys)
+    for assignment in args.set:
+        print(f"  {apply_setting(mode, assignment)} = {assignment.partition('=')[2]}")
+
+    replay = TraceReplay(args.trace)
+    if not len(replay):
+        raise SystemExit(f"{args.trace}: no frames recorded")
+
+    statuses = Counter()
+    transitions = 0
+    last_status = None
+    span = replay.duration + 1.0  # keep the clock moving forward across repeats
+
+    start = time.perf_counter()
+    for rep in range(args.repeat):
+        offset = rep * span
+        for t, landmarks, labels, scores in replay:
+            features = mode.load_hands(landmarks, labels, scores, replay.width, replay.height, t + offset)
+            status = mode.decide(features, t + offset)
+            statuses[status] += 1
+            if status != last_status:
+                transitions += 1
+                last_status = status
+    elapsed = time.perf_counter() - start
+    mode.close()
+
+    frames = len(replay) * args.repeat
+    recorded = replay.duration * args.repeat
+    print(f"\n{os.path.basename(args.trace)}: {len(replay)} frames x {args.repeat} "
+          f"({replay.width}x{replay.height}, {replay.duration:.1f} s recorded)")
+    print(f"  {frames / elapsed:,.0f} frames/s  |  {recorded / elapsed:,.0f}x real time  |  "
+          f"{transitions} status changes")
+    print("\n  status")
+    for status, count in statuses.most_common():
+        print(f"    {status or '(none)':<24}{count:>8}")
+    if outputs:
+        print("\n  mouse/keyboard calls")
+        for name, count in outputs.most_common():
+            print(f"    {name:<24}{count:>8}")
+    if keys:
+        print("\n  game keys pressed")
+        for code, count in keys.most_common():
+            print(f"    0x{code:02X}{'':<20}{count:>8}")
+
+
+if __name__ == "__main__":
+    main()
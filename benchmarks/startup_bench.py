@@ -0,0 +1,119 @@
+# startup_bench.py - Time from process spawn to the first processed frame, per mode
+#
+# Spawns a fresh interpreter per run (like the launcher does), which imports a
+# mode, opens the source, builds and warms the model and runs one frame
+# through the full pipeline. Reports the median of each phase:
+#
+#   python benchmarks/startup_bench.py clip.mp4 --mode general game --runs 5
+#   python benchmarks/startup_bench.py 0 --sequential   # camera 0, old ordering
+#
+# --sequential waits for the camera before loading the model, which is how the
+# modes used to start, so the two orderings can be compared. Output goes to
+# the no-op pyautogui backend.
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+MODE_KEYS = ["general", "game", "presentation"]
+PHASES = ["interpreter", "imports", "model", "warmup", "camera_wait", "first_step", "total"]
+BUDGET_S = 1.5
+
+
+def child(mode_key, source, spawned_at, sequential):
+    """Runs in the spawned interpreter; prints one JSON line of phase durations."""
+    t_start = time.time()
+    import importlib
+    sys.path.insert(0, BENCH_DIR)
+    from pipeline_bench import MODES, ROOT, load_mode
+    from common.capture import LatestFrameCapture
+
+    phases = {"interpreter": t_start - spawned_at}
+    cap = LatestFrameCapture(int(source) if source.isdigit() else source).start()
+    if sequential:
+        t = time.time()
+        ok, frame, ts = cap.read(timeout=10.0)
+        phases["camera_wait"] = time.time() - t
+
+    t = time.time()
+    import null_output
+    null_output.install()
+    folder, module_name, _ = MODES[mode_key]
+    sys.path.insert(0, os.path.join(ROOT, folder))
+    importlib.import_module(module_name)
+    phases["imports"] = time.time() - t
+
+    t = time.time()
+    mode = load_mode(mode_key)  # mediapipe is imported here, by the detector
+    phases["model"] = time.time() - t
+    t = time.time()
+    mode.warm_up()
+    phases["warmup"] = time.time() - t
+
+    if not sequential:
+        t = time.time()
+        ok, frame, ts = cap.read(timeout=10.0)
+        phases["camera_wait"] = time.time() - t
+    if not ok:
+        print(json.dumps({"error": f"no frame from {source}"}), flush=True)
+        return
+
+    t = time.time()
+    img, status = mode.step(frame)
+    mode.render(img, status, mode.snapshot())
+    done = time.time()
+    phases["first_step"] = done - t
+    phases["total"] = done - spawned_at
+    print(json.dumps(phases), flush=True)
+
+    mode.close()
+    cap.release()
+
+
+def run_once(mode_key, source, sequential):
+    cmd = [sys.executable, os.path.abspath(__file__), source, "--child", mode_key]
+    if sequential:
+        cmd.append("--sequential")
+    cmd += ["--spawned-at", repr(time.time())]
+    out = subprocess.run(cmd, capture_output=True, text=True)
+    for line in reversed(out.stdout.splitlines()):
+        if line.startswith("{"):
+            return json.loads(line)
+    return {"error": (out.stderr.strip().splitlines() or ["child failed"])[-1]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time-to-first-processed-frame for each mode")
+    parser.add_argument("source", help="Camera index or video file")
+    parser.add_argument("--mode", nargs="+", choices=MODE_KEYS, default=MODE_KEYS)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--sequential", action="store_true", help="Open the camera before loading the model")
+    parser.add_argument("--child", choices=MODE_KEYS, help=argparse.SUPPRESS)
+    parser.add_argument("--spawned-at", type=float, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child, args.source, args.spawned_at, args.sequential)
+        return
+
+    order = "sequential" if args.sequential else "concurrent"
+    print(f"{'mode':<14}" + "".join(f"{p + ' ms':>15}" for p in PHASES))
+    for mode_key in args.mode:
+        runs = [run_once(mode_key, args.source, args.sequential) for _ in range(args.runs)]
+        good = [r for r in runs if "error" not in r]
+        if not good:
+            print(f"{mode_key:<14}{runs[0]['error']}")
+            continue
+        medians = {p: statistics.median(r[p] for r in good) for p in PHASES}
+        verdict = "ok" if medians["total"] <= BUDGET_S else f"over {BUDGET_S}s budget"
+        print(f"{mode_key:<14}" + "".join(f"{medians[p] * 1000:>15.0f}" for p in PHASES)
+              + f"   ({order}, {len(good)} runs, {verdict})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+# trigger_eval.py - Fixed cooldowns vs evidence triggers on a recorded trace
+#
+# Replays a trace through a mode's gesture logic and records, frame by frame,
+# which one-shot actions (clicks, slide changes) had their pose in view. Both
+# firing policies are then run over that same timeline:
+#
+#   cooldown  fire on the first frame of a pose, then not again for N s
+#             (what General / Presentation mode did before common/triggers.py)
+#   evidence  common.triggers with the mode's own settings
+#
+# Ground truth comes from the timeline itself: a run of one pose (gaps of up
+# to --gap s bridged) that lasts --min-hold s or more is one intended gesture,
+# anything shorter is noise. --noise p additionally swaps each frame to a
+# random one-shot pose with probability p, like a flickering finger state, so
+# the false-trigger counts do not depend on how clean the recording was.
+#
+#   python benchmarks/trigger_eval.py session.trace --mode presentation --noise 0.03
+#
+# Per policy: intended gestures fired, latency from the start of the pose to
+# the fire (p50 / p95), fires on noise, and extra fires while a pose was held.
+
+import argparse
+import os
+import random
+
+import numpy as np
+
+from pipeline_bench import load_mode
+from common.trace import TraceReplay
+from common.triggers import TriggerSet
+
+COOLDOWNS = {"double_click": 0.6, "left_click": 0.3, "right_click": 0.3, "prev_slide": 1.4, "next_slide": 1.4}
+
+
+class Timeline(TriggerSet):
+    """Stands in for a manager's triggers: records the poses seen per frame, never fires."""
+
+    def __init__(self):
+        super().__init__()
+        self.frames = []  # (t, [names seen])
+
+    def begin(self, now):
+        super().begin(now)
+        self.frames.append((now, []))
+
+    def fire(self, name):
+        self.frames[-1][1].append(name)
+        return False
+
+
+def record(mode_key, path):
+    mode = load_mode(mode_key, load_model=False)
+    settings = mode.manager.triggers
+    timeline = mode.manager.triggers = Timeline()
+    replay = TraceReplay(path)
+    for t, landmarks, labels, scores in replay:
+        features = mode.load_hands(landmarks, labels, scores, replay.width, replay.height, t)
+        mode.decide(features, t)
+    mode.close()
+    return settings, [(t, names[0] if names else None) for t, names in timeline.frames]
+
+
+def add_noise(frames, p, names, rng):
+    return [(t, rng.choice(names) if rng.random() < p else name) for t, name in frames]
+
+
+def holds(frames, gap):
+    """[(name, start, end)] runs of one pose, gaps up to `gap` s bridged."""
+    runs = []
+    for t, name in frames:
+        if name is None:
+            continue
+        if runs and runs[-1][0] == name and t - runs[-1][2] <= gap:
+            runs[-1][2] = t
+        else:
+            runs.append([name, t, t])
+    return runs
+
+
+def cooldown_policy(frames):
+    last = {}
+    for t, name in frames:
+        if name is not None and t - last.get(name, -np.inf) > COOLDOWNS.get(name, 0.0):
+            last[name] = t
+            yield t, name
+
+
+def evidence_policy(settings):
+    def run(frames):
+        triggers = TriggerSet(settings.rise, settings.fall, **settings.overrides)
+        for t, name in frames:
+            triggers.begin(t)
+            fired = name is not None and triggers.fire(name)
+            triggers.end()
+            if fired:
+                yield t, name
+    return run
+
+
+def score(fires, runs, min_hold):
+    intended = [r for r in runs if r[2] - r[1] >= min_hold]
+    hit, latency, noise, repeats = set(), [], 0, 0
+    for t, name in fires:
+        run = next((r for r in intended if r[0] == name and r[1] <= t <= r[2]), None)
+        if run is None:
+            noise += 1
+        elif id(run) in hit:
+            repeats += 1
+        else:
+            hit.add(id(run))
+            latency.append(t - run[1])
+    return {
+        "intended": len(intended), "fired": len(hit), "noise": noise, "repeats": repeats,
+        "p50_ms": np.percentile(latency, 50) * 1000 if latency else float("nan"),
+        "p95_ms": np.percentile(latency, 95) * 1000 if latency else float("nan"),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare gesture firing policies on a landmark trace")
+    parser.add_argument("trace")
+    parser.add_argument("--mode", choices=["general", "presentation"], required=True)
+    parser.add_argument("--min-hold", type=float, default=0.25, help="s a pose must last to count as intended")
+    parser.add_argument("--gap", type=float, default=0.07, help="s of dropout bridged within one pose")
+    parser.add_argument("--noise", type=float, default=0.0, help="Per-frame probability of a spurious pose")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    settings, frames = record(args.mode, args.trace)
+    truth = holds(frames, args.gap)   # intended gestures come from the clean recording
+    names = sorted({name for _, name in frames if name} | set(settings.overrides)) or sorted(COOLDOWNS)
+    if args.noise:
+        frames = add_noise(frames, args.noise, names, random.Random(args.seed))
+
+    print(f"\n{os.path.basename(args.trace)} ({args.mode}): {len(frames)} frames, "
+          f"one-shot poses {', '.join(names)}, noise {args.noise:.0%}\n")
+    print(f"  {'policy':<10}{'intended':>10}{'fired':>8}{'p50 ms':>9}{'p95 ms':>9}{'noise':>8}{'repeats':>9}")
+    for label, policy in (("cooldown", cooldown_policy), ("evidence", evidence_policy(settings))):
+        s = score(list(policy(frames)), truth, args.min_hold)
+        print(f"  {label:<10}{s['intended']:>10}{s['fired']:>8}{s['p50_ms']:>9.0f}{s['p95_ms']:>9.0f}"
+              f"{s['noise']:>8}{s['repeats']:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,4 @@
+# common - Building blocks shared by the General, Game and Presentation modes.
+#
+# Mode scripts are started as plain files by the launcher, so each one puts the
+# repository root on sys.path before importing from here.
@@ -0,0 +1,38 @@
+# buffers.py - Preallocated destination arrays for the per-frame hot path
+#
+# OpenCV allocates a fresh output array for every call unless it is handed a
+# dst= of the right shape. FramePool keeps one array per named stage and
+# hands the same one back every frame, so resize / flip / cvtColor write in
+# place; a new array is only made when the frame size changes. Every
+# allocation is counted, so a stage that starts allocating per frame again
+# shows up in the metrics and in pipeline_bench.
+
+import numpy as np
+
+
+class FramePool:
+    def __init__(self):
+        self._arrays = {}
+        self.allocations = 0
+        self.allocated_bytes = 0
+
+    def get(self, name, shape, dtype=np.uint8):
+        """The reusable array for stage name, (re)allocated if shape or dtype changed."""
+        buf = self._arrays.get(name)
+        if buf is None or buf.shape != shape or buf.dtype != dtype:
+            buf = self._arrays[name] = np.empty(shape, dtype)
+            self.allocations += 1
+            self.allocated_bytes += buf.nbytes
+        return buf
+
+    def keep(self, name, out):
+        """Record what a dst= call returned; OpenCV replaces a dst it cannot use."""
+        if out is not self._arrays.get(name):
+            self._arrays[name] = out
+            self.allocations += 1
+            self.allocated_bytes += out.nbytes
+        return out
+
+    def publish(self, metrics):
+        metrics.gauge("frame_allocations", self.allocations)
+        metrics.gauge("frame_allocated_bytes", self.allocated_bytes)
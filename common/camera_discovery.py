@@ -0,0 +1,182 @@
+# camera_discovery.py - Parallel, cached camera discovery for the launcher
+#
+# Opening a camera can take seconds, and a broken one can hang. Every candidate
+# is probed on its own worker thread with a deadline, and results are yielded
+# as they complete instead of after the slowest device. On Linux the device
+# list comes from /dev/video* plus sysfs, so metadata-only nodes are skipped
+# and each camera has a stable identity (USB vendor/product/serial/port); the
+# capabilities of known identities are cached on disk and not probed again.
+
+import glob
+import json
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError
+
+SCAN_MAX = 6                # indices tried where /dev/video* is not available
+PROBE_TIMEOUT = 4.0         # seconds per device
+RESOLUTIONS = [(320, 240), (640, 480), (1280, 720), (1920, 1080)]
+CACHE_VERSION = 1
+SYSFS = "/sys/class/video4linux"
+
+
+def cache_path():
+    base = os.environ.get("XDG_CACHE_HOME") or os.environ.get("LOCALAPPDATA") \
+        or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "airinteract", "cameras.json")
+
+
+def load_cache(path=None):
+    try:
+        with open(path or cache_path()) as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if data.get("version") != CACHE_VERSION:
+        return {}
+    return data.get("devices", {})
+
+
+def save_cache(devices, path=None):
+    path = path or cache_path()
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({"version": CACHE_VERSION, "devices": devices}, f, indent=1)
+        os.replace(tmp, path)
+    except OSError:
+        pass  # read-only home: discovery still works, just uncached
+
+
+# ============================
+# ENUMERATION
+# ============================
+def _read(path):
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return ""
+
+
+def _usb_ids(device_dir):
+    """Walk up from the V4L2 device to the USB device that owns it."""
+    path = os.path.realpath(device_dir)
+    while path and path != "/":
+        if os.path.exists(os.path.join(path, "idVendor")):
+            return (_read(os.path.join(path, "idVendor")), _read(os.path.join(path, "idProduct")),
+                    _read(os.path.join(path, "serial")), os.path.basename(path))
+        path = os.path.dirname(path)
+    return ("", "", "", os.path.basename(os.path.realpath(device_dir)))
+
+
+def linux_devices():
+    """[{index, name, identity}] for /dev/video* capture nodes, or None off Linux."""
+    nodes = glob.glob("/dev/video*")
+    if not nodes or not os.path.isdir(SYSFS):
+        return None
+    devices = []
+    for node in nodes:
+        match = re.fullmatch(r"/dev/video(\d+)", node)
+        if not match:
+            continue
+        sys_dir = os.path.join(SYSFS, os.path.basename(node))
+        if _read(os.path.join(sys_dir, "index")) not in ("", "0"):
+            continue  # secondary node of the same camera (metadata stream)
+        name = _read(os.path.join(sys_dir, "name")) or os.path.basename(node)
+        vendor, product, serial, port = _usb_ids(os.path.join(sys_dir, "device"))
+        devices.append({
+            "index": int(match.group(1)),
+            "name": name,
+            "identity": ":".join((vendor, product, serial or port, name)),
+        })
+    return sorted(devices, key=lambda d: d["index"])
+
+
+# ============================
+# PROBING
+# ============================
+def probe(index, name=None):
+    """Open one camera and read its capabilities; None if it delivers no frame."""
+    import cv2  # deferred: the launcher should not pay for OpenCV before its window is up
+    from common.capture import default_backend
+    cap = cv2.VideoCapture(index, default_backend())
+    try:
+        if not cap.isOpened():
+            return None
+        ok, frame = cap.read()
+        if not ok or frame is None:
+            return None
+        h, w = frame.shape[:2]
+        fourcc = int(cap.get(cv2.CAP_PROP_FOURCC))
+        fmt = "".join(chr((fourcc >> (8 * i)) & 0xFF) for i in range(4)).strip("\x00 ") if fourcc else ""
+        caps = {
+            "name": name or f"Camera {index}",
+            "width": w,
+            "height": h,
+            "fps": round(cap.get(cv2.CAP_PROP_FPS) or 0.0, 1),
+            "formats": [fmt] if fmt else [],
+            "resolutions": [],
+        }
+        # The driver answers a set() with the nearest size it supports
+        for rw, rh in RESOLUTIONS:
+            cap.set(cv2.CAP_PROP_FRAME_WIDTH, rw)
+            cap.set(cv2.CAP_PROP_FRAME_HEIGHT, rh)
+            size = [int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))]
+            if size[0] and size not in caps["resolutions"]:
+                caps["resolutions"].append(size)
+        return caps
+    finally:
+        cap.release()
+
+
+def label(index, caps):
+    fps = f" @ {caps['fps']:.0f} fps" if caps.get("fps") else ""
+    return f"CAM {index}  |  {caps['name']}  |  {caps['width']}x{caps['height']}{fps}"
+
+
+def discover(max_index=SCAN_MAX, timeout=PROBE_TIMEOUT, use_cache=True, cache_file=None):
+    """
+    Yield (index, caps) for each working camera as soon as it is known.
+    Cached cameras come first without being opened; the rest are probed in
+    parallel, each abandoned after timeout seconds.
+    """
+    devices = linux_devices()
+    cache = load_cache(cache_file) if use_cache and devices is not None else {}
+
+    pending = []
+    if devices is None:
+        pending = [(i, None, None) for i in range(max_index)]
+    else:
+        for dev in devices:
+            caps = cache.get(dev["identity"])
+            if caps is not None:
+                yield dev["index"], caps
+            else:
+                pending.append((dev["index"], dev["name"], dev["identity"]))
+    if not pending:
+        return
+
+    pool = ThreadPoolExecutor(max_workers=len(pending), thread_name_prefix="camera-probe")
+    futures = {pool.submit(probe, index, name): (index, identity) for index, name, identity in pending}
+    try:
+        for future in as_completed(futures, timeout=timeout):
+            index, identity = futures[future]
+            try:
+                caps = future.result()
+            except Exception:
+                caps = None
+            if caps is None:
+                continue
+            if identity is not None:
+                cache[identity] = caps
+            yield index, caps
+    except TimeoutError:
+        late = [futures[f][0] for f in futures if not f.done()]
+        print(f"Camera probe timed out after {timeout:.0f}s: {late}")
+    finally:
+        # A hung open cannot be cancelled; its thread is left to finish on its own
+        pool.shutdown(wait=False, cancel_futures=True)
+        if devices is not None:
+            save_cache(cache, cache_file)
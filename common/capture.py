@@ -0,0 +1,232 @@
+# capture.py - Threaded latest-frame camera capture shared by all modes
+#
+# A background thread owns cv2.VideoCapture and keeps only the newest frames in
+# a tiny ring buffer, so inference, gestures and imshow never wait on camera I/O
+# and stale frames never pile up in the driver buffer.
+#
+# Frames are decoded into a small pool of reused arrays. A frame returned by
+# read() stays valid until the next read(); copy it to keep it longer.
+#
+# A video file (source given as a path) is not reconnected at its end: the
+# capture stops, read() returns (False, ...) at once and `ended` is True, so
+# trace and benchmark runs over a clip finish.
+
+import os
+import threading
+import time
+from collections import deque
+
+import cv2
+
+
+def default_backend():
+    """DirectShow opens fastest on Windows; everything else lets OpenCV pick."""
+    return cv2.CAP_DSHOW if os.name == 'nt' else cv2.CAP_ANY
+
+
+def camera_source(value):
+    """--cam argument: a camera index, or the path of a video file standing in for one."""
+    return int(value) if value.isdigit() else value
+
+
+class LatestFrameCapture:
+    def __init__(self, source, width=640, height=480, backend=None, buffer_size=2,
+                 reconnect_min=0.1, reconnect_max=2.0):
+        self.source = source
+        self.width = width
+        self.height = height
+        self.backend = default_backend() if backend is None else backend
+        self.reconnect_min = reconnect_min
+        self.reconnect_max = reconnect_max
+
+        # Ring buffer of (seq, timestamp, frame) - oldest entries fall off the end
+        self._frames = deque(maxlen=max(1, buffer_size))
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._thread = None
+        self._cap = None
+
+        self._seq = 0            # last sequence number produced by the reader
+        self._last_read_seq = 0  # last sequence number handed to the caller
+        self._last_pos_msec = None
+        self._frame_interval = 0.0  # video files only: deliver at their own frame rate
+        self._pool = []          # decode buffers: the ring, the one held by the caller, one spare
+        self._pool_size = max(1, buffer_size) + 2
+        self._held = None        # frame last returned by read()
+
+        # Stats
+        self.frames_read = 0
+        self.dropped = 0         # frames produced but never handed out
+        self.duplicates = 0      # frames skipped because the timestamp repeated
+        self.reconnects = 0
+        self.allocations = 0     # decode buffers OpenCV had to allocate
+        self.connected = False
+        self.ended = False       # a video file ran out
+
+    # ============================
+    # LIFECYCLE
+    # ============================
+    def start(self):
+        """Returns at once; the camera is opened on the reader thread (see _reader)."""
+        if self._thread is not None:
+            return self
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._reader, name="capture", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
+        self._release()
+
+    release = stop  # drop-in for cv2.VideoCapture.release()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _open(self):
+        if isinstance(self.source, str):
+            cap = cv2.VideoCapture(self.source)
+        else:
+            cap = cv2.VideoCapture(self.source, self.backend)
+        if cap.isOpened():
+            cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
+            cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
+            cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)  # ignored by some drivers, harmless
+            self._cap = cap
+            self.connected = True
+            self._last_pos_msec = None
+            if isinstance(self.source, str):
+                fps = cap.get(cv2.CAP_PROP_FPS)
+                self._frame_interval = 1.0 / fps if fps > 0 else 0.0
+            return True
+        cap.release()
+        self._cap = None
+        self.connected = False
+        return False
+
+    def _release(self):
+        if self._cap is not None:
+            self._cap.release()
+            self._cap = None
+        self.connected = False
+
+    # ============================
+    # READER THREAD
+    # ============================
+    def _reader(self):
+        # Opening a camera can take a second or more (DirectShow especially);
+        # doing it here lets the caller load and warm the model meanwhile.
+        self._open()
+        backoff = self.reconnect_min
+        next_due = time.monotonic()
+        while not self._stop.is_set():
+            if self._cap is None:
+                # Reconnect with exponential backoff, woken early by stop()
+                if self._stop.wait(backoff):
+                    break
+                if self._open():
+                    self.reconnects += 1
+                    backoff = self.reconnect_min
+                else:
+                    backoff = min(backoff * 2, self.reconnect_max)
+                continue
+
+            if self._frame_interval:
+                # Pace a video file like a live camera instead of decoding flat out
+                next_due = max(next_due + self._frame_interval, time.monotonic() - self._frame_interval)
+                if self._stop.wait(max(0.0, next_due - time.monotonic())):
+                    break
+
+            buf = self._free_buffer()
+            ok, frame = self._cap.read(buf)
+            if ok and frame is not None and frame is not buf:
+                self._adopt(buf, frame)
+            if not ok or frame is None:
+                self._release()
+                if isinstance(self.source, str):
+                    # End of a video file: the stream is over, not lost
+                    with self._cond:
+                        self.ended = True
+                        self._stop.set()
+                        self._cond.notify_all()
+                    break
+                print("Camera lost, reconnecting...")
+                continue
+
+            # Some drivers hand back the same buffer again when polled faster
+            # than they deliver; their position timestamp gives that away.
+            pos_msec = self._cap.get(cv2.CAP_PROP_POS_MSEC)
+            if pos_msec > 0:
+                if pos_msec == self._last_pos_msec:
+                    self.duplicates += 1
+                    continue
+                self._last_pos_msec = pos_msec
+
+            ts = time.monotonic()
+            with self._cond:
+                self._seq += 1
+                self.frames_read += 1
+                self._frames.append((self._seq, ts, frame))
+                self._cond.notify_all()
+
+    def _free_buffer(self):
+        """A pool array that is neither queued nor held by the caller (None = let OpenCV allocate)."""
+        with self._cond:
+            busy = {id(f) for _, _, f in self._frames}
+            if self._held is not None:
+                busy.add(id(self._held))
+        for buf in self._pool:
+            if id(buf) not in busy:
+                return buf
+        return None
+
+    def _adopt(self, buf, frame):
+        """OpenCV allocated a new frame (first frames, or the size changed): keep it in the pool."""
+        self.allocations += 1
+        if buf is not None:
+            self._pool.remove(buf)
+        if len(self._pool) < self._pool_size:
+            self._pool.append(frame)
+
+    # ============================
+    # CONSUMER API
+    # ============================
+    def read(self, timeout=1.0):
+        """
+        Wait for a frame newer than the last one returned.
+        Returns (ok, frame, timestamp) - timestamp is time.monotonic() at capture.
+        """
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while not self._frames or self._frames[-1][0] <= self._last_read_seq:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or self._stop.is_set():
+                    return False, None, None
+                self._cond.wait(remaining)
+
+            seq, ts, frame = self._frames[-1]
+            if self._last_read_seq:
+                self.dropped += seq - self._last_read_seq - 1
+            self._last_read_seq = seq
+            self._held = frame
+        return True, frame, ts
+
+    def publish(self, metrics):
+        """Copy the capture counters into a common.metrics registry."""
+        metrics.gauge("capture_frames", self.frames_read)
+        metrics.gauge("capture_dropped", self.dropped)
+        metrics.gauge("capture_duplicates", self.duplicates)
+        metrics.gauge("capture_reconnects", self.reconnects)
+        metrics.gauge("capture_allocations", self.allocations)
+
+    def isOpened(self):
+        return self._thread is not None and not self._stop.is_set()
@@ -0,0 +1,180 @@
+# cursor_engine.py - Display-rate pointer output with latency-compensating prediction
+#
+# The camera delivers a fingertip position about 30 times a second, and each
+# one is already a few tens of milliseconds old when gesture code sees it.
+# CursorEngine takes those positions with their capture timestamps and, from
+# its own timer, moves the pointer at display rate: every tick it predicts
+# where the finger is *now* (last sample + smoothed velocity x age of the
+# sample, capped) and eases the pointer towards that with a short time
+# constant, which interpolates between camera samples instead of stepping.
+#
+# The engine is shared by every mode in the process, so each update() may
+# carry the bounds of the mode that sent it; predictions are clamped to those.
+#
+# Without start() every update() goes straight to the sink, unpredicted, so
+# trace replay stays deterministic. If the sink raises on the timer thread
+# (pyautogui's fail-safe, say) the thread stops and check() re-raises the
+# error on the vision thread.
+
+import math
+import threading
+import time
+
+RATE_HZ = 120
+SMOOTHING_TAU = 0.025      # s, time constant of the easing towards the prediction
+VELOCITY_SMOOTHING = 0.5   # EMA weight of the newest finite-difference velocity
+PREDICTION = 1.0           # fraction of the sample's age to extrapolate over
+MAX_HORIZON = 0.1          # s, never extrapolate further than this
+HOLD = 0.15                # s without samples after which the pointer stops
+RESUME_GAP = 0.25          # s gap after which a sample starts a new stroke
+
+
+class CursorEngine:
+    def __init__(self, sink=None, rate_hz=RATE_HZ, bounds=None, clock=time.monotonic):
+        self._sink = sink                # callable(x, y); common.output.move_to unless given
+        self.rate_hz = rate_hz
+        self.bounds = bounds             # (x_min, y_min, x_max, y_max) or None, unless update() gives some
+        self.clock = clock
+        self.smoothing_tau = SMOOTHING_TAU
+        self.prediction = PREDICTION
+        self.max_horizon = MAX_HORIZON
+
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+        self._sample = None              # (x, y, t) newest target
+        self._limits = None              # bounds it came with
+        self._velocity = (0.0, 0.0)
+        self._pos = None                 # last emitted position
+        self.latency = 0.0               # EMA of capture -> update() delay, seconds
+        self.ticks = 0
+        self.error = None                # what stopped the timer thread; see check()
+
+    @property
+    def sink(self):
+        if self._sink is None:
+            from common import output
+            self._sink = output.move_to
+        return self._sink
+
+    # ============================
+    # LIFECYCLE
+    # ============================
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():   # not started, or stopped by an error
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="cursor", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+            self._thread = None
+
+    def check(self):
+        """Re-raise (once) the exception that stopped the timer thread; vision thread only."""
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+
+    def reset(self):
+        """Forget the current stroke, e.g. when the cursor gesture ends."""
+        with self._lock:
+            self._sample = None
+            self._velocity = (0.0, 0.0)
+
+    def publish(self, metrics):
+        metrics.gauge("cursor_latency_ms", round(self.latency * 1000, 1))
+        metrics.gauge("cursor_ticks", self.ticks)
+
+    # ============================
+    # SAMPLES (vision thread)
+    # ============================
+    def update(self, x, y, captured=None, bounds=None):
+        """
+        New target in screen pixels; captured = time.monotonic() of the camera
+        frame, bounds = the sending mode's (x_min, y_min, x_max, y_max).
+        """
+        now = self.clock()
+        t = now if captured is None else captured
+        x, y = float(x), float(y)
+        if self._thread is None:
+            self._emit(x, y)
+            return
+
+        with self._lock:
+            last = self._sample
+            if last is not None and 0 < t - last[2] < RESUME_GAP:
+                dt = t - last[2]
+                vx, vy = (x - last[0]) / dt, (y - last[1]) / dt
+                a = VELOCITY_SMOOTHING
+                self._velocity = (a * vx + (1 - a) * self._velocity[0],
+                                  a * vy + (1 - a) * self._velocity[1])
+            elif last is None or t - last[2] >= RESUME_GAP:
+                self._velocity = (0.0, 0.0)
+            self._sample = (x, y, t)
+            self._limits = self.bounds if bounds is None else bounds
+            self.latency += 0.1 * ((now - t) - self.latency)
+
+    def predict(self, now):
+        """Where the finger is estimated to be at time now (None without samples)."""
+        with self._lock:
+            if self._sample is None:
+                return None
+            x, y, t = self._sample
+            vx, vy = self._velocity
+            bounds = self._limits
+        age = now - t
+        if age > HOLD + self.max_horizon:
+            return None
+        horizon = min(max(age, 0.0) * self.prediction, self.max_horizon)
+        return _clamp(x + vx * horizon, y + vy * horizon, bounds)
+
+    # ============================
+    # TIMER THREAD
+    # ============================
+    def _run(self):
+        period = 1.0 / self.rate_hz
+        next_tick = self.clock()
+        last = next_tick
+        while not self._stop.is_set():
+            now = self.clock()
+            target = self.predict(now)
+            if target is not None:
+                if self._pos is None:
+                    pos = target
+                else:
+                    alpha = 1.0 - math.exp(-(now - last) / self.smoothing_tau)
+                    pos = (self._pos[0] + (target[0] - self._pos[0]) * alpha,
+                           self._pos[1] + (target[1] - self._pos[1]) * alpha)
+                try:
+                    self._emit(*pos)
+                except Exception as e:
+                    self.error = e       # nothing would emit the samples update() keeps taking
+                    return
+                self.ticks += 1
+            last = now
+
+            next_tick += period
+            delay = next_tick - self.clock()
+            if delay < 0:
+                next_tick = self.clock()  # fell behind; do not burst to catch up
+                delay = 0
+            self._stop.wait(delay)
+
+    def _emit(self, x, y):
+        self._pos = (x, y)
+        self.sink(x, y)
+
+
+def _clamp(x, y, bounds):
+    if bounds is None:
+        return x, y
+    x_min, y_min, x_max, y_max = bounds
+    return min(max(x, x_min), x_max), min(max(y, y_min), y_max)
+
+
+engine = CursorEngine()
@@ -0,0 +1,178 @@
+# features.py - Lazy, memoized per-frame hand features
+#
+# One FrameFeatures object is built per processed frame from the (hands, 21, 3)
+# landmark array. Every feature is computed for all hands at once, only the
+# first time some gesture branch asks for it, and then reused for the rest of
+# the frame. HandFeatures is a thin per-hand view over the same cache.
+
+import math
+from functools import cached_property
+
+import numpy as np
+
+from common.landmarks import (WRIST, THUMB_MCP, THUMB_IP, THUMB_TIP, INDEX_MCP, INDEX_TIP,
+                              MIDDLE_MCP, TIP_IDS)
+
+_FINGER_TIPS = np.array(TIP_IDS[1:])
+_FINGER_PIPS = _FINGER_TIPS - 2
+_MASK_BITS = np.array([1, 2, 4, 8, 16])
+
+
+class FrameFeatures:
+    def __init__(self, landmarks, labels=None, thumb_sides=None, finger_margin=0.0, ids=None):
+        """
+        landmarks:     float32 (hands, 21, 3) array in pixels
+        ids:           track ID per hand (common.tracking), for state that must follow a hand
+        thumb_sides:   None  -> thumb direction follows palm orientation (MCP joint)
+                       [+1/-1 per hand] -> thumb is up when its tip is past the IP
+                       joint towards +x / -x
+        finger_margin: pixels a fingertip must clear its PIP joint by to count as up
+        """
+        self.landmarks = landmarks
+        self.labels = labels if labels is not None else []
+        self.ids = ids if ids is not None else []
+        self.thumb_sides = thumb_sides
+        self.finger_margin = finger_margin
+        self._memo = {}
+
+    def __len__(self):
+        return len(self.landmarks)
+
+    def hand(self, i):
+        return self.hands[i]
+
+    @cached_property
+    def hands(self):
+        return [HandFeatures(self, i) for i in range(len(self.landmarks))]
+
+    # ============================
+    # VECTORIZED FEATURES (all hands)
+    # ============================
+    @cached_property
+    def palm_cross(self):
+        """Z of (wrist -> middle MCP) x (middle MCP -> index MCP), one per hand."""
+        lm = self.landmarks
+        a = lm[:, MIDDLE_MCP, :2] - lm[:, WRIST, :2]
+        b = lm[:, INDEX_MCP, :2] - lm[:, MIDDLE_MCP, :2]
+        return a[:, 0] * b[:, 1] - a[:, 1] * b[:, 0]
+
+    @cached_property
+    def palm_facing(self):
+        """True = back of hand toward camera."""
+        return self.palm_cross > 0
+
+    @cached_property
+    def fingers(self):
+        """(hands, 5) uint8 array - thumb, index, middle, ring, pinky (1 = up)."""
+        lm = self.landmarks
+        out = np.empty((len(lm), 5), dtype=np.uint8)
+
+        if self.thumb_sides is None:
+            side = np.where(self.palm_facing, 1.0, -1.0)
+            joint = THUMB_MCP
+        else:
+            side = np.asarray(self.thumb_sides, dtype=np.float32)
+            joint = THUMB_IP
+        out[:, 0] = (lm[:, THUMB_TIP, 0] - lm[:, joint, 0]) * side > 0
+
+        # Index to pinky: tip above PIP (smaller y) = up
+        out[:, 1:] = lm[:, _FINGER_TIPS, 1] < lm[:, _FINGER_PIPS, 1] - self.finger_margin
+        return out
+
+    @cached_property
+    def finger_masks(self):
+        """fingers as one 5-bit mask per hand, thumb = bit 0 (see common.gesture_table)."""
+        return self.fingers.dot(_MASK_BITS)
+
+    @cached_property
+    def wrist_angle(self):
+        """Palm tilt in degrees: 0 = fingers straight up, + = leaning right."""
+        d = self.landmarks[:, MIDDLE_MCP, :2] - self.landmarks[:, WRIST, :2]
+        return np.degrees(np.arctan2(d[:, 0], -d[:, 1]))
+
+    @cached_property
+    def hand_scale(self):
+        """Wrist to middle MCP length - a size reference for distance thresholds."""
+        d = self.landmarks[:, MIDDLE_MCP, :2] - self.landmarks[:, WRIST, :2]
+        return np.hypot(d[:, 0], d[:, 1])
+
+    def distance(self, a, b):
+        """Distance between landmarks a and b on every hand."""
+        key = (a, b)
+        if key not in self._memo:
+            d = self.landmarks[:, a, :2] - self.landmarks[:, b, :2]
+            self._memo[key] = np.hypot(d[:, 0], d[:, 1])
+        return self._memo[key]
+
+    # ============================
+    # TWO-HAND FEATURES
+    # ============================
+    def between(self, i, j, landmark=INDEX_TIP):
+        """Distance between the same landmark on hands i and j."""
+        key = ('between', i, j, landmark)
+        if key not in self._memo:
+            d = self.landmarks[i, landmark, :2] - self.landmarks[j, landmark, :2]
+            self._memo[key] = math.hypot(float(d[0]), float(d[1]))
+        return self._memo[key]
+
+    def wheel_angle(self, i, j):
+        """Angle in degrees of the line from wrist i to wrist j."""
+        key = ('wheel', i, j)
+        if key not in self._memo:
+            d = self.landmarks[j, WRIST, :2] - self.landmarks[i, WRIST, :2]
+            self._memo[key] = math.degrees(math.atan2(float(d[1]), float(d[0])))
+        return self._memo[key]
+
+
+class HandFeatures:
+    """Per-hand view of FrameFeatures; nothing is computed until asked for."""
+
+    def __init__(self, frame, index):
+        self.frame = frame
+        self.index = index
+        self.landmarks = frame.landmarks[index]
+
+    @property
+    def label(self):
+        labels = self.frame.labels
+        return labels[self.index] if self.index < len(labels) else "Unknown"
+
+    @property
+    def track(self):
+        ids = self.frame.ids
+        return ids[self.index] if self.index < len(ids) else None
+
+    @property
+    def index_tip(self):
+        return self.landmarks[INDEX_TIP, :2]
+
+    @property
+    def wrist(self):
+        return self.landmarks[WRIST, :2]
+
+    @cached_property
+    def fingers(self):
+        return self.frame.fingers[self.index].tolist()
+
+    @property
+    def mask(self):
+        return int(self.frame.finger_masks[self.index])
+
+    @property
+    def palm_facing(self):
+        return bool(self.frame.palm_facing[self.index])
+
+    @property
+    def wrist_angle(self):
+        return float(self.frame.wrist_angle[self.index])
+
+    @property
+    def hand_scale(self):
+        return float(self.frame.hand_scale[self.index])
+
+    def distance(self, a, b):
+        return float(self.frame.distance(a, b)[self.index])
+
+    def distance_to(self, other, landmark=INDEX_TIP):
+        """Distance to the same landmark on another hand of this frame."""
+        return self.frame.between(self.index, other.index, landmark)
@@ -0,0 +1,104 @@
+# filters.py - Vectorized One Euro filter over per-hand landmark arrays
+#
+# One Euro (Casiez et al., CHI 2012) is a low-pass filter whose cutoff rises
+# with speed: a slow or still hand is heavily smoothed, a fast flick passes
+# with almost no lag. Time steps come from capture timestamps, so the result
+# does not depend on the frame rate.
+#
+# State is kept per hand key (a track ID from common.tracking) in slot
+# arrays, and every frame is filtered for all hands and all 21 landmarks in a
+# single NumPy step.
+
+import math
+import time
+
+import numpy as np
+
+MIN_CUTOFF = 1.0     # Hz, cutoff for a still hand (lower = steadier)
+BETA = 0.01          # cutoff increase per px/s of landmark speed (higher = less lag)
+D_CUTOFF = 1.0       # Hz, cutoff used to smooth the speed estimate
+RESET_AFTER = 0.5    # s, a hand unseen for this long starts fresh
+
+
+class OneEuroFilter:
+    def __init__(self, min_cutoff=MIN_CUTOFF, beta=BETA, d_cutoff=D_CUTOFF, reset_after=RESET_AFTER,
+                 clock=time.monotonic):
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        self.reset_after = reset_after
+        self.clock = clock
+        self._slots = {}      # key -> row in the state arrays
+        self._x = None        # (slots, *shape) last filtered values
+        self._dx = None       # (slots, *shape) last filtered derivative
+        self._t = None        # (slots,) time of the last update, -inf = never
+
+    def reset(self):
+        self._slots.clear()
+        self._x = self._dx = self._t = None
+
+    def _slot_rows(self, keys, shape, t):
+        if self._x is None or self._x.shape[1:] != shape:
+            self._slots.clear()
+            self._x = np.zeros((0,) + shape, dtype=np.float32)
+            self._dx = np.zeros((0,) + shape, dtype=np.float32)
+            self._t = np.zeros(0)
+        new = [k for k in keys if k not in self._slots]
+        if new:
+            # Reuse the rows of hands gone longer than reset_after (track IDs are never repeated)
+            stale = [k for k, row in self._slots.items() if k not in keys and t - self._t[row] > self.reset_after]
+            for k in new:
+                if stale:
+                    row = self._slots.pop(stale.pop())
+                    self._t[row] = -np.inf
+                    self._slots[k] = row
+                else:
+                    self._slots[k] = len(self._slots)
+            grow = len(self._slots) - len(self._t)
+            self._x = np.concatenate([self._x, np.zeros((grow,) + shape, dtype=np.float32)])
+            self._dx = np.concatenate([self._dx, np.zeros((grow,) + shape, dtype=np.float32)])
+            self._t = np.concatenate([self._t, np.full(grow, -np.inf)])
+        return np.fromiter((self._slots[k] for k in keys), dtype=np.intp, count=len(keys))
+
+    def __call__(self, values, keys, t=None):
+        """
+        values: (n, ...) array, one row per hand - e.g. (hands, 21, 3) landmarks
+        keys:   n hashable per-hand keys (unique within the frame)
+        t:      capture time in seconds (time.monotonic()); now if None
+        Filters values in place and returns it.
+        """
+        n = len(values)
+        if n == 0:
+            return values
+        t = self.clock() if t is None else t
+        rows = self._slot_rows(keys, values.shape[1:], t)
+
+        x_prev = self._x[rows]
+        dx_prev = self._dx[rows]
+        dt = t - self._t[rows]
+        fresh = ~(dt > 0) | (dt > self.reset_after)     # new hand, gap, or repeated timestamp
+        dt = np.where(fresh, 1.0, dt)
+        bshape = (n,) + (1,) * (values.ndim - 1)
+        dt_b = dt.reshape(bshape)
+
+        # Derivative, low-passed at d_cutoff
+        tau_d = 1.0 / (2.0 * math.pi * self.d_cutoff)
+        a_d = 1.0 / (1.0 + tau_d / dt_b)
+        dx = (values - x_prev) / dt_b
+        dx_hat = dx_prev + a_d * (dx - dx_prev)
+
+        # Speed per landmark (norm over x, y, z) sets the cutoff
+        speed = np.linalg.norm(dx_hat, axis=-1, keepdims=True) if values.ndim > 1 else np.abs(dx_hat)
+        cutoff = self.min_cutoff + self.beta * speed
+        a = 1.0 / (1.0 + 1.0 / (2.0 * math.pi * cutoff * dt_b))
+        x_hat = x_prev + a * (values - x_prev)
+
+        fresh_b = fresh.reshape(bshape)
+        x_hat = np.where(fresh_b, values, x_hat)
+        dx_hat = np.where(fresh_b, 0.0, dx_hat)
+
+        values[...] = x_hat
+        self._x[rows] = x_hat
+        self._dx[rows] = dx_hat
+        self._t[rows] = t
+        return values
@@ -0,0 +1,247 @@
+# fusion.py - Several cameras, one inference worker each, one set of hands
+#
+# One camera loses a hand whenever it turns edge-on, leaves the frame or is
+# hidden by the other hand. With --cams every camera (or video file standing
+# in for one) gets its own perception_service.py process, which captures and
+# runs the hand model in parallel with the others and publishes its landmarks
+# on its own landmark bus (port, port + 1, ...). FusedSource subscribes to all
+# of them and hands the runtime one stream, in the same records a single bus
+# carries, so the modes cannot tell the difference:
+#
+#   python runtime.py --cams 0 1 --mode General
+#   python runtime.py --cams left.mp4 right.mp4 --headless
+#
+# Cameras are matched per hand by handedness (each camera's labels smoothed by
+# its own HandTracker). For every hand the view with the best quality wins:
+# the model's score times the hand's size in the frame, halved when the hand
+# touches the frame edge and is probably cut off. The winning camera keeps a
+# hand until another one is SWITCH_MARGIN better, so two similar views do not
+# make the hand jump between their coordinates every frame. Views older than
+# MAX_AGE behind the newest frame are not used. The preview shows the image of
+# the camera that supplies most of the hands.
+
+import os
+import selectors
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from common.capture import camera_source
+from common.landmarks import EMPTY, WRIST, MIDDLE_MCP
+from common.landmark_bus import DEFAULT_PORT, LandmarkSubscriber
+from common.trace import MAX_HANDS, TRACE_DTYPE, pack_record, unpack_record
+from common.tracking import HandTracker
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SERVICE = os.path.join(ROOT, "perception_service.py")
+
+MAX_AGE = 0.1            # s a camera's last frame may trail the newest one and still count
+SWITCH_MARGIN = 0.25     # a hand moves to another camera once that view is this much better
+EDGE = 0.02              # fraction of the frame; a hand closer to the border is probably cut off
+EDGE_PENALTY = 0.5
+WORKER_TIMEOUT = 60.0    # s a worker may take to open its camera and load its model
+
+
+def view_quality(landmarks, score, width, height):
+    """How usable one camera's view of a hand is: score x size, penalised at the frame edge."""
+    diagonal = np.hypot(width, height)
+    span = landmarks[MIDDLE_MCP, :2] - landmarks[WRIST, :2]
+    quality = score * float(np.hypot(span[0], span[1])) / diagonal
+    x, y = landmarks[:, 0], landmarks[:, 1]
+    margin = EDGE * diagonal
+    if x.min() < margin or y.min() < margin or x.max() > width - margin or y.max() > height - margin:
+        quality *= EDGE_PENALTY
+    return quality
+
+
+class CameraView:
+    """The newest hands one camera has seen, normalized, with their quality."""
+
+    def __init__(self, subscriber):
+        self.subscriber = subscriber
+        self.tracker = HandTracker()
+        self.t = None
+        self.hands = {}          # label -> (quality, normalized landmarks, score)
+        self._scale = np.array((subscriber.width, subscriber.height, subscriber.width), dtype=np.float32)
+
+        # Stats
+        self.frames = 0
+        self.chosen = 0          # hands this camera supplied to the fused stream
+
+    def take(self, frame):
+        sub = self.subscriber
+        t, landmarks, labels, scores = sub.hands(frame)
+        _, labels = self.tracker.update(landmarks, labels, scores, t)
+        self.t = t
+        self.frames += 1
+        self.hands = {}
+        for i, label in enumerate(labels):
+            score = scores[i] if i < len(scores) else 1.0
+            quality = view_quality(landmarks[i], score, sub.width, sub.height)
+            self.hands[label] = (quality, landmarks[i] / self._scale, score)
+
+
+class FusedSource:
+    """Reads like a LandmarkSubscriber, but from one bus per camera."""
+
+    def __init__(self, subscribers, workers=(), max_age=MAX_AGE, margin=SWITCH_MARGIN, log=print):
+        self.views = [CameraView(sub) for sub in subscribers]
+        self.workers = list(workers)
+        self.max_age = max_age
+        self.margin = margin
+        self.log = log
+        self.width = subscribers[0].width      # the fused records are normalized; the first camera
+        self.height = subscribers[0].height    # sets the pixel size the modes see
+        self.closed = False
+        self.chosen = {}                       # label -> index of the camera supplying it
+        self.shown = 0                         # camera whose image image() returns
+        self._record = np.zeros(1, dtype=TRACE_DTYPE)
+        self._scale = np.array((self.width, self.height, self.width), dtype=np.float32)
+        self._sel = selectors.DefaultSelector()
+        for view in self.views:
+            self._sel.register(view.subscriber, selectors.EVENT_READ, view)
+
+        # Stats
+        self.frames = 0
+        self.switches = 0        # hands handed over from one camera to another
+
+    def read(self, timeout=1.0, latest=True):
+        """
+        The fused hands as a TRACE_DTYPE record, or None on timeout. Every call
+        takes the newest frame of each camera, so it is always latest=True.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            fresh = False
+            for view in self.views:
+                frame = view.subscriber.read(timeout=0, latest=True)
+                if frame is not None:
+                    view.take(frame)
+                    fresh = True
+            if fresh:
+                return self._fuse()
+            remaining = deadline - time.monotonic()
+            if self.closed or remaining <= 0:
+                return None
+            for key, _ in self._sel.select(remaining):
+                view = key.data
+                view.subscriber.wait(0)          # drain the doorbell
+                if view.subscriber.closed:
+                    self._sel.unregister(view.subscriber)
+                    self.log(f"[fusion] camera {self.views.index(view)} stopped")
+                    self.closed = not self._sel.get_map()
+
+    def hands(self, frame):
+        """(t, landmarks, labels, scores) of a fused record, landmarks in pixels of the first camera."""
+        return unpack_record(frame, self._scale)
+
+    def image(self, out=None):
+        """LandmarkSubscriber.image() of the camera supplying most hands; the last one shown without hands."""
+        chosen = list(self.chosen.values())
+        if chosen:
+            self.shown = max(sorted(set(chosen)), key=chosen.count)
+        return self.views[self.shown].subscriber.image(out)
+
+    def _fuse(self):
+        newest = max(view.t for view in self.views if view.t is not None)
+        live = [i for i, view in enumerate(self.views)
+                if view.t is not None and newest - view.t <= self.max_age]
+        landmarks, labels, scores = [], [], []
+        for label in ("Left", "Right"):
+            offers = {i: self.views[i].hands[label] for i in live if label in self.views[i].hands}
+            if not offers:
+                self.chosen.pop(label, None)
+                continue
+            best = max(offers, key=lambda i: offers[i][0])
+            current = self.chosen.get(label)
+            if current in offers and offers[best][0] <= offers[current][0] * (1 + self.margin):
+                best = current
+            elif current is not None:
+                self.switches += 1
+            self.chosen[label] = best
+            self.views[best].chosen += 1
+            _, normalized, score = offers[best]
+            landmarks.append(normalized)
+            labels.append(label)
+            scores.append(score)
+        landmarks = np.stack(landmarks[:MAX_HANDS]) if landmarks else EMPTY
+        pack_record(self._record[0], newest, landmarks, labels, scores)
+        self.frames += 1
+        return self._record[0]
+
+    def publish(self, metrics):
+        metrics.gauge("fusion_frames", self.frames)
+        metrics.gauge("fusion_switches", self.switches)
+        metrics.gauge("fusion_cameras", len(self._sel.get_map()) if not self.closed else 0)
+        for i, view in enumerate(self.views):
+            metrics.gauge(f"fusion_frames_cam{i}", view.frames)
+            metrics.gauge(f"fusion_hands_cam{i}", view.chosen)
+            view.subscriber.publish(metrics, f"cam{i}")
+
+    def close(self):
+        if self._sel is None:
+            return
+        self._sel.close()
+        self._sel = None
+        self.closed = True
+        for view in self.views:
+            view.subscriber.close()
+        stop_workers(self.workers)
+
+
+# ============================
+# WORKERS
+# ============================
+def start(sources, port=DEFAULT_PORT, worker_args=(), name="runtime", timeout=WORKER_TIMEOUT, log=print):
+    """One perception_service.py per source on ports port, port + 1, ...; a FusedSource over them."""
+    workers, subscribers = [], []
+    try:
+        for i, source in enumerate(sources):
+            cmd = [sys.executable, SERVICE, "--cam", str(source), "--bus-port", str(port + i), *worker_args]
+            workers.append(subprocess.Popen(cmd, cwd=ROOT))
+        # The workers load their models in parallel; connect in order as each comes up
+        for i, (source, worker) in enumerate(zip(sources, workers)):
+            subscribers.append(connect(name, port + i, worker, source, timeout))
+            log(f"[fusion] camera {i} ({source}) on 127.0.0.1:{port + i}")
+    except BaseException:
+        for sub in subscribers:
+            sub.close()
+        stop_workers(workers)
+        raise
+    return FusedSource(subscribers, workers, log=log)
+
+
+def connect(name, port, worker, source, timeout=WORKER_TIMEOUT):
+    """Subscribe to a worker's bus as soon as it is up; fails if the worker exits first."""
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            return LandmarkSubscriber(name, port)
+        except ConnectionRefusedError:
+            if worker.poll() is not None:
+                raise ConnectionError(f"camera worker for {source} exited with code {worker.returncode}")
+            if time.monotonic() > deadline:
+                raise ConnectionError(f"camera worker for {source} not up after {timeout:.0f}s")
+            time.sleep(0.2)
+
+
+def stop_workers(workers, timeout=5.0):
+    for worker in workers:
+        if worker.poll() is None:
+            worker.terminate()           # SIGTERM: the service releases its camera and bus
+    for worker in workers:
+        try:
+            worker.wait(timeout)
+        except subprocess.TimeoutExpired:
+            worker.kill()
+
+
+# ============================
+# COMMAND LINE
+# ============================
+def add_arguments(parser):
+    parser.add_argument("--cams", type=camera_source, nargs="+", metavar="SRC",
+                        help="Run one perception worker per camera index or video file and fuse "
+                             "their hands (buses on --bus-port and up)")
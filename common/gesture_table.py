@@ -0,0 +1,170 @@
+# gesture_table.py - Gestures as data, compiled into a finger-mask lookup
+#
+# Each mode declares its poses in a JSON file next to it instead of comparing
+# finger lists in an if/elif chain. A rule names an action and the finger
+# pattern of every hand it looks at, optionally with a guard:
+#
+#   {"action": "drag", "left": "00000", "right": "01000"}
+#   {"action": "nitro", "left": "1xxxx", "right": "1xxxx", "guard": "nitro_ready"}
+#
+# A pattern is five characters, thumb to pinky: 1 = up, 0 = down, x = either.
+# It may also be "none" (hand not in view), "any" (in view or not; the same as
+# leaving the hand out), "up<=1" / "up>=4" / "up==2" (count of raised
+# fingers) or a list of patterns, any of which matches.
+#
+# At load time every rule is expanded into all the finger masks it covers
+# (5 bits per hand, ABSENT for a missing hand) and appended, in file order, to
+# a flat table indexed by the masks of all hands. Per frame, dispatch() is one
+# index plus the guards of the few rules sharing that slot; the first rule
+# whose guard passes (or that has none) wins. Actions and guards are methods of
+# the owning manager: action "drag" calls on_drag(...), guard "nitro_ready"
+# calls guard_nitro_ready(...), both with dispatch()'s extra arguments.
+#
+# A rule with a "motion" fires when common.motion reports that movement
+# (a swipe, a circle) instead of on a pose; its hand patterns, if any, are
+# checked against the frame the movement ended on:
+#
+#   {"motion": "swipe_left", "action": "swipe_next", "hand": "up>=4"}
+#
+# The manager queues the recognizer's events and hands them to
+# dispatch_motion() before the frame's pose is dispatched.
+#
+# A deployment can remap gestures by pointing --gestures at its own copy.
+
+import itertools
+import json
+import os
+import re
+
+ABSENT = 32                  # mask of a hand that is not in view
+SLOTS = ABSENT + 1           # per hand: 32 finger masks + absent
+PRESENT = frozenset(range(ABSENT))
+ANYTHING = PRESENT | {ABSENT}
+_COUNT = re.compile(r"up\s*(<=|>=|==|<|>)\s*([0-5])$")
+_COMPARE = {
+    "<=": lambda a, b: a <= b, ">=": lambda a, b: a >= b, "==": lambda a, b: a == b,
+    "<": lambda a, b: a < b, ">": lambda a, b: a > b,
+}
+
+
+def finger_mask(fingers):
+    """[thumb, index, middle, ring, pinky] (1 = up) -> 5-bit mask, thumb = bit 0."""
+    return sum(1 << i for i, up in enumerate(fingers) if up)
+
+
+def mask_of(hand):
+    """Mask of a common.features.HandFeatures, ABSENT for None."""
+    return ABSENT if hand is None else hand.mask
+
+
+def expand(pattern):
+    """Every mask (ABSENT included) a pattern matches."""
+    if pattern is None or pattern == "any":
+        return ANYTHING
+    if isinstance(pattern, list):
+        return frozenset().union(*(expand(p) for p in pattern))
+    if not isinstance(pattern, str):
+        raise ValueError(f"finger pattern must be a string or list, got {pattern!r}")
+    pattern = pattern.strip().lower()
+    if pattern == "none":
+        return frozenset((ABSENT,))
+    count = _COUNT.match(pattern)
+    if count:
+        op, n = _COMPARE[count.group(1)], int(count.group(2))
+        return frozenset(m for m in PRESENT if op(bin(m).count("1"), n))
+    if len(pattern) != 5 or set(pattern) - set("01x"):
+        raise ValueError(f"finger pattern {pattern!r}: expected 5 of 0/1/x (thumb to pinky)")
+    return frozenset(m for m in PRESENT
+                     if all(c == "x" or int(c) == (m >> i) & 1 for i, c in enumerate(pattern)))
+
+
+class GestureTable:
+    def __init__(self, rules, owner, hands=("left", "right"), source="<rules>"):
+        """
+        rules: list of rule dicts (see above), highest priority first
+        owner: object providing on_<action> / guard_<name> methods
+        hands: names of the hands a rule may give a pattern for, in dispatch() order
+        """
+        self.hands = tuple(hands)
+        self.source = source
+        self.rules = rules
+        self._table = [()] * SLOTS ** len(self.hands)
+        self._motions = {}           # motion name -> [(keys, guard, handler)]
+        for n, rule in enumerate(rules, 1):
+            where = f"{source}: rule {n}"
+            if not isinstance(rule, dict) or "action" not in rule:
+                raise ValueError(f"{where}: needs an \"action\"")
+            unknown = set(rule) - set(self.hands) - {"action", "guard", "note", "motion"}
+            if unknown:
+                raise ValueError(f"{where}: unknown key(s) {', '.join(sorted(unknown))}")
+            handler = self._method(owner, "on_", rule["action"], where)
+            guard = self._method(owner, "guard_", rule["guard"], where) if rule.get("guard") else None
+            try:
+                masks = [sorted(expand(rule.get(hand))) for hand in self.hands]
+            except ValueError as e:
+                raise ValueError(f"{where}: {e}") from None
+            if "motion" in rule:
+                keys = frozenset(self.key(combo) for combo in itertools.product(*masks))
+                self._motions.setdefault(str(rule["motion"]), []).append((keys, guard, handler))
+                continue
+            for combo in itertools.product(*masks):
+                key = self.key(combo)
+                entries = self._table[key]
+                if entries and entries[-1][0] is None:
+                    continue  # an unguarded earlier rule always wins here
+                self._table[key] = entries + ((guard, handler),)
+
+    @staticmethod
+    def _method(owner, prefix, name, where):
+        method = getattr(owner, prefix + str(name), None)
+        if not callable(method):
+            raise ValueError(f"{where}: {type(owner).__name__} has no {prefix}{name}()")
+        return method
+
+    @staticmethod
+    def key(masks):
+        key = 0
+        for mask in reversed(masks):
+            key = key * SLOTS + mask
+        return key
+
+    @property
+    def motion_names(self):
+        """Motions the rules react to, for common.motion.MotionRecognizer.subscribe()."""
+        return sorted(self._motions)
+
+    def dispatch(self, masks, *args):
+        """Run the winning rule's action for these hand masks; None when no rule matches."""
+        for guard, handler in self._table[self.key(masks)]:
+            if guard is None or guard(*args):
+                return handler(*args)
+        return None
+
+    def dispatch_motion(self, name, masks, *args):
+        """dispatch() for a finished motion; None when no motion rule matches."""
+        key = self.key(masks)
+        for keys, guard, handler in self._motions.get(name, ()):
+            if key in keys and (guard is None or guard(*args)):
+                return handler(*args)
+        return None
+
+
+def load(path, owner, hands=("left", "right")):
+    """GestureTable from a JSON file: {"rules": [...]}."""
+    with open(path, encoding="utf-8") as f:
+        try:
+            data = json.load(f)
+        except ValueError as e:
+            raise ValueError(f"{path}: {e}") from None
+    rules = data.get("rules") if isinstance(data, dict) else None
+    if not isinstance(rules, list):
+        raise ValueError(f"{path}: expected {{\"rules\": [...]}}")
+    return GestureTable(rules, owner, hands, os.path.basename(path))
+
+
+# ============================
+# COMMAND LINE
+# ============================
+def add_arguments(parser, default=None):
+    parser.add_argument("--gestures", metavar="PATH", default=default,
+                        help="Gesture map (JSON) to use instead of the mode's own")
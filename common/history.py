@@ -0,0 +1,101 @@
+# history.py - The last second or two of every hand's landmarks, in fixed arrays
+#
+# LandmarkHistory keeps one ring of SIZE frames per hand key (the track IDs
+# the One Euro filter uses too) in a single preallocated (slots, size, 21, 3) array, so
+# recording a frame is a copy into place and looking back never walks Python
+# lists. A hand that has been away longer than RESET_AFTER starts a fresh ring,
+# so a motion is never stitched across a gap; when all slots are taken the one
+# seen least recently is reused.
+
+import time
+
+import numpy as np
+
+from common.landmarks import NUM_LANDMARKS
+
+SIZE = 64              # frames per hand, ~2 s at 30 FPS
+SLOTS = 4              # hands tracked at once
+RESET_AFTER = 0.5      # s without a hand before its history is dropped
+
+
+class LandmarkHistory:
+    def __init__(self, size=SIZE, slots=SLOTS, reset_after=RESET_AFTER, clock=time.monotonic):
+        self.size = size
+        self.slots = slots
+        self.reset_after = reset_after
+        self.clock = clock
+        self._slots = {}                                     # key -> row
+        self._landmarks = np.zeros((slots, size, NUM_LANDMARKS, 3), dtype=np.float32)
+        self._t = np.zeros((slots, size))
+        self._head = np.zeros(slots, dtype=np.intp)          # next write position
+        self._count = np.zeros(slots, dtype=np.intp)
+        self._seen = np.full(slots, -np.inf)                  # time of the last push
+        self.fresh = []                                      # keys pushed by the last push()
+
+    def reset(self):
+        self._slots.clear()
+        self._count[:] = 0
+        self._seen[:] = -np.inf
+        self.fresh = []
+
+    def push(self, landmarks, keys, t=None):
+        """Record one frame: landmarks (hands, 21, 3), one key per hand; t = capture time."""
+        t = self.clock() if t is None else t
+        self.fresh = list(keys)
+        for hand, key in zip(landmarks, keys):
+            row = self._row(key, t)
+            head = self._head[row]
+            self._landmarks[row, head] = hand
+            self._t[row, head] = t
+            self._head[row] = (head + 1) % self.size
+            self._count[row] = min(self._count[row] + 1, self.size)
+            self._seen[row] = t
+
+    def _row(self, key, t):
+        row = self._slots.get(key)
+        if row is None:
+            if len(self._slots) < len(self._seen):
+                row = len(self._slots)
+            else:
+                row = int(np.argmin(self._seen))             # reuse the stalest slot
+                del self._slots[next(k for k, r in self._slots.items() if r == row)]
+            self._slots[key] = row
+            self._count[row] = 0
+        elif t - self._seen[row] > self.reset_after:
+            self._count[row] = 0                             # back after a gap: start over
+        return row
+
+    # ============================
+    # LOOKING BACK
+    # ============================
+    def __len__(self):
+        return len(self._slots)
+
+    def row(self, key):
+        """Slot of a hand, for arrays kept alongside the history (one row per slot)."""
+        return self._slots[key]
+
+    def count(self, key):
+        row = self._slots.get(key)
+        return 0 if row is None else int(self._count[row])
+
+    def latest(self, key):
+        """(t, (21, 3) landmarks) of the newest frame of a hand; a view, not a copy."""
+        row = self._slots[key]
+        head = (self._head[row] - 1) % self.size
+        return self._t[row, head], self._landmarks[row, head]
+
+    def at(self, key, t):
+        """(t, (21, 3) landmarks) of the last frame at or before t, else the oldest one kept."""
+        row = self._slots[key]
+        n = self._count[row]
+        order = (self._head[row] - n + np.arange(n)) % self.size   # oldest -> newest
+        i = max(int(np.searchsorted(self._t[row, order], t, side="right")) - 1, 0)
+        return self._t[row, order[i]], self._landmarks[row, order[i]]
+
+    def window(self, key, n=None):
+        """(t, landmarks) of the last n frames of a hand, oldest first (copies)."""
+        row = self._slots[key]
+        n = self._count[row] if n is None else min(n, self._count[row])
+        order = (self._head[row] - n + np.arange(n)) % self.size
+        return self._t[row, order], self._landmarks[row, order]
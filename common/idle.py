@@ -0,0 +1,141 @@
+# idle.py - Low-power idle state with wake-on-motion
+#
+# After IDLE_AFTER seconds without a hand the pipeline stops running the hand
+# model. Frames are then polled at POLL_HZ and only compared with the previous
+# poll: a tiny grayscale copy of the active zone, absdiff, threshold. As soon
+# as enough pixels change the monitor wakes and that very frame goes through
+# full tracking, so a hand entering the zone is picked up one or two polls
+# after it starts moving.
+
+import os
+import time
+
+import cv2
+import numpy as np
+
+IDLE_AFTER = 3.0          # s without hands before going idle
+POLL_HZ = 8               # frames looked at per second while idle
+MOTION_SIZE = (80, 60)    # px, the zone is shrunk to this for differencing
+MOTION_THRESHOLD = 15     # grey levels a pixel must change by
+MOTION_SHARE = 0.01       # share of zone pixels that must change to wake
+
+
+class IdleMonitor:
+    def __init__(self, margin=0, idle_after=IDLE_AFTER, poll_hz=POLL_HZ, clock=time.monotonic):
+        self.margin = margin             # px of the working frame around the active zone
+        self.idle_after = idle_after
+        self.poll_interval = 1.0 / poll_hz
+        self.clock = clock
+
+        self.sleeping = False
+        self._last_seen = None
+        self._prev = None
+        self._next_poll = 0.0
+        self._woke_at = None             # capture time of the frame that woke us
+        self._wake_frames = 0
+        self._cpu_mark = None            # (wall, cpu) at the start of the idle window
+
+        # Stats
+        self.wakes = 0
+        self.wake_ms = None              # motion frame -> hands tracked, last wake
+        self.wake_frames = None          # frames it took to find the hand, last wake
+        self.idle_cpu = None             # process CPU % while idle, last idle period
+
+    def reset(self):
+        self.sleeping = False
+        self._last_seen = None
+        self._prev = None
+
+    def publish(self, metrics):
+        metrics.gauge("idle", int(self.sleeping))
+        metrics.gauge("idle_wakes", self.wakes)
+        if self.idle_cpu is not None:
+            metrics.gauge("idle_cpu", round(self.idle_cpu, 1))
+        if self.wake_ms is not None:
+            metrics.gauge("wake_ms", round(self.wake_ms, 1))
+
+    def label(self):
+        """Short status for the FPS overlay."""
+        if self.sleeping:
+            cpu = f"  CPU {self.idle_cpu:.0f}%" if self.idle_cpu is not None else ""
+            return f"IDLE {1 / self.poll_interval:.0f} Hz{cpu}"
+        if self.wake_ms is not None:
+            return f"Wake {self.wake_ms:.0f} ms / {self.wake_frames} fr"
+        return ""
+
+    def wait_ms(self):
+        """How long the main loop may wait for a key before the next frame."""
+        if not self.sleeping:
+            return 1
+        return max(1, int((self._next_poll - self.clock()) * 1000))
+
+    # ============================
+    # PER FRAME
+    # ============================
+    def check(self, img, t=None):
+        """True = run full hand tracking on this frame."""
+        if not self.sleeping:
+            return True
+        t = self.clock() if t is None else t
+        self._next_poll = self.clock() + self.poll_interval
+        self._measure_cpu()
+        if not self._motion(img):
+            return False
+        self.sleeping = False
+        self.wakes += 1
+        self._woke_at = t
+        self._wake_frames = 0
+        self._last_seen = t  # give the hand IDLE_AFTER to show up before sleeping again
+        return True
+
+    def update(self, hands, t=None):
+        """After tracking ran: hands = number of hands found."""
+        t = self.clock() if t is None else t
+        if self._woke_at is not None:
+            self._wake_frames += 1
+            if hands:
+                self.wake_ms = (self.clock() - self._woke_at) * 1000
+                self.wake_frames = self._wake_frames
+                self._woke_at = None
+        if hands or self._last_seen is None:
+            self._last_seen = t
+        elif t - self._last_seen > self.idle_after:
+            self.sleeping = True
+            self._woke_at = None
+            self._prev = None
+            self._cpu_mark = None
+            self._next_poll = self.clock()
+
+    def _motion(self, img):
+        h, w = img.shape[:2]
+        m = self.margin
+        zone = img[m:h - m, m:w - m] if m else img
+        small = cv2.cvtColor(cv2.resize(zone, MOTION_SIZE, interpolation=cv2.INTER_AREA), cv2.COLOR_BGR2GRAY)
+        prev, self._prev = self._prev, small
+        if prev is None:
+            return False
+        changed = np.count_nonzero(cv2.absdiff(small, prev) > MOTION_THRESHOLD)
+        return changed > MOTION_SHARE * small.size
+
+    def _measure_cpu(self):
+        now, cpu = self.clock(), sum(os.times()[:2])
+        if self._cpu_mark is None:
+            self._cpu_mark = (now, cpu)
+            return
+        wall = now - self._cpu_mark[0]
+        if wall >= 1.0:
+            self.idle_cpu = 100.0 * (cpu - self._cpu_mark[1]) / wall
+            self._cpu_mark = (now, cpu)
+
+
+# ============================
+# COMMAND LINE
+# ============================
+def add_arguments(parser):
+    parser.add_argument("--no-idle", action="store_true",
+                        help="Keep full hand tracking running when no hand is in view")
+
+
+def from_args(args, margin=0):
+    """IdleMonitor for a mode unless --no-idle was given."""
+    return None if args.no_idle else IdleMonitor(margin)
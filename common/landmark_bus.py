@@ -0,0 +1,489 @@
+# landmark_bus.py - Share one process's hand landmarks with any number of readers
+#
+# The perception service (perception_service.py) owns the camera and the hand
+# model; everything else subscribes to what it finds. Frames go into a ring of
+# fixed-size records in shared memory - the trace record layout, so a recorder
+# can write them to disk as they are - and readers look at them in place:
+#
+#   header | subscriber table | ring of (seq, TRACE_DTYPE record) slots
+#
+# There is one writer and no lock. The writer zeroes a slot's seq, fills the
+# record, stores the frame's seq and then advances the header; a reader only
+# trusts a slot whose seq is the one it asked for. A local TCP socket carries
+# the handshake (which shared memory block, which table row) and afterwards one
+# byte per frame as a doorbell, so readers block instead of polling. Each
+# reader keeps its read position and dropped-frame count in its own table row,
+# where the publisher (and `python -m common.landmark_bus stats`) see who lags.
+#
+# Behind the ring the publisher also shares the camera image each frame's
+# landmarks were found on, in IMAGE_SLOTS slots used in turn, for previews:
+# written before the frame's record, tagged with its seq the same way, and
+# checked again after a reader has copied it out.
+
+import argparse
+import json
+import re
+import selectors
+import socket
+import sys
+import threading
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from common.landmarks import landmarks_to_array, handedness_from_results
+from common.trace import MAX_HANDS, TRACE_DTYPE, pack_record, unpack_record
+
+MAGIC = b"AIRBUS01"
+VERSION = 2
+DEFAULT_PORT = 47261
+CAPACITY = 64             # frames in the ring, ~2 s at 30 FPS
+MAX_SUBSCRIBERS = 16
+SLOW_READER = CAPACITY // 2  # frames behind before a reader is reported as slow
+IMAGE_SLOTS = 2           # shared images; a reader has one frame time to copy one out
+
+HEADER_DTYPE = np.dtype([
+    ("magic", "S8"),
+    ("version", "<u4"),
+    ("max_hands", "<u4"),
+    ("width", "<u4"),
+    ("height", "<u4"),
+    ("capacity", "<u4"),
+    ("subscribers", "<u4"),
+    ("images", "<u4"),               # image slots, 0 = the publisher shares no images
+    ("seq", "<u8"),                  # last frame written, 0 = none yet
+])
+SUBSCRIBER_DTYPE = np.dtype([
+    ("active", "u1"),
+    ("name", "S31"),
+    ("read", "<u8"),                 # last frame this reader took
+    ("dropped", "<u8"),              # frames overwritten or skipped before it got to them
+    ("frames", "<u8"),
+])
+SLOT_DTYPE = np.dtype([("seq", "<u8"), ("frame", TRACE_DTYPE)])
+
+
+def _image_dtype(width, height):
+    """One shared BGR image with its frame's seq, padded so the pixels start cache-aligned."""
+    return np.dtype([("seq", "<u8"), ("pad", "V56"), ("pixels", "u1", (height, width, 3))])
+
+
+def _layout(capacity, subscribers, image_dtype, images):
+    """Byte offsets of the subscriber table, the ring and the images, and the total size."""
+    table = _align(HEADER_DTYPE.itemsize)
+    ring = _align(table + subscribers * SUBSCRIBER_DTYPE.itemsize)
+    pictures = _align(ring + capacity * SLOT_DTYPE.itemsize)
+    return table, ring, pictures, pictures + images * image_dtype.itemsize
+
+
+def _align(offset, to=64):
+    return (offset + to - 1) // to * to
+
+
+def _views(buf, capacity, subscribers, width, height, images):
+    image_dtype = _image_dtype(width, height)
+    table, ring, pictures, _ = _layout(capacity, subscribers, image_dtype, images)
+    header = np.ndarray(1, HEADER_DTYPE, buf)[0]
+    rows = np.ndarray(subscribers, SUBSCRIBER_DTYPE, buf, offset=table)
+    slots = np.ndarray(capacity, SLOT_DTYPE, buf, offset=ring)
+    return header, rows, slots, np.ndarray(images, image_dtype, buf, offset=pictures)
+
+
+_created = set()                 # blocks this process published; its tracker should keep them
+
+
+def _attach(name):
+    """Open an existing block without letting this process's resource tracker unlink it on exit."""
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name, track=False)
+    shm = shared_memory.SharedMemory(name)
+    if sys.platform != "win32" and name not in _created:
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister(shm._name, "shared_memory")
+    return shm
+
+
+def _table(rows, head):
+    """[(name, frames behind, dropped, frames read)] of the connected readers."""
+    return [(row["name"].decode(), head - int(row["read"]), int(row["dropped"]), int(row["frames"]))
+            for row in rows if row["active"]]
+
+
+def _metric_name(name):
+    return re.sub(r"[^a-zA-Z0-9_]", "_", name)
+
+
+# ============================
+# PUBLISHER (perception service)
+# ============================
+class LandmarkPublisher:
+    def __init__(self, width, height, port=DEFAULT_PORT, capacity=CAPACITY,
+                 max_subscribers=MAX_SUBSCRIBERS, images=IMAGE_SLOTS, log=print):
+        self.width = width
+        self.height = height
+        self.port = port
+        self.capacity = capacity
+        self.log = log
+
+        size = _layout(capacity, max_subscribers, _image_dtype(width, height), images)[3]
+        self._shm = shared_memory.SharedMemory(create=True, size=size)
+        _created.add(self._shm.name)
+        self.header, self.rows, self.slots, self.images = _views(
+            self._shm.buf, capacity, max_subscribers, width, height, images)
+        self.rows[:] = 0
+        self.slots["seq"] = 0
+        self.images["seq"] = 0
+        self.header["magic"] = MAGIC
+        self.header["version"] = VERSION
+        self.header["max_hands"] = MAX_HANDS
+        self.header["width"] = width
+        self.header["height"] = height
+        self.header["capacity"] = capacity
+        self.header["subscribers"] = max_subscribers
+        self.header["images"] = images
+        self.header["seq"] = 0
+
+        self._seq = 0
+        self._bells = {}                 # table row -> subscriber socket
+        self._lock = threading.Lock()
+        self._slow = set()               # rows already reported as slow
+        self._stop = threading.Event()
+        self._server = socket.create_server(("127.0.0.1", port))
+        self._server.setblocking(False)
+        self._thread = threading.Thread(target=self._serve, name="landmark-bus", daemon=True)
+        self._thread.start()
+
+    @property
+    def shm_name(self):
+        return self._shm.name
+
+    def write(self, t, landmarks, labels=(), scores=()):
+        """Publish one frame. landmarks: normalized (hands, 21, 3) array; t = capture time."""
+        seq = self._seq + 1
+        slot = self.slots[seq % self.capacity]
+        slot["seq"] = 0                  # readers skip the slot while it is being filled
+        pack_record(slot["frame"], t, landmarks, labels, scores)
+        slot["seq"] = seq
+        self.header["seq"] = self._seq = seq
+        self._ring()
+
+    def write_image(self, img, mirror=False):
+        """
+        Share the (height, width, 3) image the next write() is for, mirrored
+        left-right if mirror. Call it before that write(), so a reader woken by
+        the frame finds its image.
+        """
+        if not len(self.images):
+            return
+        seq = self._seq + 1
+        slot = seq % len(self.images)
+        self.images["seq"][slot] = 0     # readers skip the image while it is being copied in
+        np.copyto(self.images["pixels"][slot], img[:, ::-1] if mirror else img)
+        self.images["seq"][slot] = seq
+
+    def write_results(self, t, results):
+        """Publish one frame straight from a MediaPipe result."""
+        labels, scores = handedness_from_results(results)
+        self.write(t, landmarks_to_array(results, 1, 1), labels, scores)
+
+    def subscribers(self):
+        """[(name, frames behind, dropped, frames read)] of the connected readers."""
+        return _table(self.rows, self._seq)
+
+    def publish(self, metrics):
+        metrics.gauge("bus_frames", self._seq)
+        metrics.gauge("bus_subscribers", len(self._bells))
+        for i, row in enumerate(self.rows):
+            if not row["active"]:
+                continue
+            name = row["name"].decode()
+            lag = self._seq - int(row["read"])
+            metrics.gauge(f"bus_lag_{_metric_name(name)}", lag)
+            metrics.gauge(f"bus_dropped_{_metric_name(name)}", int(row["dropped"]))
+            if lag > SLOW_READER and i not in self._slow:
+                self._slow.add(i)
+                self.log(f"[bus] subscriber '{name}' is {lag} frames behind")
+            elif lag <= SLOW_READER:
+                self._slow.discard(i)
+
+    def close(self):
+        self._stop.set()
+        self._thread.join(timeout=2)
+        with self._lock:
+            for conn in self._bells.values():
+                conn.close()
+            self._bells.clear()
+        self._server.close()
+        self.header = self.rows = self.slots = self.images = None
+        try:
+            self._shm.close()
+        except BufferError:
+            pass                         # a record view is still held; the OS frees it with us
+        self._shm.unlink()
+
+    def _ring(self):
+        with self._lock:
+            bells = list(self._bells.items())
+        for row, conn in bells:
+            try:
+                conn.send(b"\x01")
+            except BlockingIOError:
+                pass                     # reader is behind anyway; it finds the frame on its next read
+            except OSError:
+                pass                     # gone; the bus thread sees the EOF and frees its row
+
+    # ============================
+    # HANDSHAKE (bus thread)
+    # ============================
+    def _serve(self):
+        sel = selectors.DefaultSelector()
+        sel.register(self._server, selectors.EVENT_READ)
+        pending = {}                     # socket -> bytes of its hello so far
+        rows = {}                        # socket -> table row
+        while not self._stop.is_set():
+            for key, _ in sel.select(timeout=0.2):
+                sock = key.fileobj
+                if sock is self._server:
+                    try:
+                        conn, _ = sock.accept()
+                    except BlockingIOError:
+                        continue
+                    conn.setblocking(False)
+                    pending[conn] = b""
+                    sel.register(conn, selectors.EVENT_READ)
+                    continue
+                try:
+                    data = sock.recv(1024)
+                except BlockingIOError:
+                    continue
+                except OSError:
+                    data = b""
+                if not data:             # reader went away
+                    sel.unregister(sock)
+                    pending.pop(sock, None)
+                    if sock in rows:
+                        self._drop(rows.pop(sock))
+                    else:
+                        sock.close()
+                    continue
+                if sock not in pending:
+                    continue             # nothing to say after the hello
+                pending[sock] += data
+                if b"\n" not in pending[sock]:
+                    continue
+                hello = pending.pop(sock).split(b"\n", 1)[0]
+                row = self._accept(sock, hello)
+                if row is None:
+                    sel.unregister(sock)
+                    sock.close()
+                else:
+                    rows[sock] = row
+        sel.close()
+
+    def _accept(self, sock, hello):
+        try:
+            name = str(json.loads(hello).get("name", "reader"))[:31]
+        except (ValueError, AttributeError):
+            return None
+        free = np.flatnonzero(self.rows["active"] == 0)
+        if not len(free):
+            self._reply(sock, {"error": f"bus full ({len(self.rows)} subscribers)"})
+            self.log(f"[bus] refused '{name}': no free subscriber slot")
+            return None
+        row = int(free[0])
+        entry = self.rows[row]
+        entry["name"] = name.encode()[:31]
+        entry["read"] = self._seq
+        entry["dropped"] = 0
+        entry["frames"] = 0
+        entry["active"] = 1
+        self._reply(sock, {"shm": self._shm.name, "row": row, "version": VERSION})
+        with self._lock:
+            self._bells[row] = sock
+        self.log(f"[bus] subscriber '{name}' connected")
+        return row
+
+    def _reply(self, sock, message):
+        sock.setblocking(True)
+        try:
+            sock.sendall(json.dumps(message).encode() + b"\n")
+        finally:
+            sock.setblocking(False)
+
+    def _drop(self, row):
+        with self._lock:
+            conn = self._bells.pop(row, None)
+        if conn is None:
+            return
+        conn.close()
+        if self.rows is not None:
+            self.rows[row]["active"] = 0
+            self._slow.discard(row)
+            self.log(f"[bus] subscriber '{self.rows[row]['name'].decode()}' disconnected")
+
+
+# ============================
+# SUBSCRIBER
+# ============================
+class LandmarkSubscriber:
+    def __init__(self, name, port=DEFAULT_PORT, timeout=2.0):
+        self.name = name
+        self._sock = socket.create_connection(("127.0.0.1", port), timeout=timeout)
+        self._sock.sendall(json.dumps({"name": name}).encode() + b"\n")
+        reply = b""
+        while not reply.endswith(b"\n"):
+            chunk = self._sock.recv(1024)
+            if not chunk:
+                raise ConnectionError(f"landmark bus on port {port} closed the handshake")
+            reply += chunk
+        reply = json.loads(reply)
+        if "error" in reply:
+            raise ConnectionError(f"landmark bus on port {port}: {reply['error']}")
+        if reply.get("version") != VERSION:
+            raise ConnectionError(f"landmark bus on port {port} speaks version {reply.get('version')}")
+
+        self._shm = _attach(reply["shm"])
+        header = np.ndarray(1, HEADER_DTYPE, self._shm.buf)[0]
+        if bytes(header["magic"]) != MAGIC:
+            raise ConnectionError(f"{reply['shm']}: not a landmark bus")
+        self.capacity = int(header["capacity"])
+        self.width = int(header["width"])
+        self.height = int(header["height"])
+        self.header, self.rows, self.slots, self.images = _views(
+            self._shm.buf, self.capacity, int(header["subscribers"]), self.width, self.height, int(header["images"]))
+        self.row = self.rows[reply["row"]]
+        self.seq = int(self.row["read"])
+        self.closed = False
+        self._scale = np.array((self.width, self.height, self.width), dtype=np.float32)
+
+    def read(self, timeout=1.0, latest=False):
+        """
+        Next frame as a TRACE_DTYPE record viewed in place (no copy), or None on
+        timeout. latest=True skips straight to the newest frame. The record
+        stays valid until the ring wraps around to it (capacity frames later).
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            head = int(self.header["seq"])
+            if head > self.seq:
+                oldest = max(head - self.capacity + 2, 1)  # the slot after head may be mid-write
+                seq = head if latest else max(self.seq + 1, oldest)
+                slot = self.slots[seq % self.capacity]
+                if int(slot["seq"]) == seq:
+                    self.row["dropped"] += seq - self.seq - 1
+                    self.row["frames"] += 1
+                    self.row["read"] = self.seq = seq
+                    return slot["frame"]
+                continue                 # overwritten under us; look at the head again
+            remaining = deadline - time.monotonic()
+            if self.closed or remaining <= 0:
+                return None
+            self.wait(remaining)
+
+    def hands(self, frame):
+        """(t, landmarks, labels, scores) of a record, landmarks in pixels of the service's frame."""
+        return unpack_record(frame, self._scale)
+
+    def image(self, out=None):
+        """
+        Copy of the image shared with the frame read() last returned (into out
+        if given), or None when the publisher shares none or has already
+        replaced it.
+        """
+        if self.images is None or not len(self.images):
+            return None
+        slot = self.seq % len(self.images)
+        if int(self.images["seq"][slot]) != self.seq:
+            return None
+        pixels = self.images["pixels"][slot]
+        if out is None:
+            out = np.empty_like(pixels)
+        np.copyto(out, pixels)
+        if int(self.images["seq"][slot]) != self.seq:
+            return None                  # the publisher came round to it while we copied
+        return out
+
+    def subscribers(self):
+        """The publisher's view of every reader, this one included."""
+        return _table(self.rows, int(self.header["seq"]))
+
+    def valid(self):
+        """True while the record read() last returned has not been overwritten."""
+        return int(self.slots[self.seq % self.capacity]["seq"]) == self.seq
+
+    def publish(self, metrics, suffix=None):
+        if self.row is None:
+            return
+        name = f"_{_metric_name(suffix)}" if suffix else ""
+        metrics.gauge(f"bus_read_lag{name}", int(self.header["seq"]) - self.seq)
+        metrics.gauge(f"bus_read_dropped{name}", int(self.row["dropped"]))
+
+    def fileno(self):
+        """The doorbell socket, to select() over several buses; wait(0) once it is readable."""
+        return self._sock.fileno()
+
+    def close(self):
+        if self.header is None:
+            return
+        self.closed = True
+        self._sock.close()
+        self.header = self.rows = self.row = self.slots = self.images = None
+        try:
+            self._shm.close()
+        except BufferError:
+            pass                         # the caller still holds a record view
+
+    def wait(self, timeout):
+        """Block on the doorbell; drain whatever rang meanwhile."""
+        self._sock.settimeout(timeout)
+        try:
+            if not self._sock.recv(4096):
+                self.closed = True       # publisher stopped
+        except (socket.timeout, BlockingIOError):
+            pass
+        except OSError:
+            self.closed = True
+
+
+# ============================
+# COMMAND LINE
+# ============================
+def add_arguments(parser):
+    parser.add_argument("--bus-port", type=int, default=DEFAULT_PORT,
+                        help=f"Local port of the landmark bus handshake (default {DEFAULT_PORT})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or record the landmark bus")
+    parser.add_argument("command", choices=("stats", "record"))
+    parser.add_argument("path", nargs="?", help="record: trace file to append to")
+    add_arguments(parser)
+    args = parser.parse_args()
+    if args.command == "record" and not args.path:
+        parser.error("record needs a trace path")
+
+    from common.trace import TraceWriter
+    sub = LandmarkSubscriber(args.command, args.bus_port)
+    writer = TraceWriter(args.path, sub.width, sub.height) if args.command == "record" else None
+    last = time.monotonic()
+    try:
+        while not sub.closed:
+            frame = sub.read()
+            if frame is not None and writer:
+                writer.write_record(frame)
+            if writer is None and time.monotonic() - last >= 1.0:
+                last = time.monotonic()
+                print(f"frame {int(sub.header['seq'])}: " + "  ".join(
+                    f"{name} {lag} behind / {dropped} dropped" for name, lag, dropped, _ in sub.subscribers()),
+                    flush=True)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if writer:
+            writer.close()
+        sub.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+# landmarks.py - One NumPy landmark representation for every mode
+#
+# MediaPipe hands come back as protobuf messages. Instead of building 21
+# [id, x, y] lists per hand per frame, everything is copied out in one pass into
+# a float32 (hands, 21, 3) array: x and y in (sub-pixel) image coordinates and
+# z scaled like x, so nothing gets quantized to whole pixels.
+
+import numpy as np
+
+NUM_LANDMARKS = 21
+
+WRIST = 0
+THUMB_MCP, THUMB_IP, THUMB_TIP = 2, 3, 4
+INDEX_MCP, INDEX_PIP, INDEX_TIP = 5, 6, 8
+MIDDLE_MCP, MIDDLE_TIP = 9, 12
+RING_MCP, RING_TIP = 13, 16
+PINKY_MCP, PINKY_TIP = 17, 20
+TIP_IDS = [THUMB_TIP, INDEX_TIP, MIDDLE_TIP, RING_TIP, PINKY_TIP]
+PALM = [WRIST, INDEX_MCP, MIDDLE_MCP, RING_MCP, PINKY_MCP]
+
+MIRRORED_LABELS = {"Left": "Right", "Right": "Left"}
+
+EMPTY = np.zeros((0, NUM_LANDMARKS, 3), dtype=np.float32)
+
+
+def landmarks_to_array(results, width, height):
+    """Copy every detected hand into a float32 (hands, 21, 3) array in pixels."""
+    hands = results.multi_hand_landmarks if results is not None else None
+    if not hands:
+        return EMPTY
+    count = len(hands) * NUM_LANDMARKS * 3
+    arr = np.fromiter(
+        (v for hand in hands for lm in hand.landmark for v in (lm.x, lm.y, lm.z)),
+        dtype=np.float32, count=count,
+    ).reshape(len(hands), NUM_LANDMARKS, 3)
+    arr *= np.array((width, height, width), dtype=np.float32)
+    return arr
+
+
+def mirror_results(results):
+    """Mirror mediapipe results in place (x -> 1 - x, Left <-> Right), as if the input had been flipped."""
+    if results is None:
+        return results
+    for hand in results.multi_hand_landmarks or ():
+        for lm in hand.landmark:
+            lm.x = 1.0 - lm.x
+    for hand in results.multi_handedness or ():
+        cls = hand.classification[0]
+        cls.label = MIRRORED_LABELS.get(cls.label, cls.label)
+    return results
+
+
+def handedness_from_results(results):
+    """Return (labels, scores) for each detected hand, in landmark order."""
+    labels, scores = [], []
+    if results is not None and results.multi_handedness:
+        for hand in results.multi_handedness:
+            cls = hand.classification[0]
+            labels.append(cls.label)
+            scores.append(cls.score)
+    return labels, scores
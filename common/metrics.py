@@ -0,0 +1,200 @@
+# metrics.py - Low-overhead per-stage counters and latency histograms
+#
+# Every mode times its hot-path stages (capture wait, preprocessing, inference,
+# gestures, output dispatch, overlay, imshow) into one Metrics registry. The
+# registry can be scraped as Prometheus text from a local HTTP endpoint and/or
+# dumped when the mode exits, so a slow frame can be pinned on the camera, the
+# model or the OS input calls.
+#
+# Recording is lock-free on purpose: a lost increment under a thread race is
+# an acceptable price for keeping a lap at about a microsecond.
+
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PREFIX = "airinteract"
+
+# Histogram upper bounds in seconds (last bucket is +Inf)
+BUCKETS = (0.0005, 0.001, 0.002, 0.005, 0.01, 0.02, 0.033, 0.05, 0.1, 0.2, 0.5, 1.0)
+
+STAGES = ("capture_wait", "preprocess", "color", "inference", "landmarks",
+          "gestures", "dispatch", "overlay", "display")
+
+
+class Histogram:
+    __slots__ = ("counts", "count", "sum", "recent")
+
+    def __init__(self, recent=256):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.recent = deque(maxlen=recent)  # raw samples for exact recent percentiles
+
+    def observe(self, seconds):
+        self.counts[bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        self.recent.append(seconds)
+
+    def percentiles(self, qs=(50, 95, 99)):
+        """Percentiles (seconds) over the recent samples."""
+        samples = sorted(self.recent)
+        if not samples:
+            return [0.0 for _ in qs]
+        last = len(samples) - 1
+        return [samples[min(last, int(round(q / 100.0 * last)))] for q in qs]
+
+
+class Metrics:
+    def __init__(self):
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {stage: Histogram() for stage in STAGES}
+        self.started = time.time()
+
+    # ============================
+    # RECORDING (hot path)
+    # ============================
+    def inc(self, name, amount=1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def gauge(self, name, value):
+        self.gauges[name] = value
+
+    def observe(self, stage, seconds):
+        hist = self.histograms.get(stage)
+        if hist is None:
+            hist = self.histograms[stage] = Histogram()
+        hist.observe(seconds)
+
+    def lap(self, stage, since):
+        """Record now - since under stage and return now, so laps chain."""
+        now = time.perf_counter()
+        self.observe(stage, now - since)
+        return now
+
+    def timed(self, stage, func):
+        """Wrap func so every call is recorded under stage."""
+        def wrapper(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.observe(stage, time.perf_counter() - t0)
+        wrapper.__wrapped__ = func
+        return wrapper
+
+    def instrument(self, target, names, stage="dispatch"):
+        """Time the named functions of a module/object, e.g. pyautogui calls."""
+        for name in names:
+            func = getattr(target, name, None)
+            if func is not None and not hasattr(func, "__wrapped__"):
+                setattr(target, name, self.timed(stage, func))
+
+    # ============================
+    # EXPORT
+    # ============================
+    def render(self):
+        """Prometheus text exposition format."""
+        lines = []
+        for name, value in sorted(self.counters.items()):
+            lines.append(f"# TYPE {PREFIX}_{name}_total counter")
+            lines.append(f"{PREFIX}_{name}_total {value}")
+        for name, value in sorted(self.gauges.items()):
+            lines.append(f"# TYPE {PREFIX}_{name} gauge")
+            lines.append(f"{PREFIX}_{name} {value}")
+        lines.append(f"# TYPE {PREFIX}_uptime_seconds gauge")
+        lines.append(f"{PREFIX}_uptime_seconds {time.time() - self.started:.3f}")
+
+        family = f"{PREFIX}_stage_seconds"
+        lines.append(f"# TYPE {family} histogram")
+        for stage, hist in list(self.histograms.items()):  # observe() may add a stage meanwhile
+            if not hist.count:
+                continue
+            cumulative = 0
+            for bound, count in zip(BUCKETS, hist.counts):
+                cumulative += count
+                lines.append(f'{family}_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+            lines.append(f'{family}_bucket{{stage="{stage}",le="+Inf"}} {hist.count}')
+            lines.append(f'{family}_sum{{stage="{stage}"}} {hist.sum:.6f}')
+            lines.append(f'{family}_count{{stage="{stage}"}} {hist.count}')
+        return "\n".join(lines) + "\n"
+
+    def summary(self):
+        """Human-readable per-stage table."""
+        rows = [f"{'stage':<14}{'count':>8}{'mean ms':>10}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"]
+        for stage, hist in list(self.histograms.items()):
+            if not hist.count:
+                continue
+            p50, p95, p99 = (v * 1000 for v in hist.percentiles())
+            mean = hist.sum / hist.count * 1000
+            rows.append(f"{stage:<14}{hist.count:>8}{mean:>10.2f}{p50:>9.2f}{p95:>9.2f}{p99:>9.2f}")
+        for name, value in sorted(self.counters.items()):
+            rows.append(f"{name:<14}{value:>8}")
+        for name, value in sorted(self.gauges.items()):
+            rows.append(f"{name:<14}{value:>8}")
+        return "\n".join(rows) + "\n"
+
+    def dump(self, path):
+        """Write the summary and Prometheus text to path ('-' = stdout)."""
+        text = self.summary() + "\n" + self.render()
+        if path == "-":
+            sys.stdout.write(text)
+        else:
+            with open(path, "w") as f:
+                f.write(text)
+
+    def serve(self, port, host="127.0.0.1"):
+        """Expose /metrics on a local port from a daemon thread."""
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = registry.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass  # keep the mode's console clean
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+        return server
+
+
+class NullMetrics(Metrics):
+    """Drop-in that records nothing; used when a pipeline runs without metrics."""
+
+    def inc(self, name, amount=1):
+        pass
+
+    def gauge(self, name, value):
+        pass
+
+    def observe(self, stage, seconds):
+        pass
+
+
+def add_arguments(parser):
+    parser.add_argument("--metrics-port", type=int, help="Serve Prometheus-style metrics on 127.0.0.1:PORT")
+    parser.add_argument("--metrics-dump", metavar="PATH", help="Write metrics on exit ('-' = stdout)")
+    parser.add_argument("--telemetry-port", type=int, help="Stream telemetry datagrams to 127.0.0.1:PORT (set by the launcher)")
+
+
+def from_args(args):
+    """Metrics registry for a mode's parsed arguments; serves it if asked to."""
+    metrics = Metrics()
+    if args.metrics_port:
+        metrics.serve(args.metrics_port)
+        print(f"Metrics at http://127.0.0.1:{args.metrics_port}/metrics")
+    if args.telemetry_port:
+        from common.telemetry import TelemetrySender
+        metrics.telemetry = TelemetrySender(metrics, args.telemetry_port)
+    return metrics
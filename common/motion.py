@@ -0,0 +1,247 @@
+# motion.py - Swipes, circles and other movements, matched as they happen
+#
+# Poses look at one frame; a motion is a path. MotionRecognizer follows one
+# point of every hand (the middle-finger knuckle, steadier than a fingertip)
+# through common.history.LandmarkHistory and turns each frame into a
+# direction: the unit vector of its velocity over the last VELOCITY_WINDOW
+# seconds, or "still" when slower than MIN_SPEED hand lengths per second.
+#
+# Templates are sequences of LENGTH directions. Matching is a streaming,
+# subsequence DTW (SPRING-style): for every template point it keeps the
+# cheapest warped path ending at the current frame, where a frame may stay on
+# a point or advance up to MAX_STEP points, paying for every point it passes,
+# so a complete match always pays for all LENGTH points and a fast gesture
+# cannot skip the parts it did not do. A path may start at any frame, so
+# nothing has to be segmented.
+#
+# Every template has the same length, so the path state of all hands and all
+# templates is one (hands, templates, LENGTH) array and a frame is the same
+# dozen NumPy calls whether there is one template or a hundred: O(LENGTH) work
+# per template, all of it in C. Up to ~100 templates the call overhead
+# dominates and the cost per frame is close to flat; beyond that it grows
+# with the array at well under a microsecond per template
+# (benchmarks/motion_bench.py).
+#
+# A path that reaches a template's last point with an average cost under the
+# template's threshold, and that moved far and fast enough, is a match:
+# subscribers get a MotionEvent, and that hand's paths start over.
+
+import math
+from collections import namedtuple
+
+import numpy as np
+
+from common.history import LandmarkHistory
+from common.landmarks import MIDDLE_MCP, WRIST
+
+LENGTH = 12               # points per template
+MAX_STEP = 3              # points a frame may advance: a match takes >= LENGTH / MAX_STEP frames
+VELOCITY_WINDOW = 0.1     # s of history a frame's direction is taken over
+MIN_SPEED = 2.0           # hand lengths / s; slower frames count as still
+THRESHOLD = 0.12          # mean cost per template point (0 = exact, 1 = opposite / still)
+REFRACTORY = 0.4          # s after a match before the same hand can match again
+MAX_DURATION = 2.0        # s; slower paths are not gestures
+
+MotionEvent = namedtuple("MotionEvent", "name key t duration score")
+
+
+# ============================
+# TEMPLATES
+# ============================
+class Template:
+    def __init__(self, name, directions, threshold=THRESHOLD, min_distance=0.0, min_speed=0.0):
+        """
+        directions:   (LENGTH, 2) unit vectors, image axes (x right, y down)
+        min_distance: hand lengths between where the path started and ended
+        min_speed:    hand lengths / s, that distance over the path's duration
+        """
+        self.name = name
+        self.directions = np.asarray(directions, dtype=np.float32)
+        self.threshold = threshold
+        self.min_distance = min_distance
+        self.min_speed = min_speed
+
+
+def swipe(name, dx, dy, distance=2.5, speed=6.0):
+    """A fast straight stroke; distance / speed in hand lengths (per second)."""
+    d = np.array([dx, dy], dtype=np.float32)
+    return [Template(name, np.tile(d / np.linalg.norm(d), (LENGTH, 1)), min_distance=distance, min_speed=speed)]
+
+
+def circle(name, clockwise=True, phases=4):
+    """One full turn, starting in any of `phases` directions."""
+    sign = 1.0 if clockwise else -1.0     # y points down: increasing angle turns clockwise on screen
+    steps = np.arange(LENGTH) / LENGTH * 2 * math.pi
+    return [Template(name, np.stack([np.cos(sign * steps + p), np.sin(sign * steps + p)], axis=1))
+            for p in np.arange(phases) / phases * 2 * math.pi]
+
+
+TEMPLATES = (
+    swipe("swipe_left", -1, 0) + swipe("swipe_right", 1, 0)
+    + swipe("swipe_up", 0, -1) + swipe("swipe_down", 0, 1)
+    + circle("circle_cw", True) + circle("circle_ccw", False)
+)
+
+
+# ============================
+# RECOGNIZER
+# ============================
+class MotionRecognizer:
+    def __init__(self, history, landmark=MIDDLE_MCP, templates=TEMPLATES):
+        self.history = history
+        self.landmark = landmark
+        self.library = {}                    # name -> [Template], what can be subscribed to
+        for template in templates:
+            self.library.setdefault(template.name, []).append(template)
+
+        self.templates = []                  # active, i.e. subscribed to
+        self._subscribers = []               # (names, callback)
+        self._quiet_until = {}               # hand key -> end of its refractory period
+        self._compile()
+
+        # Stats
+        self.frames = 0
+        self.matches = 0
+
+    def subscribe(self, callback, names=None):
+        """Call callback(MotionEvent) for matches of the named motions (None = all); activates them."""
+        names = set(self.library) if names is None else set(names)
+        unknown = names - set(self.library)
+        if unknown:
+            raise ValueError(f"unknown motion(s): {', '.join(sorted(unknown))}")
+        self._subscribers.append((names, callback))
+        wanted = set().union(*(n for n, _ in self._subscribers))
+        self.templates = [t for name in sorted(wanted) for t in self.library[name]]
+        self._compile()
+
+    def _compile(self):
+        count = len(self.templates)
+        self._directions = np.array([t.directions for t in self.templates], dtype=np.float32).reshape(count, LENGTH, 2)
+        self._flat = self._directions.reshape(-1, 2)
+        self._threshold = np.array([t.threshold for t in self.templates], dtype=np.float32)
+        # Path state per history slot: cheapest cost to reach each template point, and when that path began
+        shape = (self.history.slots, count, LENGTH)
+        self._cost = np.full(shape, np.inf, dtype=np.float32)
+        self._start = np.zeros(shape)
+
+    def reset(self):
+        """Forget every hand, history included (the mode was closed)."""
+        self._cost[:] = np.inf
+        self._quiet_until.clear()
+        self.history.reset()
+
+    def publish(self, metrics):
+        metrics.gauge("motion_templates", len(self.templates))
+        metrics.gauge("motion_matches", self.matches)
+
+    # ============================
+    # PER FRAME
+    # ============================
+    def update(self):
+        """Advance every hand pushed to the history this frame; returns the MotionEvents found."""
+        events = []
+        if not self.templates:
+            return events
+        self.frames += 1
+        keys, rows, directions = [], [], []
+        for key in self.history.fresh:
+            row = self.history.row(key)
+            if self.history.count(key) < 2:
+                self._cost[row] = np.inf     # new hand, or back after a gap: no paths yet
+                continue
+            keys.append(key)
+            rows.append(row)
+            directions.append(self._direction(key))
+        if keys:
+            events = self._step(keys, rows, directions)
+        for event in events:
+            self.matches += 1
+            for names, callback in self._subscribers:
+                if event.name in names:
+                    callback(event)
+        return events
+
+    def _direction(self, key):
+        """Unit direction of the hand's motion now, or None when it is (nearly) still."""
+        t, now = self.history.latest(key)
+        t0, then = self.history.at(key, t - VELOCITY_WINDOW)
+        dt = t - t0
+        scale = _hand_scale(now)
+        if dt <= 0 or scale <= 0:
+            return None
+        v = (now[self.landmark, :2] - then[self.landmark, :2]) / (scale * dt)
+        speed = math.hypot(float(v[0]), float(v[1]))
+        return v / speed if speed >= MIN_SPEED else None
+
+    def _step(self, keys, rows, directions):
+        """One DP step for all these hands at once: (hands, templates, LENGTH) arrays."""
+        t = self.history.latest(keys[0])[0]  # hands are pushed together
+        d = np.ones((len(rows),) + self._directions.shape[:2], dtype=np.float32)  # still: 1 everywhere
+        moving = [i for i, v in enumerate(directions) if v is not None]
+        if moving:
+            v = np.array([directions[i] for i in moving], dtype=np.float32)
+            dot = (self._flat @ v.T).T.reshape((len(moving),) + d.shape[1:])
+            d[moving] = 0.5 - 0.5 * dot      # 0 same way .. 1 opposite
+        cost, start = self._cost[rows], self._start[rows]
+
+        # Predecessors: stay on a point, or come from up to MAX_STEP points back, paying
+        # for each point passed (a fresh path enters point 0); ties keep the earlier option
+        passed = np.cumsum(d, axis=2)
+        new_cost = cost + d
+        new_start = start.copy()
+        fresh = d[..., 0] < new_cost[..., 0]
+        np.copyto(new_cost[..., 0], d[..., 0], where=fresh)
+        new_start[..., 0][fresh] = t
+        for k in range(1, MAX_STEP + 1):
+            step = cost[..., :-k] + (passed[..., k:] - passed[..., :-k])
+            better = step < new_cost[..., k:]
+            np.copyto(new_cost[..., k:], step, where=better)
+            np.copyto(new_start[..., k:], start[..., :-k], where=better)
+        self._cost[rows], self._start[rows] = new_cost, new_start
+
+        score = new_cost[..., -1] / LENGTH
+        duration = t - new_start[..., -1]
+        found = (score < self._threshold) & (duration <= MAX_DURATION)
+        events = []
+        for h in np.flatnonzero(found.any(axis=1)):
+            key = keys[h]
+            if t < self._quiet_until.get(key, -np.inf):
+                continue
+            candidates = np.flatnonzero(found[h])
+            for i in candidates[np.argsort(score[h, candidates])]:
+                template = self.templates[i]
+                if self._travelled(key, template, new_start[h, i, -1], t):
+                    self._cost[rows[h]] = np.inf     # every path of this hand starts over
+                    self._quiet_until = {k: q for k, q in self._quiet_until.items() if q > t}
+                    self._quiet_until[key] = t + REFRACTORY
+                    events.append(MotionEvent(template.name, key, t, float(duration[h, i]), float(score[h, i])))
+                    break
+        return events
+
+    def _travelled(self, key, template, t0, t):
+        if not template.min_distance and not template.min_speed:
+            return True
+        _, then = self.history.at(key, t0)
+        _, now = self.history.latest(key)
+        scale = _hand_scale(now)
+        if scale <= 0:
+            return False
+        dist = float(np.hypot(*(now[self.landmark, :2] - then[self.landmark, :2]))) / scale
+        return dist >= template.min_distance and dist / max(t - t0, 1e-3) >= template.min_speed
+
+
+def attach(detector, manager):
+    """Recognizer for a mode whose gesture map has motion rules, fed by the detector; else None."""
+    names = manager.gestures.motion_names
+    if not names:
+        return None
+    detector.history = LandmarkHistory()
+    recognizer = MotionRecognizer(detector.history)
+    recognizer.subscribe(manager.queue_motion, names)
+    return recognizer
+
+
+def _hand_scale(landmarks):
+    """Wrist to middle MCP, px - motion is measured in hand lengths so distance to the camera cancels out."""
+    d = landmarks[MIDDLE_MCP, :2] - landmarks[WRIST, :2]
+    return math.hypot(float(d[0]), float(d[1]))
@@ -0,0 +1,197 @@
+# output.py - Asynchronous, state-diffing mouse / keyboard output
+#
+# Gesture code asks for output through the functions below instead of calling
+# pyautogui directly. Requests are diffed against the state we already put the
+# OS in (held keys, held buttons, pointer position), so a keyUp for a key that
+# is not down, or a move of less than a pixel, never leaves the process.
+# Once start() is called the remaining calls run on a dedicated output thread:
+# consecutive cursor moves collapse to the newest position and consecutive
+# scrolls are summed, so a slow OS call costs at most one stale move, never a
+# camera frame. Without start() every call is executed inline, which keeps
+# trace replay deterministic.
+
+import threading
+from collections import deque
+
+MIN_MOVE_PX = 1.0
+
+
+class OutputDispatcher:
+    def __init__(self, backend=None):
+        self._backend = backend          # pyautogui unless given; imported on first use
+        self._events = deque()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._stop = False
+        self._busy = False
+        self.error = None                # exception raised by the backend on the output thread; see check()
+
+        # What we have asked the OS for so far
+        self.keys_down = set()
+        self.buttons_down = set()
+        self.position = None
+
+        # Stats
+        self.sent = 0
+        self.coalesced = 0               # moves / scrolls merged into a newer one
+        self.suppressed = 0              # redundant transitions and sub-pixel moves
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            import pyautogui
+            self._backend = pyautogui
+        return self._backend
+
+    # ============================
+    # LIFECYCLE
+    # ============================
+    def start(self):
+        if self._thread is None:
+            self._stop = False
+            self._thread = threading.Thread(target=self._worker, name="output", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, release=True):
+        """Release everything we hold, drain the queue and stop the thread."""
+        if release:
+            self.release_all()
+        if self._thread is not None:
+            with self._cond:
+                self._stop = True
+                self._cond.notify_all()
+            self._thread.join(timeout=2)
+            self._thread = None
+
+    def flush(self, timeout=1.0):
+        """Wait until every queued event has reached the backend."""
+        with self._cond:
+            self._cond.wait_for(lambda: not self._events and not self._busy, timeout)
+
+    def check(self):
+        """
+        Re-raise (once) what the backend raised on the output thread, e.g.
+        pyautogui.FailSafeException. Called by the vision thread after each
+        frame; other threads that request output (the cursor timer) never see it.
+        """
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+
+    def release_all(self):
+        for key in list(self.keys_down):
+            self.key_up(key)
+        for button in list(self.buttons_down):
+            self.mouse_up(button)
+
+    def publish(self, metrics):
+        metrics.gauge("output_sent", self.sent)
+        metrics.gauge("output_coalesced", self.coalesced)
+        metrics.gauge("output_suppressed", self.suppressed)
+        metrics.gauge("output_queue", len(self._events))
+
+    # ============================
+    # REQUESTS (vision thread)
+    # ============================
+    def move_to(self, x, y):
+        x, y = float(x), float(y)
+        with self._cond:                 # the vision and cursor threads both move the pointer
+            if self.position is not None and abs(x - self.position[0]) < MIN_MOVE_PX \
+                    and abs(y - self.position[1]) < MIN_MOVE_PX:
+                self.suppressed += 1
+                return
+            self.position = (x, y)
+        self._put("moveTo", (x, y), merge="moveTo")
+
+    def scroll(self, amount):
+        if amount:
+            self._put("scroll", (int(amount),), merge="scroll")
+
+    def click(self, button="left"):
+        self._put("click", (), {"button": button})
+
+    def double_click(self):
+        self._put("doubleClick", ())
+
+    def mouse_down(self, button="left"):
+        if button in self.buttons_down:
+            self.suppressed += 1
+            return
+        self.buttons_down.add(button)
+        self._put("mouseDown", (), {"button": button})
+
+    def mouse_up(self, button="left"):
+        if button not in self.buttons_down:
+            self.suppressed += 1
+            return
+        self.buttons_down.discard(button)
+        self._put("mouseUp", (), {"button": button})
+
+    def key_down(self, key):
+        if key in self.keys_down:
+            self.suppressed += 1
+            return
+        self.keys_down.add(key)
+        self._put("keyDown", (key,))
+
+    def key_up(self, key):
+        if key not in self.keys_down:
+            self.suppressed += 1
+            return
+        self.keys_down.discard(key)
+        self._put("keyUp", (key,))
+
+    def press(self, key):
+        self._put("press", (key,))
+
+    def _put(self, name, args, kwargs=None, merge=None):
+        if self._thread is None:
+            self._call(name, args, kwargs)
+            return
+        with self._cond:
+            last = self._events[-1] if self._events else None
+            if merge and last is not None and last[0] == merge:
+                self.coalesced += 1
+                if merge == "scroll":
+                    args = (last[1][0] + args[0],)
+                self._events[-1] = (name, args, kwargs)
+            else:
+                self._events.append((name, args, kwargs))
+            self._cond.notify_all()
+
+    # ============================
+    # OUTPUT THREAD
+    # ============================
+    def _call(self, name, args, kwargs):
+        getattr(self.backend, name)(*args, **(kwargs or {}))
+        self.sent += 1
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                self._busy = False
+                self._cond.notify_all()
+                self._cond.wait_for(lambda: self._events or self._stop)
+                if not self._events:
+                    return
+                name, args, kwargs = self._events.popleft()
+                self._busy = True
+            try:
+                self._call(name, args, kwargs)
+            except Exception as e:
+                self.error = e
+
+
+dispatcher = OutputDispatcher()
+
+# Module-level shortcuts on the shared dispatcher
+move_to = dispatcher.move_to
+scroll = dispatcher.scroll
+click = dispatcher.click
+double_click = dispatcher.double_click
+mouse_down = dispatcher.mouse_down
+mouse_up = dispatcher.mouse_up
+key_down = dispatcher.key_down
+key_up = dispatcher.key_up
+press = dispatcher.press
@@ -0,0 +1,200 @@
+# pipeline.py - Stage sequence shared by the General, Game and Presentation pipelines
+#
+# A mode implements preprocess / extract / decide / render (and may override
+# to_rgb / infer); step() runs one camera frame through them and laps every
+# stage into self.metrics. activate() / close() bracket a period in which the
+# mode drives the mouse or keyboard; the resident runtime switches modes by
+# closing one and activating another, so both may be called many times.
+#
+# Frames larger than work_size are downscaled before preprocess; with an roi
+# (common.roi.RoiInference) the model instead sees crops of the full frame.
+# A scheduler (common.scheduler.LoadScheduler) or the idle monitor
+# (common.idle.IdleMonitor) may skip the model on a frame, in which case the
+# previous results are extracted again. A motion recognizer
+# (common.motion.MotionRecognizer) follows the hands across frames; modes
+# that use one update it in decide().
+#
+# fit / preprocess / to_rgb write into preallocated buffers (self.buffers), so
+# a frame reaches the model without a fresh full-frame array per stage. With
+# mirror_landmarks the model sees the unmirrored frame and the landmarks are
+# mirrored instead; the flipped image is then only needed for display.
+#
+# step_hands() is the same sequence for landmarks tracked by another process
+# (common.landmark_bus): no image, no model, straight to load_hands / decide.
+
+import inspect
+import time
+
+import cv2
+import numpy as np
+
+from common.buffers import FramePool
+from common.landmarks import mirror_results
+from common.metrics import NullMetrics
+from common import output
+from common.cursor_engine import engine as cursor_engine
+
+MODEL_ARGS = ("max_hands", "detection_con", "tracking_con", "model_complexity")
+
+
+def model_settings(cls):
+    """The mode's default (max_hands, detection_con, tracking_con, model_complexity)."""
+    params = inspect.signature(cls).parameters
+    return tuple(params[name].default for name in MODEL_ARGS)
+
+
+def load_hands_model(max_hands, detection_con, tracking_con, model_complexity):
+    """Build a Hands model and run it once so the first real frame is not slow."""
+    import mediapipe as mp
+    hands = mp.solutions.hands.Hands(
+        static_image_mode=False,
+        max_num_hands=max_hands,
+        model_complexity=model_complexity,
+        min_detection_confidence=detection_con,
+        min_tracking_confidence=tracking_con
+    )
+    hands.process(np.zeros((480, 640, 3), dtype=np.uint8))
+    return hands
+
+
+class ModePipeline:
+    name = "Mode"
+    metrics = NullMetrics()
+    captured = None  # time.monotonic() of the frame being decided, if known
+    work_size = (640, 480)  # gestures, overlay and preview run at this size
+    roi = None
+    scheduler = None
+    idle = None
+    motion = None
+    zone_margin = 0  # px around the active zone, where motion wakes an idle mode
+    mirror_landmarks = False
+    headless = False  # nothing displays img; with mirror_landmarks it is never flipped
+
+    @property
+    def buffers(self):
+        pool = self.__dict__.get("_buffers")
+        if pool is None:
+            pool = self._buffers = FramePool()
+        return pool
+
+    def fit(self, frame):
+        """Downscale a larger capture to the working size."""
+        h, w = frame.shape[:2]
+        if (w, h) == self.work_size:
+            return frame
+        dst = self.buffers.get("fit", (self.work_size[1], self.work_size[0]) + frame.shape[2:])
+        return self.buffers.keep("fit", cv2.resize(frame, self.work_size, dst=dst, interpolation=cv2.INTER_AREA))
+
+    def preprocess(self, frame):
+        dst = self.buffers.get("mirror", frame.shape)
+        return self.buffers.keep("mirror", cv2.flip(frame, 1, dst=dst))
+
+    def to_rgb(self, img):
+        dst = self.buffers.get("rgb", img.shape)
+        return self.buffers.keep("rgb", cv2.cvtColor(img, cv2.COLOR_BGR2RGB, dst=dst))
+
+    def infer(self, rgb):
+        self.detector.results = self.detector.hands.process(rgb)
+        return self.detector.results
+
+    def warm_up(self, width=640, height=480):
+        """One throwaway inference so the first camera frame does not pay for graph setup."""
+        if self.detector.hands is None:
+            return
+        self.infer(np.zeros((height, width, 3), dtype=np.uint8))
+        self.detector.results = None
+
+    def set_model(self, hands):
+        """Swap in another (warm) Hands model, e.g. a lighter one under load."""
+        self.detector.hands = hands
+        if self.roi is not None:
+            self.roi.hands = hands
+            self.roi.reset()
+
+    def extract(self, img):
+        raise NotImplementedError
+
+    def load_hands(self, landmarks, labels, scores, width, height, t=None):
+        """Stand-in for infer + extract when landmarks come from a recorded trace (t = capture time)"""
+        raise NotImplementedError
+
+    def decide(self, features, now=None):
+        raise NotImplementedError
+
+    def snapshot(self):
+        """What render() draws besides the frame, copied now; the preview thread draws it later."""
+        return None
+
+    def render(self, img, status, state=None):
+        return img
+
+    def activate(self):
+        pass
+
+    def close(self):
+        """Release every key / button the mode may be holding."""
+        pass
+
+    def step(self, frame, now=None, captured=None):
+        m = self.metrics
+        self.captured = captured
+        t = time.perf_counter()
+        small = self.fit(frame)
+        if not self.flips_frame():
+            img = small  # only its size and the (symmetric) active zone are used
+        else:
+            img = self.preprocess(small)
+        t = m.lap("preprocess", t)
+        inferred = (self.idle is None or self.idle.check(img, captured)) \
+            and (self.scheduler is None or self.scheduler.should_infer(self, captured))
+        if not inferred:
+            m.inc("inference_skipped")  # previous results are extracted again
+        elif self.roi is not None:
+            # Converts only the crop (or the small frame) it feeds the model
+            self.detector.results = self.roi.process(frame, img, captured)
+        elif self.mirror_landmarks:
+            rgb = self.to_rgb(small)
+            t = m.lap("color", t)
+            mirror_results(self.infer(rgb))
+        else:
+            rgb = self.to_rgb(img)
+            t = m.lap("color", t)
+            self.infer(rgb)
+        if inferred:
+            start, t = t, m.lap("inference", t)
+        features = self.extract(img)
+        if inferred and self.scheduler is not None:
+            self.scheduler.record(self, t - start)
+        if inferred and self.idle is not None:
+            self.idle.update(len(self.detector.landmarks), captured)
+        t = m.lap("landmarks", t)
+        m.gauge("hands", len(self.detector.landmarks))
+        status = self.decide(features, now)
+        m.lap("gestures", t)
+        m.inc("frames")
+        self.buffers.publish(m)
+        self.check_output()
+        return img, status
+
+    def step_hands(self, landmarks, labels, scores, width, height, now=None, captured=None):
+        """step() for pixel landmarks tracked elsewhere; returns the status."""
+        m = self.metrics
+        self.captured = captured
+        t = time.perf_counter()
+        features = self.load_hands(landmarks, labels, scores, width, height, captured)
+        t = m.lap("landmarks", t)
+        m.gauge("hands", len(self.detector.landmarks))
+        status = self.decide(features, now)
+        m.lap("gestures", t)
+        m.inc("frames")
+        self.check_output()
+        return status
+
+    def flips_frame(self):
+        """False when step() hands back the unmirrored frame: nothing shows it and the landmarks are mirrored."""
+        return not (self.headless and self.mirror_landmarks and self.roi is None)
+
+    def check_output(self):
+        """Raise here, on the vision thread, what output hit on its own threads."""
+        output.dispatcher.check()
+        cursor_engine.check()
@@ -0,0 +1,194 @@
+# preview.py - Preview window on its own thread, and shutdown without a window
+#
+# Drawing landmarks and text, cv2.imshow and cv2.waitKey used to run in the
+# gesture loop, so a slow window held back control. PreviewThread does all of
+# it on its own thread at a lower, fixed rate: when it is ready for a frame it
+# asks for one, the gesture loop copies the newest processed frame into the
+# preview buffer on its next submit(), and everything else is skipped. All
+# HighGUI calls happen on that one thread.
+#
+# The gesture loop goes on to the next frame while the preview draws, so the
+# mode's render() must not read its live state: submit() takes the mode's
+# snapshot() of it (landmarks, counters) along with the frame.
+#
+# Without a window (--headless) there is no key to quit on; on_shutdown_signal()
+# lets Ctrl+C / SIGTERM (Ctrl+Break on Windows) end the loop cleanly instead.
+
+import signal
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from common.metrics import NullMetrics
+
+PREVIEW_FPS = 15
+
+
+class PreviewThread:
+    def __init__(self, window, metrics=None, fps=PREVIEW_FPS, exit_keys=(27,)):
+        self.window = window
+        self.metrics = metrics or NullMetrics()
+        self.interval = 1.0 / fps
+        self.exit_keys = exit_keys
+        self.exit_requested = threading.Event()  # an exit key was pressed in the window
+
+        self._cond = threading.Condition()
+        self._stop = False
+        self._thread = None
+        self._want = False               # thread is ready for the next frame
+        self._frame = None               # preview buffer, owned by the thread once filled
+        self._status = None
+        self._render = None
+        self._state = None
+        self._fresh = False
+        self._title = None               # pending window title
+        self._hide = False               # pending destroyWindow
+
+        # Stats
+        self.shown = 0
+        self.submitted = 0
+
+    # ============================
+    # LIFECYCLE
+    # ============================
+    def start(self):
+        if self._thread is None:
+            self._stop = False
+            self._thread = threading.Thread(target=self._run, name="preview", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        with self._cond:
+            self._stop = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
+
+    def publish(self, metrics):
+        metrics.gauge("preview_frames", self.shown)
+
+    # ============================
+    # GESTURE LOOP SIDE
+    # ============================
+    def submit(self, img, status, render, snapshot=None):
+        """
+        Offer the newest frame; copied only when the preview is due for one,
+        together with snapshot(), which render(img, status, state) gets as state.
+        """
+        self.submitted += 1
+        with self._cond:
+            if not self._want:
+                return
+            if self._frame is None or self._frame.shape != img.shape:
+                self._frame = np.empty_like(img)
+            np.copyto(self._frame, img)
+            self._status, self._render = status, render
+            self._state = snapshot() if snapshot else None
+            self._want, self._fresh = False, True
+            self._cond.notify_all()
+
+    def set_title(self, title):
+        with self._cond:
+            self._title = title
+
+    def hide(self):
+        with self._cond:
+            self._hide = True
+            self._fresh = False
+
+    # ============================
+    # PREVIEW THREAD
+    # ============================
+    def _run(self):
+        visible = False
+        next_due = time.monotonic()
+        while True:
+            with self._cond:
+                self._want = True
+                self._cond.wait_for(lambda: self._fresh or self._stop or self._hide, timeout=0.1)
+                if self._stop:
+                    break
+                fresh, self._fresh = self._fresh, False
+                hide, self._hide = self._hide, False
+                title = None
+                if fresh:
+                    title, self._title = self._title, None
+
+            if hide and visible:
+                cv2.destroyWindow(self.window)
+                cv2.waitKey(1)
+                visible = False
+            if fresh:
+                t = time.perf_counter()
+                self._render(self._frame, self._status, self._state)
+                t = self.metrics.lap("overlay", t)
+                cv2.imshow(self.window, self._frame)
+                if title:
+                    cv2.setWindowTitle(self.window, title)
+                self.metrics.lap("display", t)
+                self.shown += 1
+                visible = True
+
+            if visible:
+                # waitKey both pumps the window and paces the preview
+                next_due = max(next_due + self.interval, time.monotonic())
+                key = cv2.waitKey(max(1, int((next_due - time.monotonic()) * 1000)))
+                if key != -1 and (key & 0xFF) in self.exit_keys:
+                    self.exit_requested.set()
+        if visible:
+            cv2.destroyWindow(self.window)
+            cv2.waitKey(1)
+
+
+# ============================
+# DRAWING
+# ============================
+HAND_CONNECTIONS = [
+    (0, 1), (1, 2), (2, 3), (3, 4),              # thumb
+    (0, 5), (5, 6), (6, 7), (7, 8),              # index
+    (9, 10), (10, 11), (11, 12),                 # middle
+    (13, 14), (14, 15), (15, 16),                # ring
+    (0, 17), (17, 18), (18, 19), (19, 20),       # pinky
+    (5, 9), (9, 13), (13, 17),                   # palm
+]
+
+
+def draw_hands(img, landmarks):
+    """Pixel landmarks (hands, 21, 3) as MediaPipe draws them: grey bones, red joints."""
+    for hand in landmarks[:, :, :2].astype(int):
+        points = [tuple(p) for p in hand]
+        for a, b in HAND_CONNECTIONS:
+            cv2.line(img, points[a], points[b], (224, 224, 224), 2)
+        for p in points:
+            cv2.circle(img, p, 2, (0, 0, 255), 2)
+    return img
+
+
+# ============================
+# SHUTDOWN
+# ============================
+def on_shutdown_signal(callback):
+    """Call callback() on Ctrl+C / SIGTERM (and Ctrl+Break on Windows) instead of raising."""
+    def handler(signum, frame):
+        callback()
+    for name in ("SIGINT", "SIGTERM", "SIGBREAK"):
+        if hasattr(signal, name):
+            signal.signal(getattr(signal, name), handler)
+
+
+def add_arguments(parser):
+    parser.add_argument("--headless", action="store_true",
+                        help="No preview window; stop with Ctrl+C / SIGTERM instead of a key")
+    parser.add_argument("--preview-fps", type=float, default=PREVIEW_FPS,
+                        help=f"Preview window refresh rate (default {PREVIEW_FPS})")
+
+
+def from_args(args, window, metrics=None, exit_keys=(27,)):
+    """Started PreviewThread, or None when running headless."""
+    if args.headless:
+        return None
+    return PreviewThread(window, metrics, args.preview_fps, exit_keys).start()
@@ -0,0 +1,164 @@
+# roi.py - High-resolution capture with hand-sized inference crops
+#
+# MediaPipe letterboxes whatever it is given down to its palm detector's input,
+# so a 1080p frame buys no detection reach over a downscaled copy, while the
+# landmark stage does gain from every pixel around the hand - which is what a
+# presenter three metres from the camera is short of. RoiInference therefore
+# searches for hands on the small working frame and, once they are found, runs
+# the model on one crop of the full-resolution capture around them, placed
+# where the previous box and its velocity say the hands will be next.
+# Landmarks are mapped back to full-frame normalized coordinates in place, so
+# features, drawing and traces see ordinary results.
+
+import time
+
+import cv2
+
+from common.landmarks import landmarks_to_array
+
+CROP_SCALE = 2.0        # crop side / side of the box around the tracked hands
+CROP_MIN = 160          # px of the capture frame
+CROP_MAX = 640          # larger crops are downscaled to this before inference
+MAX_COVER = 0.7         # a crop wider than this share of the frame is not worth it
+SEARCH_EVERY = 30       # frames between whole-frame searches while a hand may be missing
+VELOCITY_SMOOTHING = 0.5
+LOST_AFTER = 0.25       # s without a fresh box before the prediction is dropped
+
+
+def parse_size(text):
+    """'1280x720' -> (1280, 720), for argparse."""
+    w, sep, h = text.lower().partition("x")
+    if not sep or not w.isdigit() or not h.isdigit():
+        raise ValueError(f"expected WIDTHxHEIGHT, got {text!r}")
+    return int(w), int(h)
+
+
+class RoiInference:
+    def __init__(self, hands, max_hands=2, clock=time.monotonic):
+        self.hands = hands               # mediapipe Hands instance
+        self.max_hands = max_hands
+        self.clock = clock
+        self.reset()
+
+        # Stats
+        self.crops = 0
+        self.searches = 0
+        self.misses = 0                  # crops that lost the hands and fell back to a search
+
+    def reset(self):
+        self.box = None                  # (cx, cy, side) around all tracked hands, capture px
+        self.velocity = (0.0, 0.0)
+        self.tracked = 0
+        self.t = None
+        self.since_search = 0
+
+    def publish(self, metrics):
+        metrics.gauge("roi_crops", self.crops)
+        metrics.gauge("roi_searches", self.searches)
+        metrics.gauge("roi_misses", self.misses)
+
+    def process(self, frame, small, t=None):
+        """
+        frame: raw (unmirrored) BGR capture frame
+        small: the mirrored working-size frame the mode displays
+        t:     capture time; now if None
+        Returns mediapipe results in mirrored full-frame normalized coordinates.
+        """
+        t = self.clock() if t is None else t
+        h, w = frame.shape[:2]
+        results = None
+        region = self.predict(t, w, h)
+        searching = self.tracked < self.max_hands and self.since_search >= SEARCH_EVERY
+        if region is not None and not searching:
+            results = self._crop(frame, region)
+            if not results.multi_hand_landmarks:
+                self.misses += 1
+                results = None
+        if results is None:
+            results = self._search(small)
+        self._track(results, t, w, h)
+        return results
+
+    # ============================
+    # PREDICTION
+    # ============================
+    def predict(self, t, width, height):
+        """(x, y, w, h) crop of the mirrored frame for time t, or None to search."""
+        if self.box is None or t - self.t > LOST_AFTER:
+            return None
+        dt = max(t - self.t, 0.0)
+        cx = self.box[0] + self.velocity[0] * dt
+        cy = self.box[1] + self.velocity[1] * dt
+        side = max(self.box[2] * CROP_SCALE, CROP_MIN)
+        if side > MAX_COVER * width:
+            return None
+        cw, ch = int(side), int(min(side, height))
+        x = int(min(max(cx - cw / 2, 0), width - cw))
+        y = int(min(max(cy - ch / 2, 0), height - ch))
+        return x, y, cw, ch
+
+    def _track(self, results, t, width, height):
+        lm = landmarks_to_array(results, width, height)
+        if not len(lm):
+            self.reset()
+            return
+        lo = lm[:, :, :2].reshape(-1, 2).min(axis=0)
+        hi = lm[:, :, :2].reshape(-1, 2).max(axis=0)
+        cx, cy = (lo + hi) / 2
+        box = (float(cx), float(cy), float((hi - lo).max()))
+        if self.box is not None and len(lm) == self.tracked and 0 < t - self.t <= LOST_AFTER:
+            dt = t - self.t
+            a = VELOCITY_SMOOTHING
+            self.velocity = (a * (box[0] - self.box[0]) / dt + (1 - a) * self.velocity[0],
+                             a * (box[1] - self.box[1]) / dt + (1 - a) * self.velocity[1])
+        else:
+            self.velocity = (0.0, 0.0)  # new hand or a gap: the box jumped, not the hand
+        self.box = box
+        self.tracked = len(lm)
+        self.t = t
+
+    # ============================
+    # INFERENCE
+    # ============================
+    def _search(self, small):
+        self.searches += 1
+        self.since_search = 0
+        return self.hands.process(cv2.cvtColor(small, cv2.COLOR_BGR2RGB))
+
+    def _crop(self, frame, region):
+        self.crops += 1
+        self.since_search += 1
+        x, y, cw, ch = region
+        h, w = frame.shape[:2]
+        # Region is in mirrored coordinates; cut from the raw frame and mirror just the crop
+        crop = frame[y:y + ch, w - x - cw:w - x]
+        if max(cw, ch) > CROP_MAX:
+            scale = CROP_MAX / max(cw, ch)
+            crop = cv2.resize(crop, (int(cw * scale), int(ch * scale)), interpolation=cv2.INTER_AREA)
+        rgb = cv2.cvtColor(cv2.flip(crop, 1), cv2.COLOR_BGR2RGB)
+        results = self.hands.process(rgb)
+
+        # Crop-normalized -> frame-normalized (z is scaled like x)
+        sx, sy, ox, oy = cw / w, ch / h, x / w, y / h
+        for hand in results.multi_hand_landmarks or ():
+            for lm in hand.landmark:
+                lm.x = ox + lm.x * sx
+                lm.y = oy + lm.y * sy
+                lm.z *= sx
+        return results
+
+
+# ============================
+# COMMAND LINE
+# ============================
+def add_arguments(parser):
+    parser.add_argument("--capture", type=parse_size, metavar="WxH",
+                        help="Capture resolution, e.g. 1280x720 or 1920x1080; hands are then tracked in "
+                             "full-resolution crops while gestures and preview stay at the working size")
+
+
+def from_args(args, mode):
+    """RoiInference for the mode's model when a capture size was given, else None."""
+    if not args.capture or mode.detector.hands is None:
+        return None
+    return RoiInference(mode.detector.hands)
@@ -0,0 +1,242 @@
+# scheduler.py - Keep a mode inside a CPU / latency budget
+#
+# LoadScheduler sits in ModePipeline.step() and decides, per frame, whether the
+# hand model runs at all:
+#   - a hand that barely moved between the last two inferences is not looked
+#     at again for a couple of frames; the filtered landmarks are reused
+#   - under pressure the pipeline walks down LEVELS: first the lighter model
+#     (complexity 0), then a lower inference rate; once the pressure has been
+#     gone for a while it walks back up, one level at a time
+# Pressure is inference latency over budget, process CPU over budget, or a hot
+# CPU (Linux thermal zones). Every level change is logged with its reason.
+
+import glob
+import os
+import threading
+import time
+
+import numpy as np
+
+from common.pipeline import load_hands_model, model_settings
+
+# (model complexity, max inferences per second or None for every frame)
+LEVELS = [(1, None), (0, None), (0, 20), (0, 15), (0, 10)]
+EVAL_INTERVAL = 1.0     # s between load checks
+RELAX_AFTER = 5.0       # s of headroom before stepping back up
+HEADROOM = 0.7          # "no pressure" = below this share of every budget
+TEMP_LIMIT = 85.0       # degrees C
+STILL_SPEED = 40.0      # px/s: fastest landmark of a hand that counts as still
+MAX_STILL_SKIPS = 2     # consecutive frames a still hand may go uninferred
+THERMAL_ZONES = "/sys/class/thermal/thermal_zone*/temp"
+
+
+def cpu_temperature():
+    """Hottest thermal zone in degrees C, or None where it cannot be read."""
+    temps = []
+    for path in glob.glob(THERMAL_ZONES):
+        try:
+            with open(path) as f:
+                temps.append(int(f.read()) / 1000.0)
+        except (OSError, ValueError):
+            continue
+    return max(temps) if temps else None
+
+
+class LoadScheduler:
+    def __init__(self, budget_ms=None, cpu_budget=None, log=print, clock=time.monotonic):
+        self.budget = budget_ms / 1000.0 if budget_ms else None   # s of inference per frame
+        self.cpu_budget = cpu_budget                               # % of one core, e.g. 150
+        self.log = log
+        self.clock = clock
+        self.level = 0
+        self.reason = "start"
+
+        self._models = {}                # (settings) -> Hands, complexity included
+        self._settings = {}              # mode class -> its default model settings
+        self._loading = set()
+        self._lock = threading.Lock()
+
+        self._last_infer = None          # capture time of the last inference
+        self._last_landmarks = None      # its extract() output
+        self._prev_infer = None          # the inference before it, for the hand's speed
+        self._prev_landmarks = None
+        self._still_skips = 0
+        self._latency = 0.0              # EMA of inference time, s
+        self._window_start = None
+        self._cpu_start = 0.0
+        self._calm_since = None
+
+        # Stats
+        self.inferred = 0
+        self.skipped_still = 0
+        self.skipped_rate = 0
+        self.changes = 0
+
+    @property
+    def complexity(self):
+        return LEVELS[self.level][0]
+
+    @property
+    def min_interval(self):
+        rate = LEVELS[self.level][1]
+        return 1.0 / rate if rate else 0.0
+
+    def publish(self, metrics):
+        metrics.gauge("scheduler_level", self.level)
+        metrics.gauge("model_complexity", self.complexity)
+        metrics.gauge("inference_skipped_still", self.skipped_still)
+        metrics.gauge("inference_skipped_rate", self.skipped_rate)
+
+    def reset(self):
+        """Forget the last inference, e.g. when another mode takes over."""
+        self._last_infer = self._last_landmarks = None
+        self._prev_infer = self._prev_landmarks = None
+        self._still_skips = 0
+
+    # ============================
+    # PER FRAME (vision thread)
+    # ============================
+    def should_infer(self, pipeline, t=None):
+        """False = reuse the last landmarks for this frame."""
+        t = self.clock() if t is None else t
+        self._evaluate(t)
+        self._swap_model(pipeline)
+
+        if self._last_infer is not None:
+            dt = t - self._last_infer
+            if dt < self.min_interval:
+                self.skipped_rate += 1
+                return False
+            if self._still_skips < MAX_STILL_SKIPS and self._is_still():
+                self._still_skips += 1
+                self.skipped_still += 1
+                return False
+        self._still_skips = 0
+        self._prev_infer, self._prev_landmarks = self._last_infer, self._last_landmarks
+        self._last_infer = t
+        self._last_landmarks = None     # taken after extract, see record()
+        return True
+
+    def record(self, pipeline, seconds):
+        """Inference time of a frame that was inferred; landmarks are its extract() output."""
+        self.inferred += 1
+        self._latency += 0.2 * (seconds - self._latency)
+        self._last_landmarks = pipeline.detector.landmarks.copy()
+
+    def _is_still(self):
+        """
+        Speed between the last two inferences. Until this frame is extracted the
+        detector still holds the last inference's landmarks, so that is the
+        newest motion there is to measure.
+        """
+        last, prev = self._last_landmarks, self._prev_landmarks
+        if last is None or prev is None or not len(last) or last.shape != prev.shape:
+            return False
+        dt = self._last_infer - self._prev_infer
+        if dt <= 0:
+            return False
+        speed = np.abs(last[:, :, :2] - prev[:, :, :2]).max() / dt
+        return speed < STILL_SPEED
+
+    # ============================
+    # LOAD CONTROL
+    # ============================
+    def _evaluate(self, t):
+        if self._window_start is None:
+            self._window_start, self._cpu_start = t, sum(os.times()[:2])
+            return
+        elapsed = t - self._window_start
+        if elapsed < EVAL_INTERVAL:
+            return
+        cpu_now = sum(os.times()[:2])
+        cpu = 100.0 * (cpu_now - self._cpu_start) / elapsed
+        self._window_start, self._cpu_start = t, cpu_now
+        temp = cpu_temperature()
+
+        over = []
+        if self.budget and self._latency > self.budget:
+            over.append(f"inference {self._latency * 1000:.0f}ms > {self.budget * 1000:.0f}ms")
+        if self.cpu_budget and cpu > self.cpu_budget:
+            over.append(f"cpu {cpu:.0f}% > {self.cpu_budget:.0f}%")
+        if temp is not None and temp > TEMP_LIMIT:
+            over.append(f"temperature {temp:.0f}C > {TEMP_LIMIT:.0f}C")
+
+        if over:
+            self._calm_since = None
+            if self.level < len(LEVELS) - 1:
+                self._set_level(self.level + 1, ", ".join(over))
+            return
+
+        calm = (not self.budget or self._latency < HEADROOM * self.budget) \
+            and (not self.cpu_budget or cpu < HEADROOM * self.cpu_budget) \
+            and (temp is None or temp < TEMP_LIMIT - 5)
+        if not calm or self.level == 0:
+            self._calm_since = None
+            return
+        if self._calm_since is None:
+            self._calm_since = t
+        elif t - self._calm_since >= RELAX_AFTER:
+            self._calm_since = t
+            self._set_level(self.level - 1, f"headroom for {RELAX_AFTER:.0f}s (cpu {cpu:.0f}%, "
+                                            f"inference {self._latency * 1000:.0f}ms)")
+
+    def _set_level(self, level, reason):
+        old = LEVELS[self.level]
+        self.level, self.reason = level, reason
+        self.changes += 1
+        complexity, rate = LEVELS[level]
+        self.log(f"[scheduler] level {level}: complexity {old[0]}->{complexity}, "
+                 f"rate {old[1] or 'every frame'}->{rate or 'every frame'} ({reason})")
+
+    # ============================
+    # MODELS
+    # ============================
+    def _swap_model(self, pipeline):
+        """Put the current level's model into the pipeline once it is loaded."""
+        detector = pipeline.detector
+        if detector.hands is None:
+            return
+        cls = type(pipeline)
+        if cls not in self._settings:
+            self._settings[cls] = model_settings(cls)
+            with self._lock:
+                self._models.setdefault(self._settings[cls], detector.hands)  # the one it came with
+        settings = self._settings[cls][:3] + (self.complexity,)
+        with self._lock:
+            model = self._models.get(settings)
+        if model is None:
+            self._load(settings)
+        elif model is not detector.hands:
+            pipeline.set_model(model)
+            self.log(f"[scheduler] {pipeline.name}: now running model complexity {self.complexity}")
+
+    def _load(self, settings):
+        with self._lock:
+            if settings in self._loading:
+                return
+            self._loading.add(settings)
+
+        def load():
+            model = load_hands_model(*settings)   # off the vision thread; the old model keeps running
+            with self._lock:
+                self._models[settings] = model
+                self._loading.discard(settings)
+
+        threading.Thread(target=load, name="model-load", daemon=True).start()
+
+
+# ============================
+# COMMAND LINE
+# ============================
+def add_arguments(parser):
+    parser.add_argument("--budget-ms", type=float, metavar="MS",
+                        help="Inference latency budget; over it the model and frame rate are scaled down")
+    parser.add_argument("--cpu-budget", type=float, metavar="PCT",
+                        help="Process CPU budget in %% of one core (e.g. 150); over it the load is scaled down")
+
+
+def from_args(args):
+    """LoadScheduler when a budget was given, else None."""
+    if not args.budget_ms and not args.cpu_budget:
+        return None
+    return LoadScheduler(args.budget_ms, args.cpu_budget)
@@ -0,0 +1,63 @@
+# telemetry.py - Stream a compact performance snapshot to the launcher
+#
+# A mode started by the launcher gets --telemetry-port; twice a second a daemon
+# thread turns the mode's Metrics registry into one small JSON datagram (FPS,
+# inference percentiles, dropped frames, hands, CPU%) and sends it over UDP to
+# 127.0.0.1. UDP keeps the mode from ever blocking on a slow or absent reader.
+
+import json
+import os
+import socket
+import threading
+import time
+
+INTERVAL = 0.5
+
+
+def snapshot(metrics, prev, interval):
+    """One telemetry record from the registry; prev carries the last counters."""
+    now = time.perf_counter()
+    cpu = sum(os.times()[:2])  # user + system time of this process
+    frames = metrics.counters.get("frames", 0)
+    elapsed = now - prev.get("t", now - interval) or interval
+
+    p50, p95, p99 = (v * 1000 for v in metrics.histograms["inference"].percentiles())
+    record = {
+        "fps": round((frames - prev.get("frames", frames)) / elapsed, 1),
+        "inference_ms": [round(p50, 2), round(p95, 2), round(p99, 2)],
+        "dropped": metrics.gauges.get("capture_dropped", 0),
+        "hands": metrics.gauges.get("hands", 0),
+        "cpu": round(100.0 * (cpu - prev.get("cpu", cpu)) / elapsed, 1),
+        "frames": frames,
+    }
+    prev.update(t=now, cpu=cpu, frames=frames)
+    return record
+
+
+class TelemetrySender:
+    def __init__(self, metrics, port, host="127.0.0.1", interval=INTERVAL):
+        self.metrics = metrics
+        self.address = (host, port)
+        self.interval = interval
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="telemetry", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        prev = {}
+        snapshot(self.metrics, prev, self.interval)  # prime the deltas
+        while not self._stop.wait(self.interval):
+            self.send(snapshot(self.metrics, prev, self.interval))  # launcher gone -> dropped
+
+    def send(self, record):
+        """Send one event record (e.g. a mode switch) right away."""
+        try:
+            self.sock.sendto(json.dumps(record, separators=(",", ":")).encode(), self.address)
+        except OSError:
+            pass
+
+    def close(self):
+        self._stop.set()
+        self._thread.join(timeout=1.0)
+        self.sock.close()
@@ -0,0 +1,133 @@
+# trace.py - Compact landmark trace files: record live, replay without a camera
+#
+# A trace is a 32-byte header followed by fixed-size records, one per processed
+# frame, appended as they happen. Because every record has the same layout the
+# file can be memory-mapped straight into a structured NumPy array.
+
+import os
+import struct
+
+import numpy as np
+
+from common.landmarks import NUM_LANDMARKS, landmarks_to_array, handedness_from_results
+
+MAGIC = b"AIRTRACE"
+VERSION = 1
+MAX_HANDS = 2
+HEADER = struct.Struct("<8sHHII12x")  # magic, version, max hands, frame width, frame height
+LABELS = ["Left", "Right"]            # stored as 0 / 1, -1 = unknown or empty slot
+
+TRACE_DTYPE = np.dtype([
+    ("t", "<f8"),                                      # capture time (time.monotonic)
+    ("n", "u1"),                                       # hands in this frame
+    ("handedness", "i1", (MAX_HANDS,)),
+    ("score", "<f4", (MAX_HANDS,)),
+    ("landmarks", "<f4", (MAX_HANDS, NUM_LANDMARKS, 3)),  # normalized x, y, z
+])
+
+
+class TraceWriter:
+    def __init__(self, path, width, height, flush_every=30):
+        self.path = path
+        self.width = width
+        self.height = height
+        self.flush_every = flush_every
+        self.count = 0
+
+        exists = os.path.exists(path) and os.path.getsize(path) >= HEADER.size
+        if exists:
+            read_header(path)  # refuse to append to something that is not a trace
+        self._file = open(path, "ab")
+        if not exists:
+            self._file.write(HEADER.pack(MAGIC, VERSION, MAX_HANDS, width, height))
+        self._record = np.zeros(1, dtype=TRACE_DTYPE)
+
+    def write(self, t, landmarks, labels=(), scores=()):
+        """Append one frame. landmarks: normalized (hands, 21, 3) array."""
+        pack_record(self._record[0], t, landmarks, labels, scores)
+        self.write_record(self._record)
+
+    def write_record(self, rec):
+        """Append one TRACE_DTYPE record as it is, e.g. straight from the landmark bus."""
+        self._file.write(memoryview(rec).cast("B"))
+        self.count += 1
+        if self.count % self.flush_every == 0:
+            self._file.flush()
+
+    def write_results(self, t, results):
+        """Append one frame straight from a MediaPipe result."""
+        labels, scores = handedness_from_results(results)
+        self.write(t, landmarks_to_array(results, 1, 1), labels, scores)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def pack_record(rec, t, landmarks, labels=(), scores=()):
+    """Fill one TRACE_DTYPE record in place. landmarks: normalized (hands, 21, 3) array."""
+    n = min(len(landmarks), MAX_HANDS)
+    rec["t"] = t
+    rec["n"] = n
+    rec["handedness"] = -1
+    rec["score"] = 0.0
+    rec["landmarks"] = 0.0
+    rec["landmarks"][:n] = landmarks[:n]
+    for i in range(min(n, len(labels))):
+        rec["handedness"][i] = LABELS.index(labels[i]) if labels[i] in LABELS else -1
+        rec["score"][i] = scores[i] if i < len(scores) else 0.0
+
+
+def unpack_record(rec, scale):
+    """(t, landmarks, labels, scores) of one record; scale = (width, height, width) float32."""
+    n = int(rec["n"])
+    landmarks = rec["landmarks"][:n] * scale  # fresh, writable copy
+    labels = [LABELS[h] if h >= 0 else "Unknown" for h in rec["handedness"][:n]]
+    return float(rec["t"]), landmarks, labels, rec["score"][:n].tolist()
+
+
+def read_header(path):
+    with open(path, "rb") as f:
+        raw = f.read(HEADER.size)
+    if len(raw) < HEADER.size:
+        raise ValueError(f"{path}: too short to be a landmark trace")
+    magic, version, max_hands, width, height = HEADER.unpack(raw)
+    if magic != MAGIC:
+        raise ValueError(f"{path}: not a landmark trace")
+    if version != VERSION or max_hands != MAX_HANDS:
+        raise ValueError(f"{path}: unsupported trace version {version} ({max_hands} hands)")
+    return {"version": version, "width": width, "height": height}
+
+
+def open_trace(path):
+    """Return (header, records) - records is a read-only structured memmap."""
+    header = read_header(path)
+    count = (os.path.getsize(path) - HEADER.size) // TRACE_DTYPE.itemsize  # ignore a torn last record
+    if count == 0:
+        return header, np.zeros(0, dtype=TRACE_DTYPE)
+    records = np.memmap(path, dtype=TRACE_DTYPE, mode="r", offset=HEADER.size, shape=(count,))
+    return header, records
+
+
+class TraceReplay:
+    """Iterate a trace as (t, landmarks, labels, scores) with landmarks in pixels."""
+
+    def __init__(self, path, width=None, height=None):
+        self.header, self.records = open_trace(path)
+        self.width = width or self.header["width"]
+        self.height = height or self.header["height"]
+        self._scale = np.array((self.width, self.height, self.width), dtype=np.float32)
+
+    def __len__(self):
+        return len(self.records)
+
+    def __iter__(self):
+        for rec in self.records:
+            yield unpack_record(rec, self._scale)
+
+    @property
+    def duration(self):
+        if len(self.records) < 2:
+            return 0.0
+        return float(self.records["t"][-1] - self.records["t"][0])
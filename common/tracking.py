@@ -0,0 +1,159 @@
+# tracking.py - Stable hand IDs across frames
+#
+# MediaPipe reports hands in no particular order, and its Left / Right label
+# flickers, most of all when a hand turns side-on or two hands cross. Anything
+# keyed by that label - filter state, a drag, a scroll's velocity - jumps
+# when it flips.
+#
+# HandTracker gives every hand a track ID that lasts as long as the hand
+# stays in view (or leaves for less than LOST_AFTER). Each frame the palm
+# centre of every detected hand is matched to the tracks' predicted
+# positions (last position + velocity * dt): the assignment with the lowest
+# total distance in hand lengths, where a detection further than GATE hand
+# lengths from a track cannot take it and starts a new track instead. When
+# every hand's nearest track is a different one that is the answer;
+# otherwise, with at most a handful of hands, every assignment is tried.
+#
+# Handedness becomes a property of the track: an exponentially smoothed vote
+# of the model's labels weighted by their scores, so one misread frame does
+# not flip it. A label that disagrees with a track's vote adds LABEL_COST to
+# the match, which breaks ties when two hands pass close to each other.
+
+import itertools
+import math
+import time
+
+import numpy as np
+
+from common.landmarks import PALM, WRIST, MIDDLE_MCP
+
+GATE = 2.0               # hand lengths from the predicted position a detection may match
+LABEL_COST = 0.5         # hand lengths added when a detection's label disagrees with the track
+VOTE_RATE = 0.15         # weight of one frame's label in a track's handedness vote
+VELOCITY_SMOOTHING = 0.5 # weight of one frame's motion in a track's velocity
+LOST_AFTER = 0.5         # s a track survives without a detection
+MIN_SCALE = 20.0         # px; hand length floor, so a tiny or edge-on hand still has a gate
+
+
+class Track:
+    __slots__ = ("id", "center", "velocity", "scale", "vote", "t", "frames")
+
+    def __init__(self, track_id, center, scale, vote, t):
+        self.id = track_id
+        self.center = center
+        self.velocity = np.zeros(2)
+        self.scale = scale
+        self.vote = vote          # -1 = surely Left .. +1 = surely Right
+        self.t = t
+        self.frames = 1
+
+    @property
+    def label(self):
+        return "Right" if self.vote >= 0 else "Left"
+
+
+class HandTracker:
+    def __init__(self, gate=GATE, label_cost=LABEL_COST, vote_rate=VOTE_RATE, lost_after=LOST_AFTER,
+                 clock=time.monotonic):
+        self.gate = gate
+        self.label_cost = label_cost
+        self.vote_rate = vote_rate
+        self.lost_after = lost_after
+        self.clock = clock
+        self.tracks = []
+        self._next_id = 1
+
+        # Stats
+        self.created = 0
+        self.relabelled = 0   # frames where the model's label disagreed with the track's
+
+    def reset(self):
+        self.tracks = []
+
+    def update(self, landmarks, labels, scores=(), t=None):
+        """
+        landmarks: (hands, 21, 3) pixel array; labels / scores: the model's handedness per hand
+        Returns (ids, labels): a track ID and the track's smoothed label per hand, in input order.
+        """
+        t = self.clock() if t is None else t
+        self.tracks = [tr for tr in self.tracks if t - tr.t <= self.lost_after]
+        n = len(landmarks)
+        if n == 0:
+            return [], []
+
+        centers = landmarks[:, PALM, :2].sum(axis=1, dtype=np.float64) / len(PALM)
+        spans = landmarks[:, MIDDLE_MCP, :2] - landmarks[:, WRIST, :2]
+        scales = np.maximum(np.hypot(spans[:, 0], spans[:, 1]), MIN_SCALE)
+        votes = [(1.0 if label == "Right" else -1.0) * (scores[i] if i < len(scores) else 1.0)
+                 for i, label in enumerate(labels)]
+        votes += [0.0] * (n - len(votes))
+
+        assigned = self._assign(centers, votes, t)
+        out = []
+        for i in range(n):
+            track = assigned[i]
+            if track is None:
+                track = Track(self._next_id, centers[i], float(scales[i]), votes[i], t)
+                self._next_id += 1
+                self.created += 1
+                self.tracks.append(track)
+            else:
+                dt = t - track.t
+                if dt > 0:
+                    v = (centers[i] - track.center) / dt
+                    track.velocity += VELOCITY_SMOOTHING * (v - track.velocity)
+                if (votes[i] >= 0) != (track.vote >= 0):
+                    self.relabelled += 1
+                track.vote += self.vote_rate * (votes[i] - track.vote)
+                track.center = centers[i]
+                track.scale = float(scales[i])
+                track.t = t
+                track.frames += 1
+            out.append(track)
+        return [tr.id for tr in out], self._labels(out)
+
+    def _assign(self, centers, votes, t):
+        """Detection index -> Track (None = new track), minimising the total cost."""
+        n, tracks = len(centers), self.tracks
+        if not tracks:
+            return [None] * n
+        # A few hands and tracks: plain floats are cheaper than NumPy calls here
+        predicted = [(tr.center + tr.velocity * (t - tr.t)).tolist() for tr in tracks]
+        rows = []
+        for (x, y), vote in zip(centers.tolist(), votes):
+            row = []
+            for (px, py), tr in zip(predicted, tracks):
+                d = math.hypot(x - px, y - py) / tr.scale
+                if d > self.gate:
+                    row.append(math.inf)
+                elif vote != 0 and (vote >= 0) != (tr.vote >= 0):
+                    row.append(d + self.label_cost)
+                else:
+                    row.append(d)
+            rows.append(row)
+
+        # Each hand's cheapest option (a track, or a new one at the gate's cost); if no two
+        # hands want the same track that is the best assignment there is
+        picked = []
+        for row in rows:
+            j = min(range(len(row)), key=row.__getitem__)
+            picked.append(j if row[j] <= self.gate else None)
+        taken = [j for j in picked if j is not None]
+        if len(taken) == len(set(taken)):
+            return [None if j is None else tracks[j] for j in picked]
+
+        rows = [row + [self.gate] * n for row in rows]   # extra columns: start a new track
+        best, best_cost = None, math.inf
+        for columns in itertools.permutations(range(len(rows[0])), n):
+            total = sum(row[c] for row, c in zip(rows, columns))
+            if total < best_cost:
+                best, best_cost = columns, total
+        return [tracks[c] if c < len(tracks) else None for c in best]
+
+    def _labels(self, tracks):
+        """Smoothed labels; two hands never share one - the less certain track gives way."""
+        labels = [tr.label for tr in tracks]
+        if len(tracks) == 2 and labels[0] == labels[1]:
+            weaker = 0 if abs(tracks[0].vote) < abs(tracks[1].vote) else 1
+            labels[weaker] = "Left" if labels[weaker] == "Right" else "Right"
+        return labels
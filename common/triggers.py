@@ -0,0 +1,95 @@
+# triggers.py - One-shot actions (clicks, slide changes) that fire on evidence, not on a timer
+#
+# A pose that triggers a discrete action used to fire on the first frame it
+# was seen and then wait out a fixed cooldown: one misread frame was enough
+# to click, and a deliberate second click had to wait for the timer.
+#
+# A PoseTrigger instead accumulates evidence while its pose is seen (1 after
+# RISE seconds of it, and never from a single frame) and loses it while it is
+# not (0 after FALL seconds). It fires once when the evidence reaches 1 and
+# re-arms only when it is back at 0, i.e. when the pose has really been let
+# go - a frame of flicker neither fires nor re-arms it. Evidence is measured
+# in seconds of capture time, so the behaviour barely depends on the frame
+# rate.
+#
+# A manager keeps one TriggerSet: begin(now) once per frame, fire(name) from
+# the action that won the frame, end() after dispatch so every trigger whose
+# pose was not seen decays. benchmarks/trigger_eval.py compares this with the
+# old cooldowns on recorded traces.
+
+RISE = 0.06       # s of a pose before its action fires
+FALL = 0.1        # s without it before it can fire again
+MAX_GAIN = 0.5    # most evidence one frame can add: at least two frames to fire
+MAX_DT = 0.1      # s; longer frame gaps (idle, a stall) count as this much
+
+
+class PoseTrigger:
+    def __init__(self, rise=RISE, fall=FALL):
+        self.rise = rise
+        self.fall = fall
+        self.evidence = 0.0
+        self.armed = True
+
+    def reset(self):
+        self.evidence = 0.0
+        self.armed = True
+
+    def update(self, seen, dt):
+        """Add dt seconds of (not) seeing the pose; True on the frame the action should fire."""
+        if seen:
+            self.evidence = min(1.0, self.evidence + min(dt / self.rise, MAX_GAIN))
+        else:
+            self.evidence = max(0.0, self.evidence - dt / self.fall)
+        if not self.armed:
+            self.armed = self.evidence <= 0.0
+            return False
+        if self.evidence >= 1.0 - 1e-6:   # three frames of a third are enough
+            self.armed = False
+            return True
+        return False
+
+
+class TriggerSet:
+    def __init__(self, rise=RISE, fall=FALL, **overrides):
+        """overrides: name=(rise, fall) for gestures that need their own timing."""
+        self.rise = rise
+        self.fall = fall
+        self.overrides = overrides
+        self.triggers = {}
+        self._seen = set()
+        self._last = None
+        self.dt = 0.0
+
+        # Stats
+        self.fired = 0
+
+    def __getitem__(self, name):
+        trigger = self.triggers.get(name)
+        if trigger is None:
+            trigger = self.triggers[name] = PoseTrigger(*self.overrides.get(name, (self.rise, self.fall)))
+        return trigger
+
+    def reset(self):
+        for trigger in self.triggers.values():
+            trigger.reset()
+        self._seen.clear()
+        self._last = None
+
+    def begin(self, now):
+        """Start a frame captured at now (seconds)."""
+        self.dt = 0.0 if self._last is None else min(max(now - self._last, 0.0), MAX_DT)
+        self._last = now
+        self._seen.clear()
+
+    def fire(self, name):
+        """The pose of `name` is seen this frame; True when its action should run now."""
+        self._seen.add(name)
+        fired = self[name].update(True, self.dt)
+        self.fired += fired
+        return fired
+
+    def end(self):
+        """Every trigger whose pose was not seen this frame loses evidence."""
+        for name, trigger in self.triggers.items():
+            if name not in self._seen:
+                trigger.update(False, self.dt)
@@ -1,56 +1,106 @@
 import cv2
-import mediapipe as mp
-import numpy as np
 import time
 import logging
 import os
 import argparse
-from gamedirectkeys import PressKey, ReleaseKey, W, A, S, D, SPACE
+import sys
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.capture import LatestFrameCapture, camera_source
+from common.landmarks import landmarks_to_array, handedness_from_results, TIP_IDS
+from common.features import FrameFeatures
+from common.filters import OneEuroFilter
+from common.tracking import HandTracker
+from common.trace import TraceWriter
+from common.pipeline import ModePipeline
+from common import metrics as stage_metrics
+from common import roi
+from common import scheduler as load_scheduler
+from common import idle
+from common import preview
+from common import gesture_table
+
+from gamedirectkeys import W, A, S, D, SPACE
+import gamekeys
 
 # ====================== NITRO COOLDOWN ======================
-last_nitro_time = 0
 NITRO_COOLDOWN = 1.2   # seconds between nitro activations (adjust as needed)
 
+# ====================== STEERING ======================
+STEER_THRESHOLD = 10
+# Landmark smoothing (One Euro): steadier than the cursor modes when the hands rest
+FILTER_MIN_CUTOFF = 0.8
+FILTER_BETA = 0.005
+
+FRAME_WIDTH, FRAME_HEIGHT = 640, 480
+WINDOW_NAME = "AirInteract Game Mode - Racing Control"
+GESTURE_MAP = os.path.join(os.path.dirname(os.path.abspath(__file__)), "game_gestures.json")
+
 # Reduce OpenCV spam
 logging.getLogger('cv2').setLevel(logging.ERROR)
 os.environ['OPENCV_LOG_LEVEL'] = 'FATAL'
 
-# ====================== ARGPARSER (for launcher) ======================
-parser = argparse.ArgumentParser()
-parser.add_argument("--cam", type=int, required=True, help="Camera index passed from launcher")
-args = parser.parse_args()
-CAM_IDX = args.cam
-
 # ====================== Hand Detector ======================
 class HandDetector:
-    def __init__(self):
-        self.mp_hands = mp.solutions.hands
-        self.hands = self.mp_hands.Hands(
-            static_image_mode=False,
-            max_num_hands=2,
-            model_complexity=1,
-            min_detection_confidence=0.8,
-            min_tracking_confidence=0.8
-        )
-        self.mp_draw = mp.solutions.drawing_utils
-        self.tip_ids = [4, 8, 12, 16, 20]
+    def __init__(self, max_hands=2, detection_con=0.8, tracking_con=0.8, model_complexity=1,
+                 load_model=True, model=None):
+        self.results = None
+        self.landmarks = landmarks_to_array(None, 0, 0)
+
+        # load_model=False -> landmarks only arrive through set_hands (trace replay)
+        # model            -> reuse an already-loaded Hands instance (resident runtime)
+        self.mp_hands = self.hands = self.mp_draw = None
+        if load_model:
+            import mediapipe as mp
+            self.mp_hands = mp.solutions.hands
+            self.hands = model or self.mp_hands.Hands(
+                static_image_mode=False,
+                max_num_hands=max_hands,
+                model_complexity=model_complexity,
+                min_detection_confidence=detection_con,
+                min_tracking_confidence=tracking_con
+            )
+            self.mp_draw = mp.solutions.drawing_utils
+        self.tip_ids = TIP_IDS
+        self.tracker = HandTracker()
+        self.ids = []
+        self.wheel_ids = ()  # track IDs of the wheel's left and right hand
+        self.landmark_filter = OneEuroFilter(FILTER_MIN_CUTOFF, FILTER_BETA)  # None = raw landmarks
 
     def find_hands(self, img, draw=True):
         img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
         self.results = self.hands.process(img_rgb)
-        if self.results.multi_hand_landmarks and draw:
+        self.update_landmarks(img)
+        if draw:
+            self.draw_hands(img)
+        return img
+
+    def update_landmarks(self, img, t=None):
+        h, w = img.shape[:2]
+        labels, scores = handedness_from_results(self.results)
+        return self.set_hands(landmarks_to_array(self.results, w, h), labels, scores, t)
+
+    def set_hands(self, landmarks, labels, scores, t=None):
+        """Load (hands, 21, 3) pixel landmarks from any source (camera or recorded trace); t = capture time"""
+        self.ids, labels = self.tracker.update(landmarks, labels, scores, t)
+        if self.landmark_filter is not None:
+            landmarks = self.landmark_filter(landmarks, self.ids, t)
+        self.landmarks = landmarks
+        self.labels, self.scores = labels, scores
+        return self.landmarks
+
+    def draw_hands(self, img):
+        if self.results is not None and self.results.multi_hand_landmarks:
             for hand_lms in self.results.multi_hand_landmarks:
                 self.mp_draw.draw_landmarks(img, hand_lms, self.mp_hands.HAND_CONNECTIONS)
         return img
 
     def get_landmarks(self, img, hand_no=0):
-        lm_list = []
-        if self.results.multi_hand_landmarks and len(self.results.multi_hand_landmarks) > hand_no:
-            hand = self.results.multi_hand_landmarks[hand_no]
-            h, w, _ = img.shape
-            for idx, lm in enumerate(hand.landmark):
-                lm_list.append([idx, int(lm.x * w), int(lm.y * h)])
-        return lm_list
+        """(21, 3) float32 [x, y, z] array for one hand, or None"""
+        if hand_no >= len(self.landmarks):
+            return None
+        return self.landmarks[hand_no]
 
     def get_label(self, hand_no=0):
         if (self.results.multi_handedness and 
@@ -58,154 +108,236 @@ class HandDetector:
             return self.results.multi_handedness[hand_no].classification[0].label
         return "Unknown"
 
-    def fingers_up(self, lm_list, label):
-        if not lm_list:
-            return [0] * 5
-        fingers = []
-
-        # Thumb
-        if label == "Right":
-            fingers.append(1 if lm_list[4][1] > lm_list[3][1] else 0)
-        else:
-            fingers.append(1 if lm_list[4][1] < lm_list[3][1] else 0)
-
-        # Other four
-        for i in range(1, 5):
-            tip = self.tip_ids[i]
-            pip = tip - 2
-            fingers.append(1 if lm_list[tip][2] < lm_list[pip][2] else 0)
-
-        return fingers
-
-    def get_wheel_angle(self, lm1, lm2):
-        if len(lm1) == 0 or len(lm2) == 0:
-            return 0
-        p1 = np.array([lm1[0][1], lm1[0][2]])
-        p2 = np.array([lm2[0][1], lm2[0][2]])
-        vec = p2 - p1
-        return np.degrees(np.arctan2(vec[1], vec[0]))
-
-# ====================== Helper ======================
-def is_fist_relaxed(fingers):
-    return fingers[1] == 0 and fingers[2] == 0 and sum(fingers[1:]) <= 2
-
-# ====================== CAMERA INIT (launcher controlled) ======================
-cap = cv2.VideoCapture(CAM_IDX, cv2.CAP_DSHOW)
-cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-
-print(f"\n=== AirInteract Game Mode Started (Camera {CAM_IDX}) ===\n")
-
-detector = HandDetector()
-smoothed_angle = 0
-SMOOTHING = 0.75
-STEER_THRESHOLD = 10
+    def wheel_hands(self):
+        """
+        Features of the first two hands, left hand first, or None when fewer
+        than two hands are visible. Which hand is left is decided by wrist x
+        when the pair is first seen and then follows the tracks, so turning
+        the wheel past 90 degrees does not swap them. The left hand's thumb
+        points to -x, the right hand's to +x.
+        """
+        if len(self.landmarks) < 2:
+            return None
+        ids = self.ids[:2]
+        if set(ids) != set(self.wheel_ids):
+            left_first = self.landmarks[0, 0, 0] <= self.landmarks[1, 0, 0]
+            self.wheel_ids = tuple(ids) if left_first else tuple(ids[::-1])
+        order = [ids.index(i) for i in self.wheel_ids]
+        return FrameFeatures(self.landmarks[order], ["Left", "Right"], thumb_sides=(-1, 1),
+                             ids=list(self.wheel_ids))
+
+# Status banner styles: position, scale, color, thickness
+STATUS_STYLES = {
+    "NITRO!!!": ((160, 240), 2.8, (0, 255, 255), 6),
+    "BRAKE": ((200, 240), 2.2, (0, 0, 255), 5),
+    "COASTING": ((160, 240), 1.8, (255, 255, 0), 4),
+    "GAS!": ((220, 240), 2.2, (0, 255, 0), 5),
+    "???": ((260, 240), 2, (100, 100, 255), 4),
+    "LANDMARKS MISSING": ((100, 240), 1.4, (0, 0, 255), 3),
+    "SHOW BOTH HANDS": ((100, 240), 1.6, (0, 0, 255), 4),
+}
+
+
+# ====================== Per-frame Pipeline ======================
+class GameMode(ModePipeline):
+    """One frame of Game Mode, split into stages so each can be timed."""
+    name = "Game"
+    work_size = (FRAME_WIDTH, FRAME_HEIGHT)
+
+    def __init__(self, max_hands=2, detection_con=0.8, tracking_con=0.8, model_complexity=1,
+                 keys=None, load_model=True, model=None, gesture_map=GESTURE_MAP):
+        self.detector = HandDetector(max_hands, detection_con, tracking_con, model_complexity, load_model, model)
+        self.keys = keys or gamekeys.KeyState()  # held keys; only changes reach the OS
+        self.steer_angle = 0
+        self.last_nitro_time = 0
+        self.hand_count = 0
+        self.wheel = None
+        # Two-hand pose -> action lookup (wheel order: left, right)
+        self.gestures = gesture_table.load(gesture_map, self)
+
+    def extract(self, img):
+        self.detector.update_landmarks(img, self.captured)
+        return self.detector.wheel_hands()
+
+    def load_hands(self, landmarks, labels, scores, width, height, t=None):
+        """Stand-in for infer + extract when landmarks come from a recorded trace"""
+        self.detector.set_hands(landmarks, labels, scores, t)
+        return self.detector.wheel_hands()
+
+    def decide(self, wheel, now=None):
+        # Keys are held for this frame only; whatever changed goes out in one call
+        self.keys.begin()
+        status = self.drive(wheel, now)
+        t = time.perf_counter()
+        self.keys.flush()
+        self.metrics.lap("dispatch", t)
+        return status
+
+    def drive(self, wheel, now):
+        self.wheel = wheel
+        self.hand_count = len(self.detector.landmarks)
+        if self.hand_count != 2:
+            return "SHOW BOTH HANDS"
+        if wheel is None:
+            return "LANDMARKS MISSING"
+
+        left, right = wheel.hands
+
+        # === Steering (landmarks are already One Euro filtered) ===
+        self.steer_angle = wheel.wheel_angle(0, 1)
+
+        if self.steer_angle < -STEER_THRESHOLD:
+            self.keys.hold(A)
+        elif self.steer_angle > STEER_THRESHOLD:
+            self.keys.hold(D)
+
+        # === Gestures (game_gestures.json) ===
+        now = time.time() if now is None else now
+        status = self.gestures.dispatch((left.mask, right.mask), now)
+        return "???" if status is None else status
+
+    # ============================
+    # ACTIONS
+    # ============================
+    def guard_nitro_ready(self, now):
+        return now - self.last_nitro_time > NITRO_COOLDOWN
+
+    def on_nitro(self, now):
+        self.keys.hold(SPACE)        # Single clean tap: held for this frame, released on the next
+        self.last_nitro_time = now
+        return "NITRO!!!"
+
+    def on_nitro_cooldown(self, now):
+        return ""  # ← No "NITRO READY" text when on cooldown
+
+    def on_brake(self, now):
+        self.keys.hold(S)
+        return "BRAKE"
+
+    def on_coast(self, now):
+        return "COASTING"
+
+    def on_gas(self, now):
+        self.keys.hold(W)
+        return "GAS!"
+
+    def snapshot(self):
+        """Hands, counters and wheel for render(); the preview thread draws them after this frame."""
+        wrists = None
+        if self.wheel is not None and self.hand_count == 2:
+            left, right = self.wheel.hands
+            wrists = (tuple(int(v) for v in left.wrist), tuple(int(v) for v in right.wrist))
+        note = self.idle.label() if self.idle else ""
+        return self.detector.landmarks.copy(), self.hand_count, note, wrists, self.steer_angle
+
+    def render(self, img, status, state):
+        landmarks, hand_count, note, wrists, steer_angle = state
+        preview.draw_hands(img, landmarks)
+        cv2.putText(img, f"HANDS: {hand_count}", (10, 40),
+                    cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 255), 2)
+        if note:  # idle state / wake latency
+            cv2.putText(img, note, (10, 70), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 200, 255), 2)
+
+        if wrists is not None:
+            # Steering wheel visualization
+            wrist1, wrist2 = wrists
+            cv2.line(img, wrist1, wrist2, (255, 100, 0), 6)
+            center = ((wrist1[0] + wrist2[0]) // 2, (wrist1[1] + wrist2[1]) // 2)
+            cv2.circle(img, center, 70, (0, 255, 255), 4)
+            cv2.putText(img, f"Steer: {steer_angle:+.1f}", (10, 470),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 100), 2)
+
+        if status in STATUS_STYLES:
+            pos, scale, color, thickness = STATUS_STYLES[status]
+            cv2.putText(img, status, pos, cv2.FONT_HERSHEY_DUPLEX, scale, color, thickness)
+        return img
 
+    def close(self):
+        self.keys.release_all()
 
-# ====================== Main Loop ======================
-try:
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            print("Camera lost, reconnecting...")
-            cap.release()
-            time.sleep(1)
-            cap = cv2.VideoCapture(CAM_IDX, cv2.CAP_DSHOW)
-            continue
-
-        frame = cv2.resize(frame, (640, 480))
-        frame = cv2.flip(frame, 1)
-        frame = detector.find_hands(frame)
-        display = frame.copy()
-
-        # Release all keys each frame
-        for k in [W, A, D, S, SPACE]:
-            ReleaseKey(k)
-
-        hand_count = len(detector.results.multi_hand_landmarks) if detector.results.multi_hand_landmarks else 0
-        cv2.putText(display, f"HANDS: {hand_count}", (10, 40),
-                    cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 255), 2)
 
-        if hand_count == 2:
-            lm1 = detector.get_landmarks(frame, 0)
-            lm2 = detector.get_landmarks(frame, 1)
-
-            if lm1 and lm2:
-                # Ensure left hand has smaller x
-                if lm1[0][1] > lm2[0][1]:
-                    lm1, lm2 = lm2, lm1
-
-                fingers_L = detector.fingers_up(lm1, "Left")
-                fingers_R = detector.fingers_up(lm2, "Right")
-
-                thumb_L = fingers_L[0]
-                thumb_R = fingers_R[0]
-                left_fist = is_fist_relaxed(fingers_L)
-                right_fist = is_fist_relaxed(fingers_R)
-
-                # === Steering ===
-                angle = detector.get_wheel_angle(lm1, lm2)
-                smoothed_angle = SMOOTHING * smoothed_angle + (1 - SMOOTHING) * angle
-
-                if smoothed_angle < -STEER_THRESHOLD:
-                    PressKey(A)
-                elif smoothed_angle > STEER_THRESHOLD:
-                    PressKey(D)
-
-                # Steering wheel visualization
-                wrist1 = (lm1[0][1], lm1[0][2])
-                wrist2 = (lm2[0][1], lm2[0][2])
-                cv2.line(display, wrist1, wrist2, (255, 100, 0), 6)
-                center = ((wrist1[0] + wrist2[0]) // 2, (wrist1[1] + wrist2[1]) // 2)
-                cv2.circle(display, center, 70, (0, 255, 255), 4)
-
-                # === Gestures ===
-                if thumb_L and thumb_R:
-                    current_time = time.time()
-                    if current_time - last_nitro_time > NITRO_COOLDOWN:
-                        PressKey(SPACE)
-                        ReleaseKey(SPACE)          # Single clean tap
-                        last_nitro_time = current_time
-                        cv2.putText(display, "NITRO!!!", (160, 240),
-                                    cv2.FONT_HERSHEY_DUPLEX, 2.8, (0, 255, 255), 6)
-                    # ← No "NITRO READY" text when on cooldown
-
-                elif thumb_L and right_fist:
-                    PressKey(S)
-                    cv2.putText(display, "BRAKE", (200, 240),
-                                cv2.FONT_HERSHEY_DUPLEX, 2.2, (0, 0, 255), 5)
-
-                elif thumb_R and left_fist:
-                    cv2.putText(display, "COASTING", (160, 240),
-                                cv2.FONT_HERSHEY_DUPLEX, 1.8, (255, 255, 0), 4)
-
-                elif left_fist and right_fist:
-                    PressKey(W)
-                    cv2.putText(display, "GAS!", (220, 240),
-                                cv2.FONT_HERSHEY_DUPLEX, 2.2, (0, 255, 0), 5)
-
-                else:
-                    cv2.putText(display, "???", (260, 240),
-                                cv2.FONT_HERSHEY_DUPLEX, 2, (100, 100, 255), 4)
-
-                cv2.putText(display, f"Steer: {smoothed_angle:+.1f}", (10, 470),
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 100), 2)
-
-            else:
-                cv2.putText(display, "LANDMARKS MISSING", (100, 240),
-                            cv2.FONT_HERSHEY_DUPLEX, 1.4, (0, 0, 255), 3)
-
-        else:
-            cv2.putText(display, "SHOW BOTH HANDS", (100, 240),
-                        cv2.FONT_HERSHEY_DUPLEX, 1.6, (0, 0, 255), 4)
-
-        cv2.imshow("AirInteract Game Mode - Racing Control", display)
-        if cv2.waitKey(1) & 0xFF == ord('q'):
-            break
-
-finally:
-    for k in [W, A, D, S, SPACE]:
-        ReleaseKey(k)
-    cap.release()
-    cv2.destroyAllWindows()
-    print("\nAirInteract Game Mode stopped.\n")
+# ====================== Main Loop ======================
+def main():
+    # ====================== ARGPARSER (for launcher) ======================
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cam", type=camera_source, required=True, help="Camera index passed from launcher, or a video file")
+    parser.add_argument("--record-landmarks", metavar="PATH", help="Append every frame's landmarks to a trace file")
+    stage_metrics.add_arguments(parser)
+    roi.add_arguments(parser)
+    load_scheduler.add_arguments(parser)
+    idle.add_arguments(parser)
+    parser.add_argument("--mirror-landmarks", action="store_true",
+                        help="Run the model on the unmirrored frame and mirror the landmarks instead")
+    preview.add_arguments(parser)
+    gesture_table.add_arguments(parser, GESTURE_MAP)
+    gamekeys.add_arguments(parser)
+    args = parser.parse_args()
+    metrics = stage_metrics.from_args(args)
+
+    # ====================== CAMERA INIT (launcher controlled) ======================
+    # Opens on its own thread while the model loads and warms up below
+    cap = LatestFrameCapture(args.cam, *(args.capture or (FRAME_WIDTH, FRAME_HEIGHT))).start()
+
+    print(f"\n=== AirInteract Game Mode Started (Camera {args.cam}) ===\n")
+
+    mode = GameMode(keys=gamekeys.from_args(args), gesture_map=args.gestures)
+    mode.warm_up(FRAME_WIDTH, FRAME_HEIGHT)
+    mode.metrics = metrics
+    mode.roi = roi.from_args(args, mode)
+    mode.scheduler = load_scheduler.from_args(args)
+    mode.idle = idle.from_args(args, mode.zone_margin)
+    mode.mirror_landmarks = args.mirror_landmarks
+    mode.headless = args.headless
+    recorder = TraceWriter(args.record_landmarks, FRAME_WIDTH, FRAME_HEIGHT) if args.record_landmarks else None
+
+    # Preview draws and shows frames on its own thread; Ctrl+C / SIGTERM stop headless runs
+    view = preview.from_args(args, WINDOW_NAME, metrics, exit_keys=(ord('q'),))
+    stop = threading.Event()
+    preview.on_shutdown_signal(stop.set)
+
+    try:
+        while not stop.is_set():
+            t = time.perf_counter()
+            ret, frame, ts = cap.read()
+            metrics.lap("capture_wait", t)
+            if not ret:
+                if cap.ended:
+                    break  # a video file ran out
+                continue  # capture thread reconnects in the background
+
+            img, status = mode.step(frame, captured=ts)
+            if recorder:
+                recorder.write_results(ts, mode.detector.results)
+
+            if view:
+                view.submit(img, status, mode.render, mode.snapshot)
+                view.publish(metrics)
+            cap.publish(metrics)
+            if mode.roi:
+                mode.roi.publish(metrics)
+            if mode.scheduler:
+                mode.scheduler.publish(metrics)
+            if mode.idle:
+                mode.idle.publish(metrics)
+            mode.keys.publish(metrics)
+            if view and view.exit_requested.is_set():  # q in the preview window
+                break
+            if mode.idle and mode.idle.sleeping:
+                stop.wait(mode.idle.wait_ms() / 1000)  # idle: poll slowly
+
+    finally:
+        if view:
+            view.stop()
+        mode.close()
+        mode.keys.close()
+        if args.metrics_dump:
+            metrics.dump(args.metrics_dump)
+        if recorder:
+            recorder.close()
+        cap.release()
+        cv2.destroyAllWindows()
+        print("\nAirInteract Game Mode stopped.\n")
+
+
+if __name__ == "__main__":
+    main()
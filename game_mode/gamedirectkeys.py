@@ -2,7 +2,8 @@
 import ctypes
 import time
 
-SendInput = ctypes.windll.user32.SendInput
+# windll only exists on Windows; the scan codes below stay importable elsewhere
+SendInput = ctypes.windll.user32.SendInput if hasattr(ctypes, 'windll') else None
 
 W = 0x11
 A = 0x1E
@@ -0,0 +1,242 @@
+# gamekeys.py - Held keys for Game Mode, sent to the OS only when they change
+#
+# The game needs keys held down (gas, steering) for as long as a pose lasts.
+# Releasing every key and pressing the held ones again each frame sent up to
+# ten SendInput calls per frame, and the game saw steering and gas flicker
+# off and on between them.
+#
+# KeyState keeps the set of keys the current frame wants held (begin(), then
+# hold() per action) and the set the OS already holds. flush() sends only the
+# difference - usually nothing - as one batch, in one OS call:
+#
+#   sendinput  Windows: one SendInput() with an array of keyboard INPUTs
+#   uinput     Linux: a virtual keyboard; one write() of all key events + SYN
+#   xtest      X11: XTestFakeKeyEvent per key, one XFlush() to the server
+#   record     in memory (tests, benchmarks, headless runs on any OS)
+#
+# Key codes are the PC set-1 scan codes of gamedirectkeys.py; Linux evdev
+# KEY_* codes are the same numbers for these keys, and X keycodes are them + 8.
+
+import ctypes
+import ctypes.util
+import os
+import struct
+import sys
+import time
+
+from gamedirectkeys import Input, KeyBdInput
+
+KEYEVENTF_SCANCODE = 0x0008
+KEYEVENTF_KEYUP = 0x0002
+INPUT_KEYBOARD = 1
+
+BACKENDS = ("auto", "sendinput", "uinput", "xtest", "record")
+
+
+# ============================
+# BACKENDS
+# ============================
+class SendInputBackend:
+    """Windows: every transition of a frame in one SendInput() call."""
+
+    def __init__(self):
+        if not hasattr(ctypes, "windll"):
+            raise OSError("SendInput needs Windows")
+        self._send = ctypes.windll.user32.SendInput
+        self._extra = ctypes.c_ulong(0)
+
+    def send(self, events):
+        batch = (Input * len(events))()
+        for item, (code, down) in zip(batch, events):
+            item.type = INPUT_KEYBOARD
+            item.ii.ki = KeyBdInput(0, code, KEYEVENTF_SCANCODE | (0 if down else KEYEVENTF_KEYUP), 0,
+                                    ctypes.pointer(self._extra))
+        self._send(len(events), batch, ctypes.sizeof(Input))
+
+    def close(self):
+        pass
+
+
+class UinputBackend:
+    """Linux: a virtual keyboard on /dev/uinput (needs write access, e.g. the input group)."""
+
+    EV_SYN, EV_KEY, SYN_REPORT = 0, 1, 0
+    UI_SET_EVBIT = 0x40045564
+    UI_SET_KEYBIT = 0x40045565
+    UI_DEV_CREATE = 0x5501
+    UI_DEV_DESTROY = 0x5502
+    EVENT = struct.Struct("llHHi")                 # struct input_event
+    SETTLE = 0.1                                   # s for the desktop to pick up a new device
+
+    def __init__(self, path="/dev/uinput", name=b"AirInteract keyboard"):
+        import fcntl
+        self._ioctl = fcntl.ioctl
+        self._fd = os.open(path, os.O_WRONLY | os.O_NONBLOCK)
+        try:
+            self._ioctl(self._fd, self.UI_SET_EVBIT, self.EV_KEY)
+            for code in range(1, 128):             # the whole main keyboard block
+                self._ioctl(self._fd, self.UI_SET_KEYBIT, code)
+            # struct uinput_user_dev: name, id (BUS_USB, vendor, product, version), ff_effects_max, abs*
+            os.write(self._fd, struct.pack("80sHHHHi256i", name, 0x03, 0x1, 0x1, 1, 0, *([0] * 256)))
+            self._ioctl(self._fd, self.UI_DEV_CREATE)
+        except OSError:
+            os.close(self._fd)
+            raise
+        time.sleep(self.SETTLE)
+
+    def send(self, events):
+        records = [self.EVENT.pack(0, 0, self.EV_KEY, code, int(down)) for code, down in events]
+        records.append(self.EVENT.pack(0, 0, self.EV_SYN, self.SYN_REPORT, 0))
+        os.write(self._fd, b"".join(records))
+
+    def close(self):
+        if self._fd is None:
+            return
+        try:
+            self._ioctl(self._fd, self.UI_DEV_DESTROY)
+        finally:
+            os.close(self._fd)
+            self._fd = None
+
+
+class XTestBackend:
+    """X11: fake key events through the XTEST extension, flushed to the server together."""
+
+    KEYCODE_OFFSET = 8                             # X keycode = evdev code + 8
+
+    def __init__(self, display=None):
+        libs = [ctypes.util.find_library(name) for name in ("X11", "Xtst")]
+        if not all(libs):
+            raise OSError("XTest needs libX11 and libXtst")
+        self._x11, self._xtst = (ctypes.cdll.LoadLibrary(lib) for lib in libs)
+        self._x11.XOpenDisplay.restype = ctypes.c_void_p
+        self._x11.XOpenDisplay.argtypes = [ctypes.c_char_p]
+        self._x11.XFlush.argtypes = [ctypes.c_void_p]
+        self._x11.XCloseDisplay.argtypes = [ctypes.c_void_p]
+        self._xtst.XTestFakeKeyEvent.argtypes = [ctypes.c_void_p, ctypes.c_uint, ctypes.c_int, ctypes.c_ulong]
+        self._display = self._x11.XOpenDisplay(display.encode() if display else None)
+        if not self._display:
+            raise OSError(f"cannot open X display {display or os.environ.get('DISPLAY', '(unset)')}")
+
+    def send(self, events):
+        for code, down in events:
+            self._xtst.XTestFakeKeyEvent(self._display, code + self.KEYCODE_OFFSET, int(down), 0)
+        self._x11.XFlush(self._display)
+
+    def close(self):
+        if self._display:
+            self._x11.XCloseDisplay(self._display)
+            self._display = None
+
+
+class RecordingBackend:
+    """Keeps every batch in memory instead of touching the OS."""
+
+    def __init__(self, presses=None, keep=True):
+        self.batches = []                          # [[(code, down), ...], ...] one per flush
+        self.presses = {} if presses is None else presses  # code -> times pressed
+        self.keep = keep
+
+    def send(self, events):
+        if self.keep:
+            self.batches.append(list(events))
+        for code, down in events:
+            if down:
+                self.presses[code] = self.presses.get(code, 0) + 1
+
+    def close(self):
+        pass
+
+
+def open_backend(name="auto"):
+    """The named backend; auto = SendInput on Windows, else uinput, else XTest."""
+    if name == "record":
+        return RecordingBackend(keep=False)
+    if name == "sendinput" or (name == "auto" and sys.platform == "win32"):
+        return SendInputBackend()
+    if name == "uinput":
+        return UinputBackend()
+    if name == "xtest":
+        return XTestBackend()
+    errors = []
+    for backend in (UinputBackend, XTestBackend):
+        try:
+            return backend()
+        except OSError as e:
+            errors.append(f"{backend.__name__}: {e}")
+    raise OSError("no key output available (" + "; ".join(errors) + ")")
+
+
+# ============================
+# KEY STATE
+# ============================
+class KeyState:
+    def __init__(self, backend=None, name="auto", log=print):
+        self._backend = backend          # opened on the first transition unless given
+        self.name = name
+        self.log = log
+        self.error = None                # why the backend could not be opened
+        self.down = set()                # keys the OS holds
+        self.wanted = set()              # keys this frame holds
+
+        # Stats
+        self.flushes = 0                 # OS calls made
+        self.transitions = 0
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            try:
+                self._backend = open_backend(self.name)
+            except OSError as e:
+                self.error = e
+                self.log(f"[keys] {e}; game keys go nowhere")
+                self._backend = RecordingBackend(keep=False)
+        return self._backend
+
+    def begin(self):
+        """Start a frame: no key is held unless the frame holds it again."""
+        self.wanted.clear()
+
+    def hold(self, code):
+        self.wanted.add(code)
+
+    def flush(self):
+        """Send what changed since the last flush, releases first, in one call."""
+        if self.wanted == self.down:
+            return
+        events = [(code, False) for code in sorted(self.down - self.wanted)]
+        events += [(code, True) for code in sorted(self.wanted - self.down)]
+        self.backend.send(events)
+        self.down = set(self.wanted)
+        self.flushes += 1
+        self.transitions += len(events)
+
+    def release_all(self):
+        self.wanted.clear()
+        self.flush()
+
+    def close(self):
+        self.release_all()
+        if self._backend is not None:
+            self._backend.close()
+            self._backend = None
+
+    def publish(self, metrics):
+        metrics.gauge("keys_held", len(self.down))
+        metrics.gauge("keys_flushes", self.flushes)
+        metrics.gauge("keys_transitions", self.transitions)
+
+
+# ============================
+# COMMAND LINE
+# ============================
+def add_arguments(parser):
+    parser.add_argument("--keys", choices=BACKENDS, default="auto",
+                        help="Key output: auto = SendInput on Windows, uinput or XTest on Linux; "
+                             "record = nowhere (default auto)")
+
+
+def from_args(args):
+    """A KeyState with its backend opened now, so a missing one fails at startup."""
+    return KeyState(open_backend(args.keys), args.keys)
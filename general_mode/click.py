@@ -1,55 +1,45 @@
 # click.py - Left Click, Right Click & Click-and-Drag (Hold)
 
-import pyautogui
-import time
+from common import output
 
 # State tracking
 _left_down = False
 _right_down = False
-_last_left_click_time = 0
-_last_right_click_time = 0
-CLICK_COOLDOWN = 0.3  # seconds - prevents double-trigger
 
+# One click per call: the gesture manager decides when a pose has earned a
+# click (common/triggers.py), so there is no cooldown here.
 def left_click():
-    """Single left click with cooldown"""
-    global _last_left_click_time
-    now = time.time()
-    if now - _last_left_click_time >= CLICK_COOLDOWN:
-        pyautogui.click(button='left')
-        _last_left_click_time = now
+    """Single left click"""
+    output.click('left')
 
 def right_click():
-    """Single right click with cooldown"""
-    global _last_right_click_time
-    now = time.time()
-    if now - _last_right_click_time >= CLICK_COOLDOWN:
-        pyautogui.click(button='right')
-        _last_right_click_time = now
+    """Single right click"""
+    output.click('right')
 
 def start_left_drag():
     """Press and hold left button (for dragging/text selection)"""
     global _left_down
     if not _left_down:
-        pyautogui.mouseDown(button='left')
+        output.mouse_down('left')
         _left_down = True
 
 def stop_left_drag():
     """Release left button"""
     global _left_down
     if _left_down:
-        pyautogui.mouseUp(button='left')
+        output.mouse_up('left')
         _left_down = False  # Fixed: was True before
 
 def start_right_drag():
     global _right_down
     if not _right_down:
-        pyautogui.mouseDown(button='right')
+        output.mouse_down('right')
         _right_down = True
 
 def stop_right_drag():
     global _right_down
     if _right_down:
-        pyautogui.mouseUp(button='right')
+        output.mouse_up('right')
         _right_down = False
 
 def release_all():
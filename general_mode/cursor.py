@@ -1,24 +1,26 @@
 import pyautogui
 import numpy as np
+from common.cursor_engine import engine
 
 screen_size = pyautogui.size()
 wScr, hScr = screen_size.width, screen_size.height
 
 FRAME_REDUCTION = 120       # ← Matches your setting
-SMOOTHING = 8
 PADDING = 0.20              # ← 20% extra reach → perfect corners & bottom
 
-prev_x, prev_y = 0, 0
-
-def move_cursor(index_tip_x, index_tip_y, frame_width=640, frame_height=480):
-    global prev_x, prev_y
+# Smoothing and prediction happen in the cursor engine, at display rate; it is
+# shared with the other modes, so every update names this mode's bounds
+BOUNDS = (1, 1, wScr - 1, hScr - 1)
 
+def move_cursor(index_tip_x, index_tip_y, frame_width=640, frame_height=480, captured=None):
+    """captured: time.monotonic() of the camera frame, for latency compensation"""
     x_min = FRAME_REDUCTION
     x_max = frame_width - FRAME_REDUCTION
     y_min = FRAME_REDUCTION
     y_max = frame_height - FRAME_REDUCTION
 
     if not (x_min < index_tip_x < x_max and y_min < index_tip_y < y_max):
+        hold()
         return False, None
 
     # Fix right-hand inversion
@@ -30,10 +32,10 @@ def move_cursor(index_tip_x, index_tip_y, frame_width=640, frame_height=480):
     x_screen = np.clip(x_screen, 1, wScr-1)
     y_screen = np.clip(y_screen, 1, hScr-1)
 
-    # Smoothing
-    curr_x = prev_x + (x_screen - prev_x) / SMOOTHING
-    curr_y = prev_y + (y_screen - prev_y) / SMOOTHING
+    engine.update(x_screen, y_screen, captured, BOUNDS)
+
+    return True, (x_screen, y_screen)
 
-    pyautogui.moveTo(curr_x, curr_y)
-    prev_x, prev_y = curr_x, curr_y
-    return True, (curr_x, curr_y)
\ No newline at end of file
+def hold():
+    """Freeze the pointer where it is (cursor gesture ended)"""
+    engine.reset()
\ No newline at end of file
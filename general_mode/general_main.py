@@ -1,6 +1,25 @@
+import os
+import sys
+import threading
+import time
 import cv2
 import pyautogui
 import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.capture import LatestFrameCapture, camera_source
+from common.trace import TraceWriter
+from common.pipeline import ModePipeline
+from common import metrics as stage_metrics
+from common import roi
+from common import scheduler as load_scheduler
+from common import idle
+from common import preview
+from common import gesture_table
+from common import motion
+from common import output
+from common.cursor_engine import engine as cursor_engine
+
 import handtracking as htm
 import utils
 import gestures
@@ -17,108 +36,204 @@ pyautogui.PAUSE = 0
 FRAME_REDUCTION = 120
 CAM_WIDTH, CAM_HEIGHT = 640, 480
 CLICK_COOLDOWN = 0.5
+WINDOW_NAME = "AirInteract – General Mode"
+DISPATCH_CALLS = ("moveTo", "click", "doubleClick", "mouseDown", "mouseUp", "scroll", "press", "keyDown", "keyUp")
 
-# ============================
-# ARGPARSE (Launcher -> Mode)
-# ============================
-parser = argparse.ArgumentParser()
-parser.add_argument("--cam", type=int, required=True, help="Camera index passed from launcher")
-args = parser.parse_args()
-CAM_IDX = args.cam
 
 # ============================
-# INITIALIZE CAMERA
-# ============================
-cap = cv2.VideoCapture(CAM_IDX, cv2.CAP_DSHOW)
-cap.set(3, CAM_WIDTH)
-cap.set(4, CAM_HEIGHT)
-
-detector = htm.handDetector(maxHands=2, detectionCon=0.75, trackCon=0.75)
-fps = utils.FPSCounter()
-manager = gestures.GestureManager(CAM_WIDTH, CAM_HEIGHT, FRAME_REDUCTION, CLICK_COOLDOWN)
-
-print("\n===============================================")
-print("         AirInteract – General Mode")
-print("===============================================")
-
+# PER-FRAME PIPELINE
 # ============================
-# MAIN LOOP
-# ============================
-while True:
-    success, img = cap.read()
-    if not success:
-        continue
-
-    img = cv2.flip(img, 1)
-    img = detector.findHands(img, draw=True)
-
-    # === Separate Left & Right hands ===
-    lmList_left = lmList_right = None
-    fingers_left = fingers_right = None
-
-    if detector.results.multi_hand_landmarks:
-        for i, hand_lm in enumerate(detector.results.multi_hand_landmarks):
-            lmList = detector.findPosition(img, handNo=i, draw=False)
-            handedness = detector.getHandedness(i)
-            fingers = detector.fingersUp(lmList)
-
-            if handedness == "Left":
-                lmList_left = lmList
-                fingers_left = fingers
+class GeneralMode(ModePipeline):
+    """One frame of General Mode, split into stages so each can be timed."""
+    name = "General"
+    zone_margin = FRAME_REDUCTION
+
+    def __init__(self, max_hands=2, detection_con=0.75, tracking_con=0.75, model_complexity=1,
+                 cam_width=CAM_WIDTH, cam_height=CAM_HEIGHT, load_model=True, model=None,
+                 gesture_map=gestures.GESTURE_MAP):
+        self.detector = htm.handDetector(maxHands=max_hands, detectionCon=detection_con,
+                                         trackCon=tracking_con, modelComplexity=model_complexity,
+                                         loadModel=load_model, model=model)
+        self.manager = gestures.GestureManager(cam_width, cam_height, FRAME_REDUCTION, CLICK_COOLDOWN, gesture_map)
+        self.motion = motion.attach(self.detector, self.manager)  # swipes in the gesture map
+        self.work_size = (cam_width, cam_height)
+        self.fps = utils.FPSCounter()
+
+    def activate(self):
+        pyautogui.FAILSAFE = False
+
+    def extract(self, img):
+        return self.detector.updateLandmarks(img, self.captured)
+
+    def load_hands(self, landmarks, labels, scores, width, height, t=None):
+        """Stand-in for infer + extract when landmarks come from a recorded trace"""
+        return self.detector.setHands(landmarks, labels, scores, width, t)
+
+    def decide(self, features, now=None):
+        # === Separate Left & Right hands ===
+        hand_left = hand_right = None
+        for hand in features.hands:
+            if hand.label == "Left":
+                hand_left = hand
             else:
-                lmList_right = lmList
-                fingers_right = fingers
-
-    # Draw active zone
-    utils.draw_active_zone(img, FRAME_REDUCTION, (255, 0, 255), 3)
-
-    # === Process Gestures ===
-    status, holding_ctrl = manager.process_gesture(
-        lmList_left, lmList_right, fingers_left, fingers_right
-    )
+                hand_right = hand
+
+        if self.motion:
+            self.motion.update()  # queues finished swipes on the manager
+        status, holding_ctrl = self.manager.process_gesture(hand_left, hand_right, now, self.captured)
+        self.fps.update()  # gesture loop rate, not the preview's
+
+        # Safely release Ctrl when not zooming (only sent if it is actually down)
+        if not holding_ctrl:
+            output.key_up('ctrl')
+        return status
+
+    def snapshot(self):
+        """Hands, FPS and idle note for render(); the preview thread draws them after this frame."""
+        return self.detector.imageLandmarks(), self.fps.fps, self.idle.label() if self.idle else ""
+
+    def render(self, img, status, state):
+        landmarks, fps, note = state
+        preview.draw_hands(img, landmarks)
+
+        # Draw active zone
+        utils.draw_active_zone(img, FRAME_REDUCTION, (255, 0, 255), 3)
+
+        # ============================
+        # ON-SCREEN STATUS
+        # ============================
+        if status == "PINCH ZOOM":
+            utils.draw_status(img, "PINCH ZOOM", (60, 80), (255, 255, 0), 3.2)
+        elif status == "SCROLL ↑↓":
+            utils.draw_status(img, "SCROLL ↑↓", (80, 80), (0, 255, 255), 3.0)
+        elif status.startswith("VOLUME"):
+            utils.draw_status(img, status, (100, 80), (0, 255, 0), 2.6)
+        elif status == "DOUBLE CLICK":
+            utils.draw_status(img, status, (80, 80), (0, 255, 255), 2.8)
+        elif status == "RIGHT CLICK":
+            utils.draw_status(img, status, (100, 80), (0, 100, 255), 2.6)
+        elif status == "LEFT CLICK":
+            utils.draw_status(img, status, (140, 80), (0, 255, 0), 2.6)
+        elif status == "CURSOR":
+            utils.draw_status(img, status, (200, 70), (255, 0, 255), 2.6)
+        else:
+            utils.draw_status(img, "SHOW HAND", (180, 240), (0, 0, 255), 2.2)
+
+        # FPS + Instruction Bar
+        self.fps.draw(img, note=note, fps=fps)
+        cv2.putText(
+            img,
+            "Zoom | Scroll | Volume | Cursor | Clicks",
+            (10, 470),
+            cv2.FONT_HERSHEY_SIMPLEX,
+            0.58,
+            (50, 255, 50),
+            2
+        )
+        return img
+
+    def close(self):
+        self.manager.is_dragging = False
+        self.manager.motions.clear()
+        self.manager.triggers.reset()
+        if self.motion:
+            self.motion.reset()
+        output.dispatcher.release_all()
+
+
+def main():
+    # ============================
+    # ARGPARSE (Launcher -> Mode)
+    # ============================
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cam", type=camera_source, required=True, help="Camera index passed from launcher, or a video file")
+    parser.add_argument("--record-landmarks", metavar="PATH", help="Append every frame's landmarks to a trace file")
+    stage_metrics.add_arguments(parser)
+    roi.add_arguments(parser)
+    load_scheduler.add_arguments(parser)
+    idle.add_arguments(parser)
+    parser.add_argument("--mirror-landmarks", action="store_true",
+                        help="Run the model on the unmirrored frame and mirror the landmarks instead")
+    preview.add_arguments(parser)
+    gesture_table.add_arguments(parser, gestures.GESTURE_MAP)
+    args = parser.parse_args()
+    metrics = stage_metrics.from_args(args)
+    metrics.instrument(pyautogui, DISPATCH_CALLS)
+    output.dispatcher.start()  # mouse / keyboard calls leave the vision thread
+    cursor_engine.start()      # pointer updates at display rate
 
-    # Safely release Ctrl when not zooming
-    if not holding_ctrl:
-        pyautogui.keyUp('ctrl')
+    # ============================
+    # INITIALIZE CAMERA
+    # ============================
+    # Camera opens on its own thread while the model loads and warms up here
+    cap = LatestFrameCapture(args.cam, *(args.capture or (CAM_WIDTH, CAM_HEIGHT))).start()
+    mode = GeneralMode(gesture_map=args.gestures)
+    mode.warm_up(CAM_WIDTH, CAM_HEIGHT)
+    mode.metrics = metrics
+    mode.roi = roi.from_args(args, mode)
+    mode.scheduler = load_scheduler.from_args(args)
+    mode.idle = idle.from_args(args, mode.zone_margin)
+    mode.mirror_landmarks = args.mirror_landmarks
+    mode.headless = args.headless
+    recorder = TraceWriter(args.record_landmarks, CAM_WIDTH, CAM_HEIGHT) if args.record_landmarks else None
+
+    print("\n===============================================")
+    print("         AirInteract – General Mode")
+    print("===============================================")
+
+    # Preview draws and shows frames on its own thread; Ctrl+C / SIGTERM stop headless runs
+    view = preview.from_args(args, WINDOW_NAME, metrics)
+    stop = threading.Event()
+    preview.on_shutdown_signal(stop.set)
 
     # ============================
-    # ON-SCREEN STATUS
+    # MAIN LOOP
     # ============================
-    if status == "PINCH ZOOM":
-        utils.draw_status(img, "PINCH ZOOM", (60, 80), (255, 255, 0), 3.2)
-    elif status == "SCROLL ↑↓":
-        utils.draw_status(img, "SCROLL ↑↓", (80, 80), (0, 255, 255), 3.0)
-    elif status.startswith("VOLUME"):
-        utils.draw_status(img, status, (100, 80), (0, 255, 0), 2.6)
-    elif status == "DOUBLE CLICK":
-        utils.draw_status(img, status, (80, 80), (0, 255, 255), 2.8)
-    elif status == "RIGHT CLICK":
-        utils.draw_status(img, status, (100, 80), (0, 100, 255), 2.6)
-    elif status == "LEFT CLICK":
-        utils.draw_status(img, status, (140, 80), (0, 255, 0), 2.6)
-    elif status == "CURSOR":
-        utils.draw_status(img, status, (200, 70), (255, 0, 255), 2.6)
-    else:
-        utils.draw_status(img, "SHOW HAND", (180, 240), (0, 0, 255), 2.2)
-
-    # FPS + Instruction Bar
-    fps.update()
-    fps.draw(img)
-    cv2.putText(
-        img,
-        "Zoom | Scroll | Volume | Cursor | Clicks",
-        (10, 470),
-        cv2.FONT_HERSHEY_SIMPLEX,
-        0.58,
-        (50, 255, 50),
-        2
-    )
-
-    cv2.imshow("AirInteract – General Mode", img)
-    if cv2.waitKey(1) == 27:  # ESC
-        pyautogui.keyUp('ctrl')
-        break
-
-cap.release()
-cv2.destroyAllWindows()
-print("\nGeneral Mode Closed.\n")
+    while not stop.is_set():
+        t = time.perf_counter()
+        success, frame, ts = cap.read()
+        metrics.lap("capture_wait", t)
+        if not success:
+            if cap.ended:
+                break  # a video file ran out
+            continue  # read() already waited up to a second, no busy spin
+
+        img, status = mode.step(frame, captured=ts)
+        if recorder:
+            recorder.write_results(ts, mode.detector.results)
+
+        if view:
+            view.submit(img, status, mode.render, mode.snapshot)
+            view.publish(metrics)
+        cap.publish(metrics)
+        if mode.roi:
+            mode.roi.publish(metrics)
+        if mode.scheduler:
+            mode.scheduler.publish(metrics)
+        if mode.idle:
+            mode.idle.publish(metrics)
+        if mode.motion:
+            mode.motion.publish(metrics)
+        output.dispatcher.publish(metrics)
+        cursor_engine.publish(metrics)
+        if view and view.exit_requested.is_set():  # ESC in the preview window
+            break
+        if mode.idle and mode.idle.sleeping:
+            stop.wait(mode.idle.wait_ms() / 1000)  # idle: poll slowly
+
+    if view:
+        view.stop()
+    cursor_engine.stop()
+    mode.close()
+    output.dispatcher.stop()
+    if args.metrics_dump:
+        metrics.dump(args.metrics_dump)
+    if recorder:
+        recorder.close()
+    cap.release()
+    cv2.destroyAllWindows()
+    print("\nGeneral Mode Closed.\n")
+
+
+if __name__ == "__main__":
+    main()
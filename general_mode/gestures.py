@@ -1,22 +1,26 @@
 # gestures.py - ULTIMATE FLAWLESS VERSION (17 Nov 2025 – 10:24 PM PKT)
 # Fixed: Double-click opens only ONCE + Perfect Drag + Zoom + Scroll + Volume
 
+import os
 import cursor
 import click
-import pyautogui
 import volume
-import math
 import time
+from common import output
+from common import gesture_table
+from common.triggers import TriggerSet
+from common.landmarks import INDEX_TIP
+
+GESTURE_MAP = os.path.join(os.path.dirname(os.path.abspath(__file__)), "gestures.json")
 
 class GestureManager:
-    def __init__(self, cam_width, cam_height, frame_reduction=100, click_cooldown=0.5):
+    def __init__(self, cam_width, cam_height, frame_reduction=100, click_cooldown=0.5, gesture_map=GESTURE_MAP):
         self.cam_width = cam_width
         self.cam_height = cam_height
         self.frame_reduction = frame_reduction
         self.click_cooldown = click_cooldown
 
         # Volume
-        self.prev_angle = 0.0
         self.last_set_vol = -1
 
         # Infinite Scroll
@@ -25,6 +29,7 @@ class GestureManager:
         self.persistent_scroll_vel = 0.0
         self.scroll_sensitivity = 6.5
         self.scroll_smoothing = 0.34
+        self.scroll_track = None   # track ID of the hand last_index_y belongs to
 
         # Pinch Zoom
         self.last_pinch_dist = None
@@ -32,97 +37,62 @@ class GestureManager:
         self.persistent_zoom_vel = 0.0
         self.zoom_sensitivity = 0.032
         self.zoom_smoothing = 0.38
+        self.zoom_tracks = None    # (left, right) track IDs of the pinch
 
         # Drag state
         self.is_dragging = False
+        self.drag_track = None     # track ID of the hand holding the button
 
-        # Double-click cooldown (prevents multiple opens)
-        self.last_double_click_time = 0
-        self.double_click_cooldown = 0.6  # 600 ms
+        # Clicks fire once per pose, when it has been held long enough (common/triggers.py)
+        self.triggers = TriggerSet()
 
         self.last_time = time.time()
 
-    def process_gesture(self, lmList_left, lmList_right, fingers_left, fingers_right):
-        now = time.time()
+        # Pose -> action lookup compiled from the gesture map
+        self.gestures = gesture_table.load(gesture_map, self)
+        self.motions = []  # common.motion events since the last frame, see queue_motion()
+
+    def process_gesture(self, hand_left, hand_right, now=None, captured=None):
+        """
+        hand_left / hand_right are common.features.HandFeatures (or None).
+        now overrides the clock, e.g. with trace timestamps during replay.
+        captured is the camera frame's time.monotonic(), for cursor prediction.
+        Returns (status, holding_ctrl).
+        """
+        now = time.time() if now is None else now
         dt = max(now - self.last_time, 0.001)
         self.last_time = now
-
-        status = "SHOW HAND"
-        holding_ctrl = False
-
-        # === 1. FIST-TRIGGERED DRAG (Right index + Left fist) ===
-        if (fingers_right and fingers_right == [0, 1, 0, 0, 0] and lmList_right):
-            if fingers_left and sum(fingers_left) == 0:  # Left fist
-                if not self.is_dragging:
-                    pyautogui.mouseDown()
-                    self.is_dragging = True
-                cursor.move_cursor(lmList_right[8][1], lmList_right[8][2], self.cam_width, self.cam_height)
-                status = "DRAG"
-                return status, False
-            else:
-                if self.is_dragging:
-                    pyautogui.mouseUp()
-                    self.is_dragging = False
-                cursor.move_cursor(lmList_right[8][1], lmList_right[8][2], self.cam_width, self.cam_height)
-                status = "CURSOR"
-                return status, False
-
-        # === 2. PINCH ZOOM (Both hands L shape) ===
-        if (fingers_left and fingers_left == [1, 1, 0, 0, 0] and
-            fingers_right and fingers_right == [1, 1, 0, 0, 0] and
-            lmList_left and lmList_right):
-
-            l_ix, l_iy = lmList_left[8][1], lmList_left[8][2]
-            r_ix, r_iy = lmList_right[8][1], lmList_right[8][2]
-            dist = math.hypot(l_ix - r_ix, l_iy - r_iy)
-
-            if self.last_pinch_dist is None:
-                self.last_pinch_dist = dist
-                self.zoom_velocity = self.persistent_zoom_vel
-            else:
-                delta = dist - self.last_pinch_dist
-                target_vel = -delta * self.zoom_sensitivity / dt
-                self.zoom_velocity += (target_vel - self.zoom_velocity) * self.zoom_smoothing
-                self.persistent_zoom_vel = self.zoom_velocity
-                amount = int(self.zoom_velocity * dt * 140)
-                if abs(amount) >= 1:
-                    pyautogui.keyDown('ctrl')
-                    pyautogui.scroll(amount)
-                    holding_ctrl = True
-                self.last_pinch_dist = dist
-
-            status = "PINCH ZOOM"
-            return status, holding_ctrl
-
-        # === 3. INFINITE SCROLL (Left palm + Right palm/fist) ===
-        elif (fingers_left and all(fingers_left) and lmList_right):
-            if fingers_right and all(fingers_right) and len(lmList_right) > 8:
-                index_y = lmList_right[8][2]
-                if self.last_index_y is None:
-                    self.last_index_y = index_y
-                    self.scroll_velocity = self.persistent_scroll_vel
-                else:
-                    dy = index_y - self.last_index_y
-                    target = dy * self.scroll_sensitivity / dt
-                    self.scroll_velocity += (target - self.scroll_velocity) * self.scroll_smoothing
-                    self.persistent_scroll_vel = self.scroll_velocity
-                    amt = int(self.scroll_velocity * dt)
-                    if abs(amt) >= 1:
-                        pyautogui.scroll(amt)
-                    self.last_index_y = index_y
-                status = "SCROLL"
-                return status, False
-
-            elif fingers_right and sum(fingers_right) <= 1:
-                self.persistent_scroll_vel = self.scroll_velocity
-                self.last_index_y = None
-                self.scroll_velocity = 0.0
-                status = "FIST → REPOSITION"
-                return status, False
-
+        self.triggers.begin(now)
+
+        masks = (gesture_table.mask_of(hand_left), gesture_table.mask_of(hand_right))
+        result = self._dispatch_motions(masks, hand_left, hand_right, now, dt, captured)
+        if result is None:
+            result = self.gestures.dispatch(masks, hand_left, hand_right, now, dt, captured)
+        self.triggers.end()
+        if result is None:
+            cursor.hold()
+            self._settle()
+            return "SHOW HAND", False
+        return result
+
+    def queue_motion(self, event):
+        """MotionRecognizer callback: handled by the next process_gesture()."""
+        self.motions.append(event)
+
+    def _dispatch_motions(self, masks, *args):
+        """The first queued motion with a matching rule wins the frame over the pose."""
+        events, self.motions = self.motions, []
+        for event in events:
+            result = self.gestures.dispatch_motion(event.name, masks, *args)
+            if result is not None:
+                return result
+        return None
+
+    def _settle(self):
+        """Leaving drag / zoom: let go of the button, forget the pinch."""
         # === AUTO-RELEASE DRAG if gesture changes ===
         if self.is_dragging:
-            pyautogui.mouseUp()
+            output.mouse_up()
             self.is_dragging = False
 
         # Reset zoom when not pinching
@@ -130,35 +100,113 @@ class GestureManager:
         self.zoom_velocity = 0.0
         self.persistent_zoom_vel = 0.0
 
-        # === VOLUME & SINGLE-HAND GESTURES ===
-        if fingers_right and all(fingers_right) and lmList_right and (not fingers_left or not all(fingers_left)):
-            wx, wy = lmList_right[0][1], lmList_right[0][2]
-            mx, my = lmList_right[9][1], lmList_right[9][2]
-            angle = math.atan2(mx - wx, -(my - wy)) * 57.2958
-            smoothed = self.prev_angle + (angle - self.prev_angle) / 5.0
-            self.prev_angle = smoothed
-            vol = int(((max(-90, min(90, -smoothed * 3.3)) + 90) / 180) * 20) * 5
-            if abs(vol - self.last_set_vol) >= volume.VOLUME_STEP:
-                volume.set_volume(vol)
-                self.last_set_vol = vol
-            status = f"VOLUME {self.last_set_vol}%"
-
-        elif fingers_right and lmList_right:
-            t, i, m, r, p = fingers_right
-
-            # DOUBLE-CLICK — NOW ONLY ONCE (600 ms cooldown)
-            if t and i and m and not r and not p:
-                if now - self.last_double_click_time > self.double_click_cooldown:
-                    pyautogui.doubleClick()
-                    self.last_double_click_time = now
-                status = "DOUBLE CLICK"
-
-            elif i and m and not t and not r and not p:
-                click.right_click()
-                status = "RIGHT CLICK"
-
-            elif i and t and not m and not r and not p:
-                click.left_click()
-                status = "LEFT CLICK"
-
-        return status, False
\ No newline at end of file
+    # ============================
+    # ACTIONS (named in gestures.json)
+    # ============================
+    # === FIST-TRIGGERED DRAG (Right index + Left fist) ===
+    def on_drag(self, hand_left, hand_right, now, dt, captured):
+        if self.is_dragging and hand_right.track != self.drag_track:
+            output.mouse_up()  # a different hand took over: not the same drag
+            self.is_dragging = False
+        if not self.is_dragging:
+            output.mouse_down()
+            self.is_dragging = True
+            self.drag_track = hand_right.track
+        cursor.move_cursor(*hand_right.index_tip, self.cam_width, self.cam_height, captured)
+        return "DRAG", False
+
+    def on_cursor(self, hand_left, hand_right, now, dt, captured):
+        if self.is_dragging:
+            output.mouse_up()
+            self.is_dragging = False
+        cursor.move_cursor(*hand_right.index_tip, self.cam_width, self.cam_height, captured)
+        return "CURSOR", False
+
+    # === PINCH ZOOM (Both hands L shape) ===
+    def on_zoom(self, hand_left, hand_right, now, dt, captured):
+        cursor.hold()  # pointer stays put (clicks land where it stopped)
+        holding_ctrl = False
+        dist = hand_left.distance_to(hand_right, INDEX_TIP)
+        tracks = (hand_left.track, hand_right.track)
+        if tracks != self.zoom_tracks:
+            self.zoom_tracks = tracks
+            self.last_pinch_dist = None
+
+        if self.last_pinch_dist is None:
+            self.last_pinch_dist = dist
+            self.zoom_velocity = self.persistent_zoom_vel
+        else:
+            delta = dist - self.last_pinch_dist
+            target_vel = -delta * self.zoom_sensitivity / dt
+            self.zoom_velocity += (target_vel - self.zoom_velocity) * self.zoom_smoothing
+            self.persistent_zoom_vel = self.zoom_velocity
+            amount = int(self.zoom_velocity * dt * 140)
+            if abs(amount) >= 1:
+                output.key_down('ctrl')
+                output.scroll(amount)
+                holding_ctrl = True
+            self.last_pinch_dist = dist
+
+        return "PINCH ZOOM", holding_ctrl
+
+    # === INFINITE SCROLL (Left palm + Right palm/fist) ===
+    def on_scroll(self, hand_left, hand_right, now, dt, captured):
+        cursor.hold()
+        index_y = float(hand_right.index_tip[1])
+        if hand_right.track != self.scroll_track:
+            self.scroll_track = hand_right.track
+            self.last_index_y = None
+
+        if self.last_index_y is None:
+            self.last_index_y = index_y
+            self.scroll_velocity = self.persistent_scroll_vel
+        else:
+            dy = index_y - self.last_index_y
+            target = dy * self.scroll_sensitivity / dt
+            self.scroll_velocity += (target - self.scroll_velocity) * self.scroll_smoothing
+            self.persistent_scroll_vel = self.scroll_velocity
+            amt = int(self.scroll_velocity * dt)
+            if abs(amt) >= 1:
+                output.scroll(amt)
+            self.last_index_y = index_y
+        return "SCROLL", False
+
+    def on_reposition(self, hand_left, hand_right, now, dt, captured):
+        cursor.hold()
+        self.persistent_scroll_vel = self.scroll_velocity
+        self.last_index_y = None
+        self.scroll_velocity = 0.0
+        return "FIST → REPOSITION", False
+
+    # === VOLUME & SINGLE-HAND GESTURES ===
+    def on_volume(self, hand_left, hand_right, now, dt, captured):
+        cursor.hold()
+        self._settle()
+        angle = hand_right.wrist_angle  # landmarks are One Euro filtered upstream
+        vol = int(((max(-90, min(90, -angle * 3.3)) + 90) / 180) * 20) * 5
+        if abs(vol - self.last_set_vol) >= volume.VOLUME_STEP:
+            volume.set_volume(vol, now)
+            self.last_set_vol = vol
+        return f"VOLUME {self.last_set_vol}%", False
+
+    # CLICKS — once per pose: hold it to click, let go to click again
+    def on_double_click(self, hand_left, hand_right, now, dt, captured):
+        cursor.hold()
+        self._settle()
+        if self.triggers.fire("double_click"):
+            output.double_click()
+        return "DOUBLE CLICK", False
+
+    def on_right_click(self, hand_left, hand_right, now, dt, captured):
+        cursor.hold()
+        self._settle()
+        if self.triggers.fire("right_click"):
+            click.right_click()
+        return "RIGHT CLICK", False
+
+    def on_left_click(self, hand_left, hand_right, now, dt, captured):
+        cursor.hold()
+        self._settle()
+        if self.triggers.fire("left_click"):
+            click.left_click()
+        return "LEFT CLICK", False
\ No newline at end of file
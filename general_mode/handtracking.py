@@ -1,104 +1,121 @@
 # handtracking.py - Enhanced & Mirror-Safe (Palm-Facing-Camera Priority)
 
 import cv2
-import mediapipe as mp
 import math
+import numpy as np
+from common.landmarks import landmarks_to_array, handedness_from_results, TIP_IDS
+from common.features import FrameFeatures
+from common.filters import OneEuroFilter
+from common.tracking import HandTracker
 
 class handDetector:
-    def __init__(self, mode=False, maxHands=2, detectionCon=0.7, trackCon=0.7):
+    def __init__(self, mode=False, maxHands=2, detectionCon=0.7, trackCon=0.7, modelComplexity=1,
+                 loadModel=True, model=None):
         self.mode = mode
         self.maxHands = maxHands
         self.detectionCon = detectionCon
         self.trackCon = trackCon
-
-        self.mpHands = mp.solutions.hands
-        self.hands = self.mpHands.Hands(
-            static_image_mode=mode,
-            max_num_hands=maxHands,
-            model_complexity=1,
-            min_detection_confidence=detectionCon,
-            min_tracking_confidence=trackCon
-        )
-        self.mpDraw = mp.solutions.drawing_utils
-        self.tipIds = [4, 8, 12, 16, 20]  # thumb, index, middle, ring, pinky
+        self.modelComplexity = modelComplexity
+        self.results = None
+
+        # loadModel=False -> landmarks only arrive through setHands (trace replay)
+        # model          -> reuse an already-loaded Hands instance (resident runtime)
+        self.mpHands = self.hands = self.mpDraw = None
+        if loadModel:
+            import mediapipe as mp
+            self.mpHands = mp.solutions.hands
+            self.hands = model or self.mpHands.Hands(
+                static_image_mode=mode,
+                max_num_hands=maxHands,
+                model_complexity=modelComplexity,
+                min_detection_confidence=detectionCon,
+                min_tracking_confidence=trackCon
+            )
+            self.mpDraw = mp.solutions.drawing_utils
+        self.tipIds = TIP_IDS  # thumb, index, middle, ring, pinky
+        self.tracker = HandTracker()  # stable IDs and smoothed handedness
+        self.landmarkFilter = OneEuroFilter()  # set to None for raw landmarks
+        self.history = None  # common.history.LandmarkHistory, fed the filtered landmarks
+        self.width = 0  # of the frame the landmarks are in, to undo the right-hand flip
 
     def findHands(self, img, draw=True):
         imgRGB = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
         self.results = self.hands.process(imgRGB)
+        self.updateLandmarks(img)
+        if draw:
+            self.drawHands(img)
+        return img
 
-        if self.results.multi_hand_landmarks:
+    def updateLandmarks(self, img, t=None):
+        """Convert self.results into self.landmarks / self.features for img's size"""
+        # All hands in one float32 (hands, 21, 3) array
+        h, w = img.shape[:2]
+        labels, scores = handedness_from_results(self.results)
+        return self.setHands(landmarks_to_array(self.results, w, h), labels, scores, w, t)
+
+    def setHands(self, landmarks, labels, scores, width, t=None):
+        """Load pixel landmarks from any source (camera or recorded trace); t = capture time"""
+        w = self.width = width
+        self.ids, labels = self.tracker.update(landmarks, labels, scores, t)
+        self.labels, self.scores = labels, scores
+        if self.landmarkFilter is not None:
+            landmarks = self.landmarkFilter(landmarks, self.ids, t)
+        if self.history is not None:
+            self.history.push(landmarks, self.ids, t)  # image coordinates, before the flip below
+        self.landmarks = landmarks
+        if len(self.landmarks):
+            # Flip X for right hand to match left-hand logic
+            right = np.array([label == 'Right' for label in self.labels], dtype=bool)
+            self.landmarks[right, :, 0] = w - self.landmarks[right, :, 0]
+        # Finger states, palm orientation, distances... computed on first use
+        self.features = FrameFeatures(self.landmarks, self.labels, ids=self.ids)
+        return self.features
+
+    def drawHands(self, img):
+        if self.results is not None and self.results.multi_hand_landmarks:
             for handLms in self.results.multi_hand_landmarks:
-                if draw:
-                    self.mpDraw.draw_landmarks(img, handLms, self.mpHands.HAND_CONNECTIONS)
+                self.mpDraw.draw_landmarks(img, handLms, self.mpHands.HAND_CONNECTIONS)
         return img
 
-    def findPosition(self, img, handNo=0, draw=False):
-        lmList = []
-        if self.results.multi_hand_landmarks:
-            myHand = self.results.multi_hand_landmarks[handNo]
-            h, w, _ = img.shape
-            handedness = self.getHandedness(handNo)
-
-            for id, lm in enumerate(myHand.landmark):
-                cx, cy = int(lm.x * w), int(lm.y * h)
-                # Flip X for right hand to match left-hand logic
-                if handedness == 'Right':
-                    cx = w - cx
-                lmList.append([id, cx, cy])
-                if draw:
-                    cv2.circle(img, (cx, cy), 7, (255, 0, 255), cv2.FILLED)
-        return lmList
+    def imageLandmarks(self):
+        """Copy of self.landmarks as they lie in the image (right hands flipped back), to draw later"""
+        lm = self.landmarks.copy()
+        if len(lm):
+            right = np.array([label == 'Right' for label in self.labels], dtype=bool)
+            lm[right, :, 0] = self.width - lm[right, :, 0]
+        return lm
 
-    def fingersUp(self, lmList):
-        if len(lmList) == 0:
+    def findPosition(self, img, handNo=0, draw=False):
+        """Returns the (21, 3) float32 landmark array [x, y, z] of one hand"""
+        if handNo >= len(self.landmarks):
+            return None
+        lm = self.landmarks[handNo]
+        if draw:
+            for cx, cy in lm[:, :2].astype(int):
+                cv2.circle(img, (cx, cy), 7, (255, 0, 255), cv2.FILLED)
+        return lm
+
+    def fingersUp(self, lm):
+        """Finger states of one (21, 3) landmark array - see FrameFeatures.fingers"""
+        if lm is None or len(lm) == 0:
             return [0, 0, 0, 0, 0]
+        return FrameFeatures(lm[None]).hand(0).fingers
 
-        fingers = []
-
-        # === PALM ORIENTATION DETECTION ===
-        wrist = lmList[0][1:]      # [x, y]
-        mcp_middle = lmList[9][1:] # middle finger MCP
-        mcp_index = lmList[5][1:]  # index finger MCP
-
-        vec_wrist_to_middle = (mcp_middle[0] - wrist[0], mcp_middle[1] - wrist[1])
-        vec_middle_to_index = (mcp_index[0] - mcp_middle[0], mcp_index[1] - mcp_middle[1])
-
-        cross = vec_wrist_to_middle[0] * vec_middle_to_index[1] - vec_wrist_to_middle[1] * vec_middle_to_index[0]
-        palm_facing_camera = cross > 0  # True = back of hand toward camera
-
-        # === THUMB: FLIPPED LOGIC (Optimized for palm-facing-camera) ===
-        thumb_tip_x = lmList[4][1]
-        thumb_mcp_x = lmList[2][1]
-
-        if palm_facing_camera:
-            # Back of hand: thumb is on the RIGHT → tip x > joint x = up
-            fingers.append(1 if thumb_tip_x > thumb_mcp_x else 0)
-        else:
-            # Palm toward you: thumb on LEFT → tip x < joint x = up
-            fingers.append(1 if thumb_tip_x < thumb_mcp_x else 0)
-
-        # === OTHER FINGERS: Y-based (tip above PIP = up) ===
-        for i in range(1, 5):
-            tip_y = lmList[self.tipIds[i]][2]
-            pip_y = lmList[self.tipIds[i] - 2][2]
-            fingers.append(1 if tip_y < pip_y else 0)
-
-        return fingers
-
-    def findDistance(self, p1, p2, lmList, img=None, draw=True):
-        if len(lmList) <= max(p1, p2):
+    def findDistance(self, p1, p2, lm, img=None, draw=True):
+        if lm is None or len(lm) <= max(p1, p2):
             return 1000, img, []
 
-        x1, y1 = lmList[p1][1], lmList[p1][2]
-        x2, y2 = lmList[p2][1], lmList[p2][2]
-        cx, cy = (x1 + x2) // 2, (y1 + y2) // 2
+        x1, y1 = float(lm[p1, 0]), float(lm[p1, 1])
+        x2, y2 = float(lm[p2, 0]), float(lm[p2, 1])
+        cx, cy = (x1 + x2) / 2, (y1 + y2) / 2
         length = math.hypot(x2 - x1, y2 - y1)
 
         if draw and img is not None:
-            cv2.line(img, (x1, y1), (x2, y2), (255, 0, 255), 3)
-            cv2.circle(img, (x1, y1), 10, (255, 0, 255), cv2.FILLED)
-            cv2.circle(img, (x2, y2), 10, (255, 0, 255), cv2.FILLED)
-            cv2.circle(img, (cx, cy), 10, (0, 255, 0), cv2.FILLED)
+            p1_px, p2_px, c_px = (int(x1), int(y1)), (int(x2), int(y2)), (int(cx), int(cy))
+            cv2.line(img, p1_px, p2_px, (255, 0, 255), 3)
+            cv2.circle(img, p1_px, 10, (255, 0, 255), cv2.FILLED)
+            cv2.circle(img, p2_px, 10, (255, 0, 255), cv2.FILLED)
+            cv2.circle(img, c_px, 10, (0, 255, 0), cv2.FILLED)
 
         return length, img, [x1, y1, x2, y2, cx, cy]
 
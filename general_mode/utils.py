@@ -66,5 +66,9 @@ class FPSCounter:
         self.prev_time = current_time
         return int(self.fps)
 
-    def draw(self, img, position=(20, 50)):
-        draw_status(img, f'FPS: {self.fps:.1f}', position, (0, 255, 0), 1.2, 3)
\ No newline at end of file
+    def draw(self, img, position=(20, 50), note="", fps=None):
+        """fps: a value read earlier, when drawing on another thread"""
+        fps = self.fps if fps is None else fps
+        draw_status(img, f'FPS: {fps:.1f}', position, (0, 255, 0), 1.2, 3)
+        if note:  # e.g. idle state / wake latency
+            draw_status(img, note, (position[0], position[1] + 32), (0, 200, 255), 0.7, 2)
\ No newline at end of file
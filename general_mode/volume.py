@@ -2,7 +2,7 @@
 
 import time
 import platform
-import pyautogui  # Always for fallback
+from common import output  # Always for fallback
 
 # Global flags/vars
 ABSOLUTE_VOLUME = True  # Start assuming it works
@@ -42,7 +42,7 @@ def _get_volume_interface():
             ABSOLUTE_VOLUME = False
     return _volume_interface
 
-def set_volume(percent):
+def set_volume(percent, now=None):
     """
     Set volume to percent (0-100). Tries absolute, falls back to relative.
     Returns True if set, False if skipped/error.
@@ -51,7 +51,7 @@ def set_volume(percent):
     if not 0 <= percent <= 100:
         return False
 
-    now = time.time()
+    now = time.time() if now is None else now
     if now - _last_volume_time < VOLUME_COOLDOWN:
         return False
     _last_volume_time = now
@@ -77,6 +77,6 @@ def set_volume(percent):
     num_presses = abs(delta) // 2  # ~2% per press; press multiple for bigger jumps
     key = "volumeup" if delta > 0 else "volumedown"
     for _ in range(num_presses):
-        pyautogui.press(key)
+        output.press(key)
     _last_set_vol += num_presses * 2 * (1 if delta > 0 else -1)
     return True
\ No newline at end of file
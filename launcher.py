@@ -1,10 +1,13 @@
 
 import sys
 import os
+import json
 import subprocess
 import time
-import cv2
-from PyQt6 import QtWidgets, QtCore, QtGui
+from collections import deque
+from PyQt6 import QtWidgets, QtCore, QtGui, QtNetwork
+
+from common import camera_discovery
 
 # --- Configuration ---
 APP_TITLE = "AirInteract Hub"
@@ -14,6 +17,16 @@ MODES = {
     "Game": os.path.join("game_mode", "game_main.py"),
     "Presentation": os.path.join("presentation_mode", "presentation_main.py"),
 }
+# Resident runtime: keeps the model loaded and the camera open, switches modes in-process
+RUNTIME_SCRIPT = "runtime.py"
+
+# Telemetry streamed by the running mode (see common/telemetry.py)
+SPARK_POINTS = 120        # 60 s of history at 2 samples/s
+TELEMETRY_STALE_S = 3.0
+STOP_GRACE_S = 1.0        # after EOF on stdin, then SIGTERM
+KILL_AFTER_S = 3.0        # after EOF on stdin, then kill
+FPS_WARN = 15.0           # below this the FPS readout turns red
+INFERENCE_WARN_MS = 50.0  # p95 above this turns red
 
 # --- Stylesheet (The "Look and Feel") ---
 STYLESHEET = """
@@ -172,39 +185,157 @@ QScrollBar::handle:vertical {
 QScrollBar::add-line:vertical, QScrollBar::sub-line:vertical {
     height: 0px;
 }
+
+/* Telemetry Gauges */
+QLabel#MetricValue {
+    font-family: "Consolas", "Monaco", monospace;
+    font-size: 13px;
+    font-weight: bold;
+}
+QProgressBar {
+    background-color: #2c2c2c;
+    border: 1px solid #444;
+    border-radius: 4px;
+    color: white;
+    text-align: center;
+    max-height: 14px;
+}
+QProgressBar::chunk {
+    background-color: #00a8ff;
+    border-radius: 3px;
+}
 """
 
-def list_cameras(max_test=CAM_SCAN_MAX):
-    """Helper to find available cameras."""
-    cams = []
-    # Use a slightly faster approach for UI responsiveness check if needed, 
-    # but here we keep the logic simple as requested.
-    for i in range(max_test):
-        try:
-            cap = cv2.VideoCapture(i, cv2.CAP_DSHOW if os.name == 'nt' else i)
-            if not cap.isOpened():
-                cap.release()
-                continue
-            ret, frame = cap.read()
-            if ret and frame is not None:
-                h, w = frame.shape[:2]
-                cams.append((i, f"CAM {i}  |  {w}x{h} Resolution"))
-            cap.release()
-        except:
-            pass
-    return cams
+class CameraScanThread(QtCore.QThread):
+    """Runs camera discovery off the UI thread; each camera is emitted as soon as it is known."""
+    found = QtCore.pyqtSignal(int, str)
+
+    def __init__(self, use_cache=True, parent=None):
+        super().__init__(parent)
+        self.use_cache = use_cache
+
+    def run(self):
+        for index, caps in camera_discovery.discover(CAM_SCAN_MAX, use_cache=self.use_cache):
+            self.found.emit(index, camera_discovery.label(index, caps))
+
+class Sparkline(QtWidgets.QWidget):
+    """Tiny line chart of the most recent samples."""
+    def __init__(self, color="#00a8ff", parent=None):
+        super().__init__(parent)
+        self.values = deque(maxlen=SPARK_POINTS)
+        self.color = QtGui.QColor(color)
+        self.setMinimumSize(140, 28)
+
+    def add(self, value):
+        self.values.append(value)
+        self.update()
+
+    def clear(self):
+        self.values.clear()
+        self.update()
+
+    def paintEvent(self, event):
+        if len(self.values) < 2:
+            return
+        painter = QtGui.QPainter(self)
+        painter.setRenderHint(QtGui.QPainter.RenderHint.Antialiasing)
+        painter.setPen(QtGui.QPen(self.color, 1.5))
+
+        w, h = self.width() - 2, self.height() - 4
+        top = max(self.values) or 1.0
+        step = w / (SPARK_POINTS - 1)
+        x0 = w - step * (len(self.values) - 1)
+        points = [QtCore.QPointF(1 + x0 + i * step, 2 + h - h * v / top) for i, v in enumerate(self.values)]
+        painter.drawPolyline(QtGui.QPolygonF(points))
+        painter.end()
+
+class TelemetryPanel(QtWidgets.QFrame):
+    """Live gauges for the running mode, fed from telemetry datagrams."""
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setObjectName("Card")
+        layout = QtWidgets.QGridLayout(self)
+        layout.setHorizontalSpacing(12)
+
+        header = QtWidgets.QLabel("LIVE PERFORMANCE")
+        header.setObjectName("SectionHeader")
+        layout.addWidget(header, 0, 0, 1, 3)
+
+        self.fps_value = self._value_label()
+        self.fps_spark = Sparkline("#00ff41")
+        self.inference_value = self._value_label()
+        self.inference_spark = Sparkline("#f39c12")
+        self.cpu_bar = QtWidgets.QProgressBar()
+        self.cpu_bar.setRange(0, 100)
+        self.cpu_spark = Sparkline("#00a8ff")
+        self.frames_value = self._value_label()
+
+        rows = [("FPS", self.fps_value, self.fps_spark),
+                ("INFERENCE p50/p95/p99", self.inference_value, self.inference_spark),
+                ("CPU", self.cpu_bar, self.cpu_spark),
+                ("HANDS / DROPPED", self.frames_value, None)]
+        for row, (name, value, spark) in enumerate(rows, start=1):
+            layout.addWidget(QtWidgets.QLabel(name), row, 0)
+            layout.addWidget(value, row, 1)
+            if spark is not None:
+                layout.addWidget(spark, row, 2)
+        layout.setColumnStretch(2, 1)
+        self.reset()
+
+    def _value_label(self):
+        label = QtWidgets.QLabel()
+        label.setObjectName("MetricValue")
+        return label
+
+    def reset(self, text="--"):
+        self.live = False
+        for label in (self.fps_value, self.inference_value, self.frames_value):
+            label.setText(text)
+            label.setStyleSheet("color: #7f8c8d;")
+        self.cpu_bar.setValue(0)
+        self.cpu_bar.setFormat(text)
+        for spark in (self.fps_spark, self.inference_spark, self.cpu_spark):
+            spark.clear()
+
+    def update_stats(self, stats):
+        fps = stats.get("fps", 0.0)
+        p50, p95, p99 = stats.get("inference_ms", (0.0, 0.0, 0.0))
+        cpu = stats.get("cpu", 0.0)
+
+        self.live = True
+        self.fps_value.setText(f"{fps:5.1f}")
+        self.fps_value.setStyleSheet("color: #e74c3c;" if fps < FPS_WARN else "color: #00ff41;")
+        self.inference_value.setText(f"{p50:.0f} / {p95:.0f} / {p99:.0f} ms")
+        self.inference_value.setStyleSheet("color: #e74c3c;" if p95 > INFERENCE_WARN_MS else "color: #e0e0e0;")
+        self.cpu_bar.setValue(int(min(cpu, 100)))
+        self.cpu_bar.setFormat(f"{cpu:.0f}%")  # may exceed 100% with several cores busy
+        self.frames_value.setText(f"{stats.get('hands', 0)} / {stats.get('dropped', 0)}")
+        self.frames_value.setStyleSheet("color: #e0e0e0;")
+
+        self.fps_spark.add(fps)
+        self.inference_spark.add(p95)
+        self.cpu_spark.add(cpu)
 
 class LauncherWindow(QtWidgets.QMainWindow):
     def __init__(self):
         super().__init__()
         self.setWindowTitle(APP_TITLE)
-        self.setMinimumSize(600, 650)
+        self.setMinimumSize(600, 800)
         self.setStyleSheet(STYLESHEET)
         
-        self.process = None
-        self.process_mode = None
+        self.process = None        # resident runtime (one per camera)
+        self.process_cam = None
+        self.process_mode = None   # mode the runtime is driving, None = idle
+        self.stopping = []         # [process, asked at, signal sent] runtimes on their way out
+        self.pending_scan = None   # use_cache of a scan waiting for those to let go of their cameras
+        self.pending_start = None  # (mode,) of a runtime start waiting likewise
+        self.scan_thread = None
+        self.wanted_cam = None
+        self.switch_requested = None
+        self.last_telemetry = 0.0
 
         self._build_ui()
+        self._setup_telemetry()
         self._populate_cameras()
         self._setup_timer()
 
@@ -236,15 +367,22 @@ class LauncherWindow(QtWidgets.QMainWindow):
         h_cam = QtWidgets.QHBoxLayout()
         self.cam_combo = QtWidgets.QComboBox()
         self.cam_combo.setCursor(QtCore.Qt.CursorShape.PointingHandCursor)
+        self.cam_combo.activated.connect(lambda _: self._start_runtime())  # pre-warm the chosen camera
         h_cam.addWidget(self.cam_combo, 1) # Stretch factor 1
 
         self.refresh_btn = QtWidgets.QPushButton("REFRESH")
         self.refresh_btn.setObjectName("RefreshBtn")
         self.refresh_btn.setCursor(QtCore.Qt.CursorShape.PointingHandCursor)
-        self.refresh_btn.clicked.connect(self._populate_cameras)
+        self.refresh_btn.clicked.connect(lambda: self._populate_cameras(use_cache=False))
         h_cam.addWidget(self.refresh_btn)
 
         cam_layout.addLayout(h_cam)
+
+        # Every camera at once: one inference worker each, hands fused per view
+        self.all_cams_check = QtWidgets.QCheckBox("Use all cameras (one worker per camera)")
+        self.all_cams_check.setCursor(QtCore.Qt.CursorShape.PointingHandCursor)
+        self.all_cams_check.toggled.connect(lambda _: self._start_runtime())
+        cam_layout.addWidget(self.all_cams_check)
         main_layout.addWidget(cam_frame)
 
         # 3. Mode Selection Grid
@@ -303,7 +441,11 @@ class LauncherWindow(QtWidgets.QMainWindow):
         control_layout.addLayout(status_row)
         main_layout.addWidget(control_frame)
 
-        # 5. Console Log
+        # 5. Live Telemetry
+        self.telemetry_panel = TelemetryPanel()
+        main_layout.addWidget(self.telemetry_panel)
+
+        # 6. Console Log
         self.log = QtWidgets.QPlainTextEdit()
         self.log.setReadOnly(True)
         self.log.setMaximumHeight(150)
@@ -316,42 +458,63 @@ class LauncherWindow(QtWidgets.QMainWindow):
         self.log.appendHtml(f"<span style='color: #555;'>[{ts}]</span> <span style='color: #00ff41;'>{msg}</span>")
         self.log.verticalScrollBar().setValue(self.log.verticalScrollBar().maximum())
 
-    def _populate_cameras(self):
+    def _populate_cameras(self, use_cache=True):
+        if self.scan_thread is not None or self.pending_scan is not None:
+            return  # a scan is already streaming in, or about to
         current_idx = self.cam_combo.currentData()
+        if current_idx is not None and current_idx != -1:
+            self.wanted_cam = current_idx  # restore selection if it still exists
         self.cam_combo.clear()
-        self._log("Scanning for video devices...")
-        
-        # Process events to let UI redraw before scan (scan can be slow)
-        QtWidgets.QApplication.processEvents()
-        
-        cams = list_cameras()
-        if not cams:
+        self.cam_combo.addItem("Scanning...", -1)
+        self.refresh_btn.setEnabled(False)
+        self._stop_runtime()  # it holds its camera open, which would hide it from the scan
+        self._log("Scanning for video devices..." if use_cache else "Re-probing all video devices...")
+
+        self.scan_started = time.perf_counter()
+        if self.stopping:
+            self.pending_scan = use_cache  # _reap_stopping() starts it once the camera is free
+            return
+        self._start_scan(use_cache)
+
+    def _start_scan(self, use_cache):
+        self.scan_thread = CameraScanThread(use_cache, self)
+        self.scan_thread.found.connect(self._camera_found)
+        self.scan_thread.finished.connect(self._scan_finished)
+        self.scan_thread.start()
+
+    def _camera_found(self, index, label):
+        if self.cam_combo.currentData() == -1:
+            self.cam_combo.clear()  # drop the "Scanning..." placeholder
+        # Keep the list ordered by index whatever order probes finish in
+        pos = 0
+        while pos < self.cam_combo.count() and self.cam_combo.itemData(pos) < index:
+            pos += 1
+        self.cam_combo.insertItem(pos, label, index)
+        if self.wanted_cam is None or index == self.wanted_cam:
+            self.wanted_cam = index
+            self.cam_combo.setCurrentIndex(pos)
+        self._log(f"Found {label}")
+
+    def _scan_finished(self):
+        self.scan_thread = None
+        self.refresh_btn.setEnabled(not self.process_mode)
+        count = self.cam_combo.count() if self.cam_combo.currentData() != -1 else 0
+        if not count:
+            self.cam_combo.clear()
             self.cam_combo.addItem("No cameras detected", -1)
             self._log("Error: No cameras found.")
             return
-        
-        for idx, label in cams:
-            self.cam_combo.addItem(label, idx)
-        
-        self._log(f"Scan complete. {len(cams)} device(s) found.")
-        
-        # Restore selection if it still exists
-        if current_idx is not None:
-            index = self.cam_combo.findData(current_idx)
-            if index >= 0:
-                self.cam_combo.setCurrentIndex(index)
-            else:
-                self.cam_combo.setCurrentIndex(0)
-        else:
-            self.cam_combo.setCurrentIndex(0)
+        self._log(f"Scan complete. {count} device(s) found in {time.perf_counter() - self.scan_started:.2f}s.")
+        self._start_runtime()
 
     def _update_ui_state(self, running):
         """Toggles buttons based on state"""
-        # Disable mode buttons if running
-        self.btn_general.setEnabled(not running)
-        self.btn_game.setEnabled(not running)
-        self.btn_presentation.setEnabled(not running)
+        # Other modes stay clickable while one runs: the runtime hot-swaps them
+        self.btn_general.setEnabled(self.process_mode != "General")
+        self.btn_game.setEnabled(self.process_mode != "Game")
+        self.btn_presentation.setEnabled(self.process_mode != "Presentation")
         self.cam_combo.setEnabled(not running)
+        self.all_cams_check.setEnabled(not running)
         self.refresh_btn.setEnabled(not running)
         
         # Enable stop button if running
@@ -369,8 +532,8 @@ class LauncherWindow(QtWidgets.QMainWindow):
             self._log(f"Unknown mode: {mode_name}")
             return
             
-        cam_index = self.cam_combo.currentData()
-        if cam_index is None or cam_index == -1:
+        cams = self._selected_cams()
+        if cams is None:
             QtWidgets.QMessageBox.warning(self, "No Camera", "Please select a valid camera source.")
             return
 
@@ -378,64 +541,162 @@ class LauncherWindow(QtWidgets.QMainWindow):
         if self.process and self.process_mode == mode_name and self.process.poll() is None:
             return
 
-        # Stop existing
-        if self.process:
-            self._terminate_process()
+        # Runtime for another camera (or none yet): start one, it begins in this mode
+        if not self.process or self.process.poll() is not None or self.process_cam != cams:
+            if not self._start_runtime(mode_name):
+                return
+        elif not self._send_command(f"mode {mode_name}"):
+            return
 
-        self._log(f"Initializing {mode_name}...")
-        QtCore.QCoreApplication.processEvents()
-        
-        # Small visual delay for "feel"
-        time.sleep(0.2) 
+        self._log(f"Switching to {mode_name}...")
+        self.process_mode = mode_name
+        self.switch_requested = time.perf_counter()
+        self.last_telemetry = time.monotonic()
+        self.telemetry_panel.reset("waiting...")
+        self._update_ui_state(True)
 
-        script_rel = MODES[mode_name]
-        script_path = os.path.join(os.getcwd(), script_rel)
-        
+    def _selected_cams(self):
+        """Camera indices the runtime should use: the selected one, or every one found."""
+        cam_index = self.cam_combo.currentData()
+        if cam_index is None or cam_index == -1:
+            return None
+        if self.all_cams_check.isChecked():
+            return tuple(self.cam_combo.itemData(i) for i in range(self.cam_combo.count()))
+        return (cam_index,)
+
+    def _start_runtime(self, mode_name=None):
+        """Start the resident runtime for the selected camera(s), idle or in mode_name."""
+        cams = self._selected_cams()
+        if cams is None:
+            return False
+        if self.process and self.process.poll() is None and self.process_cam == cams:
+            return True
+        self._stop_runtime()
+        if self.stopping:
+            # The old runtime still owns the camera; _reap_stopping() starts this one when it exits
+            self.pending_start = (mode_name,)
+            return True
+
+        script_path = os.path.join(os.getcwd(), RUNTIME_SCRIPT)
         if not os.path.isfile(script_path):
             QtWidgets.QMessageBox.critical(self, "Script Missing", f"Cannot find:\n{script_path}")
             self._log(f"Error: Script missing at {script_path}")
-            return
+            return False
 
-        cmd = [sys.executable, script_path, "--cam", str(int(cam_index))]
+        if len(cams) == 1:
+            cmd = [sys.executable, script_path, "--cam", str(int(cams[0]))]
+        else:
+            cmd = [sys.executable, script_path, "--cams", *(str(int(c)) for c in cams)]
+        if mode_name:
+            cmd += ["--mode", mode_name]
+        if self.telemetry_sock.state() == QtNetwork.QAbstractSocket.SocketState.BoundState:
+            cmd += ["--telemetry-port", str(self.telemetry_sock.localPort())]
         self._log(f"Executing: {' '.join(cmd)}")
-        
+
         try:
-            self.process = subprocess.Popen(cmd, cwd=os.getcwd())
-            self.process_mode = mode_name
-            self._update_ui_state(True)
-            self._log(f"Process started (PID: {self.process.pid})")
+            self.process = subprocess.Popen(cmd, cwd=os.getcwd(), stdin=subprocess.PIPE, text=True)
+            self.process_cam = cams
+            self._log(f"Runtime started (PID: {self.process.pid}), loading model...")
+            return True
         except Exception as e:
             self._log(f"Launch failed: {e}")
             QtWidgets.QMessageBox.critical(self, "Start Failed", str(e))
             self.process = None
+            self.process_cam = None
             self.process_mode = None
             self._update_ui_state(False)
+            return False
+
+    def _send_command(self, command):
+        """One line to the runtime's stdin; a few bytes into a pipe never blocks the UI."""
+        try:
+            self.process.stdin.write(command + "\n")
+            self.process.stdin.flush()
+            return True
+        except (OSError, ValueError) as e:
+            self._log(f"Runtime not responding ({e}), restarting...")
+            self._terminate_process()
+            return False
+
+    def _stop_runtime(self):
+        self.pending_start = None
+        if self.process:
+            self._terminate_process()
 
     def _terminate_process(self):
+        """Ask the runtime to exit and forget it; _reap_stopping() escalates from the timer."""
         if not self.process:
             return
         try:
-            self._log("Sending terminate signal...")
-            self.process.terminate()
+            self._log("Stopping runtime...")
             try:
-                self.process.wait(timeout=2)
-                self._log("Process terminated gracefully.")
-            except subprocess.TimeoutExpired:
-                self._log("Process unresponsive. Force killing...")
-                self.process.kill()
-                self.process.wait(timeout=2)
-                self._log("Process killed.")
+                self.process.stdin.close()  # EOF -> runtime releases keys and camera and exits
+            except OSError:
+                pass
+            self.stopping.append([self.process, time.monotonic(), None])
         except Exception as e:
             self._log(f"Error during termination: {e}")
         finally:
             self.process = None
+            self.process_cam = None
             self.process_mode = None
+            self.telemetry_panel.reset()
             self._update_ui_state(False)
 
     def stop_mode(self):
-        if not self.process:
+        """Back to idle; the runtime stays warm for the next mode."""
+        if self.pending_start is not None and self.process_mode:
+            self.pending_start = (None,)  # still waiting for the camera: come up idle
+            self._set_idle()
+            return
+        if not self.process or not self.process_mode:
+            return
+        if self._send_command("idle"):
+            self._set_idle()
+
+    def _set_idle(self):
+        self._log(f"Mode '{self.process_mode}' stopped.")
+        self.process_mode = None
+        self.switch_requested = None
+        self.telemetry_panel.reset()
+        self._update_ui_state(False)
+
+    def _reap_stopping(self):
+        """Collect exited runtimes; SIGTERM, then kill, the ones that do not exit."""
+        now = time.monotonic()
+        for entry in list(self.stopping):
+            process, asked, sent = entry
+            try:
+                if process.poll() is not None:
+                    self.stopping.remove(entry)
+                    self._log({None: "Runtime stopped.", "terminate": "Process terminated gracefully.",
+                               "kill": "Process killed."}[sent])
+                elif now - asked > KILL_AFTER_S and sent != "kill":
+                    self._log("Process unresponsive. Force killing...")
+                    process.kill()
+                    entry[2] = "kill"
+                elif now - asked > STOP_GRACE_S and sent is None:
+                    process.terminate()
+                    entry[2] = "terminate"
+            except OSError as e:
+                self._log(f"Error during termination: {e}")
+                self.stopping.remove(entry)
+        if self.stopping:
             return
-        self._terminate_process()
+        # Every old runtime is gone and its camera released: run what waited for that
+        if self.pending_scan is not None:
+            use_cache, self.pending_scan = self.pending_scan, None
+            self._start_scan(use_cache)
+        elif self.pending_start is not None:
+            (mode_name,), self.pending_start = self.pending_start, None
+            self._start_runtime(mode_name)
+
+    def closeEvent(self, event):
+        self._stop_runtime()
+        for process, _, _ in self.stopping:
+            if process.poll() is None:
+                process.terminate()  # the window is going; SIGTERM is the last word
+        super().closeEvent(event)
 
     def _setup_timer(self):
         self.timer = QtCore.QTimer(self)
@@ -443,13 +704,58 @@ class LauncherWindow(QtWidgets.QMainWindow):
         self.timer.timeout.connect(self._poll_process)
         self.timer.start()
 
+    def _setup_telemetry(self):
+        # Event-driven UDP socket: datagrams arrive via readyRead, never blocking the UI
+        self.telemetry_sock = QtNetwork.QUdpSocket(self)
+        if not self.telemetry_sock.bind(QtNetwork.QHostAddress(QtNetwork.QHostAddress.SpecialAddress.LocalHost), 0):
+            self._log(f"Telemetry disabled: {self.telemetry_sock.errorString()}")
+            return
+        self.telemetry_sock.readyRead.connect(self._read_telemetry)
+
+    def _read_telemetry(self):
+        latest = None
+        while self.telemetry_sock.hasPendingDatagrams():
+            datagram = self.telemetry_sock.receiveDatagram()
+            try:
+                record = json.loads(bytes(datagram.data()))
+            except ValueError:
+                continue
+            if "event" in record:
+                self._runtime_event(record)
+            else:
+                latest = record
+        if latest is None or not self.process_mode:
+            return
+        self.last_telemetry = time.monotonic()
+        self.telemetry_panel.update_stats(latest)
+
+    def _runtime_event(self, record):
+        event = record["event"]
+        if event == "ready":
+            self._log("Runtime ready: model loaded, camera open.")
+        elif event == "idle" and self.process_mode:
+            self._set_idle()  # preview closed with ESC / q
+        elif event == "mode" and record.get("mode") == self.process_mode:
+            # Runtime-side switch time, plus the round trip seen from here
+            text = f"{record['switch_ms']:.0f} ms"
+            if self.switch_requested is not None:
+                text += f" ({(time.perf_counter() - self.switch_requested) * 1000:.0f} ms from click)"
+                self.switch_requested = None
+            self.status_label.setText(f"ACTIVE: {self.process_mode.upper()}  |  SWITCH {text}")
+            self._log(f"{self.process_mode} active, switch took {text}")
+
     def _poll_process(self):
+        self._reap_stopping()
         if self.process:
             ret = self.process.poll()
+            if ret is None and self.telemetry_panel.live and time.monotonic() - self.last_telemetry > TELEMETRY_STALE_S:
+                self.telemetry_panel.reset("no data")
             if ret is not None:
-                self._log(f"Mode '{self.process_mode}' ended (Code: {ret})")
+                self._log(f"Runtime ended (Code: {ret})")
                 self.process = None
+                self.process_cam = None
                 self.process_mode = None
+                self.telemetry_panel.reset()
                 self._update_ui_state(False)
                 
                 # Visual feedback on crash/exit
@@ -0,0 +1,140 @@
+# perception_service.py - Capture and hand tracking once, for every process on the machine
+#
+# Runs the camera and one hand model and publishes every processed frame's
+# landmarks on the landmark bus (common/landmark_bus.py): timestamped records
+# in a shared-memory ring that any number of readers map in place. The
+# resident runtime subscribes with --subscribe instead of opening the camera
+# itself; a recorder and third-party tools subscribe the same way:
+#
+#   python perception_service.py --cam 0 --mirror-landmarks
+#   python runtime.py --cam 0 --subscribe
+#   python -m common.landmark_bus record session.trace
+#   python -m common.landmark_bus stats
+#
+# --cam also takes a video file, played at its own frame rate. runtime.py
+# --cams starts one service per camera and fuses them (common/fusion.py).
+#
+# Each frame's image goes on the bus with its landmarks, mirrored the way the
+# landmarks are, so a subscriber's preview shows what the model saw. The
+# service itself has no window. Ctrl+C / SIGTERM stop it; readers then see
+# the bus close.
+
+import argparse
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, ROOT)
+from common.capture import LatestFrameCapture, camera_source
+from common.pipeline import ModePipeline, load_hands_model
+from common.landmarks import EMPTY, landmarks_to_array, handedness_from_results
+from common import metrics as stage_metrics
+from common import roi
+from common import scheduler as load_scheduler
+from common import idle as idle_monitor
+from common import preview
+from common import landmark_bus
+
+CAM_WIDTH, CAM_HEIGHT = 640, 480
+
+
+class HandModel:
+    """The part of a mode's hand detector that ModePipeline and its helpers use."""
+
+    def __init__(self, hands):
+        self.hands = hands
+        self.results = None
+        self.landmarks = EMPTY
+
+
+class PerceptionPipeline(ModePipeline):
+    name = "Perception"
+    headless = True  # nothing is displayed; with mirror_landmarks frames are never flipped
+
+    def __init__(self, bus, max_hands=2, detection_con=0.75, tracking_con=0.75, model_complexity=1,
+                 load_model=True, model=None):
+        if model is None and load_model:
+            model = load_hands_model(max_hands, detection_con, tracking_con, model_complexity)
+        self.detector = HandModel(model)
+        self.bus = bus
+        self._scale = None
+
+    def extract(self, img):
+        h, w = img.shape[:2]
+        if self._scale is None or self._scale[0] != w or self._scale[1] != h:
+            self._scale = np.array((w, h, w), dtype=np.float32)
+        results = self.detector.results
+        normalized = landmarks_to_array(results, 1, 1)
+        labels, scores = handedness_from_results(results)
+        self.bus.write_image(img, mirror=not self.flips_frame())
+        self.bus.write(self.captured, normalized, labels, scores)
+        self.detector.landmarks = normalized * self._scale if len(normalized) else EMPTY
+        return self.detector.landmarks
+
+    def decide(self, features, now=None):
+        return f"{len(features)} hand(s)"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Publish hand landmarks for other processes")
+    parser.add_argument("--cam", type=camera_source, required=True, help="Camera index or video file")
+    stage_metrics.add_arguments(parser)
+    roi.add_arguments(parser)
+    load_scheduler.add_arguments(parser)
+    idle_monitor.add_arguments(parser)
+    landmark_bus.add_arguments(parser)
+    parser.add_argument("--mirror-landmarks", action="store_true",
+                        help="Run the model on the unmirrored frame and mirror the landmarks instead")
+    args = parser.parse_args()
+    metrics = stage_metrics.from_args(args)
+
+    start = time.perf_counter()
+    cap = LatestFrameCapture(args.cam, *(args.capture or (CAM_WIDTH, CAM_HEIGHT))).start()
+    bus = landmark_bus.LandmarkPublisher(CAM_WIDTH, CAM_HEIGHT, args.bus_port)
+    service = PerceptionPipeline(bus)
+    service.warm_up(CAM_WIDTH, CAM_HEIGHT)
+    service.metrics = metrics
+    service.roi = roi.from_args(args, service)
+    service.scheduler = load_scheduler.from_args(args)
+    service.idle = idle_monitor.from_args(args)
+    service.mirror_landmarks = args.mirror_landmarks
+    print(f"Perception service ready in {time.perf_counter() - start:.2f}s "
+          f"(camera {args.cam}, bus on 127.0.0.1:{args.bus_port})", flush=True)
+
+    stop = threading.Event()
+    preview.on_shutdown_signal(stop.set)
+    try:
+        while not stop.is_set():
+            t = time.perf_counter()
+            success, frame, ts = cap.read()
+            metrics.lap("capture_wait", t)
+            if not success:
+                if cap.ended:
+                    break  # a video file ran out; readers see the bus close
+                continue
+
+            service.step(frame, captured=ts)
+            bus.publish(metrics)
+            cap.publish(metrics)
+            if service.roi:
+                service.roi.publish(metrics)
+            if service.scheduler:
+                service.scheduler.publish(metrics)
+            if service.idle:
+                service.idle.publish(metrics)
+                if service.idle.sleeping:
+                    stop.wait(service.idle.wait_ms() / 1000)  # idle: poll slowly
+    finally:
+        cap.release()
+        bus.close()
+    if args.metrics_dump:
+        metrics.dump(args.metrics_dump)
+    print("Perception service stopped.")
+
+
+if __name__ == "__main__":
+    main()
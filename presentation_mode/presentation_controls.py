@@ -2,26 +2,27 @@
 
 import pyautogui
 import numpy as np
+from common.cursor_engine import engine
 
 screen_width, screen_height = pyautogui.size()
 
 FRAME_REDUCTION = 120
-SMOOTHING = 6          # Feels buttery smooth
 PADDING = 0.22         # Reach every corner easily
 
-prev_x = screen_width // 2
-prev_y = screen_height // 2
+# Smoothing and prediction happen in the cursor engine, at display rate; it is
+# shared with the other modes, so every update names this mode's bounds
+BOUNDS = (0, 0, screen_width - 1, screen_height - 1)
 
 
-def move_cursor(index_tip_x, index_tip_y, frame_width=640, frame_height=480):
-    global prev_x, prev_y
-
+def move_cursor(index_tip_x, index_tip_y, frame_width=640, frame_height=480, captured=None):
+    """captured: time.monotonic() of the camera frame, for latency compensation"""
     x_min = FRAME_REDUCTION
     x_max = frame_width - FRAME_REDUCTION
     y_min = FRAME_REDUCTION
     y_max = frame_height - FRAME_REDUCTION
 
     if not (x_min <= index_tip_x <= x_max and y_min <= index_tip_y <= y_max):
+        hold()
         return False, None
 
     # NO X-FLIP HERE → natural left/right movement!
@@ -33,10 +34,11 @@ def move_cursor(index_tip_x, index_tip_y, frame_width=640, frame_height=480):
     target_x = np.clip(target_x, 0, screen_width - 1)
     target_y = np.clip(target_y, 0, screen_height - 1)
 
-    curr_x = prev_x + (target_x - prev_x) / SMOOTHING
-    curr_y = prev_y + (target_y - prev_y) / SMOOTHING
+    engine.update(target_x, target_y, captured, BOUNDS)
+
+    return True, (int(target_x), int(target_y))
 
-    pyautogui.moveTo(curr_x, curr_y, duration=0)
 
-    prev_x, prev_y = curr_x, curr_y
-    return True, (int(curr_x), int(curr_y))
\ No newline at end of file
+def hold():
+    """Freeze the pointer where it is (cursor gesture ended)."""
+    engine.reset()
\ No newline at end of file
@@ -1,152 +1,227 @@
 # presentation_gestures.py - FINAL WORKING VERSION (NO PLACEHOLDERS)
 
+import os
 import cv2
-import pyautogui
 import time
-import mediapipe as mp
 import presentation_controls as cursor
+from common import output
+from common import gesture_table
+from common.triggers import TriggerSet
+from common.landmarks import landmarks_to_array, handedness_from_results, TIP_IDS
+from common.features import FrameFeatures
+from common.filters import OneEuroFilter
+from common.tracking import HandTracker
+
+# Thumb counts as up when its tip is left of the IP joint; other fingertips
+# must clear their PIP joint by this many pixels.
+THUMB_SIDE = -1
+FINGER_MARGIN = 15
+
+# Seconds a slide pose must be held before the slide changes, and let go before it can again
+SLIDE_RISE = 0.1
+SLIDE_FALL = 0.15
+
+GESTURE_MAP = os.path.join(os.path.dirname(os.path.abspath(__file__)), "presentation_gestures.json")
 
 class handDetector:
-    def __init__(self, mode=False, maxHands=2, detectionCon=0.8, trackCon=0.8):
-        self.mpHands = mp.solutions.hands
-        self.hands = self.mpHands.Hands(
-            static_image_mode=mode,
-            max_num_hands=maxHands,
-            model_complexity=1,
-            min_detection_confidence=detectionCon,
-            min_tracking_confidence=trackCon
-        )
-        self.mpDraw = mp.solutions.drawing_utils
-        self.tipIds = [4, 8, 12, 16, 20]  # thumb, index, middle, ring, pinky
+    def __init__(self, mode=False, maxHands=2, detectionCon=0.8, trackCon=0.8, modelComplexity=1,
+                 loadModel=True, model=None):
+        self.results = None
+
+        # loadModel=False -> landmarks only arrive through setHands (trace replay)
+        # model          -> reuse an already-loaded Hands instance (resident runtime)
+        self.mpHands = self.hands = self.mpDraw = None
+        if loadModel:
+            import mediapipe as mp
+            self.mpHands = mp.solutions.hands
+            self.hands = model or self.mpHands.Hands(
+                static_image_mode=mode,
+                max_num_hands=maxHands,
+                model_complexity=modelComplexity,
+                min_detection_confidence=detectionCon,
+                min_tracking_confidence=trackCon
+            )
+            self.mpDraw = mp.solutions.drawing_utils
+        self.tipIds = TIP_IDS  # thumb, index, middle, ring, pinky
+        self.tracker = HandTracker()  # stable IDs and smoothed handedness
+        self.landmarkFilter = OneEuroFilter()  # set to None for raw landmarks
+        self.history = None  # common.history.LandmarkHistory, fed the filtered landmarks
 
     def findHands(self, img, draw=True):
         imgRGB = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
         self.results = self.hands.process(imgRGB)
-        if self.results.multi_hand_landmarks:
+        self.updateLandmarks(img)
+        if draw:
+            self.drawHands(img)
+        return img
+
+    def updateLandmarks(self, img, t=None):
+        h, w = img.shape[:2]
+        labels, scores = handedness_from_results(self.results)
+        return self.setHands(landmarks_to_array(self.results, w, h), labels, scores, t)
+
+    def setHands(self, landmarks, labels, scores, t=None):
+        """Load (hands, 21, 3) pixel landmarks from any source (camera or recorded trace); t = capture time"""
+        self.ids, labels = self.tracker.update(landmarks, labels, scores, t)
+        if self.landmarkFilter is not None:
+            landmarks = self.landmarkFilter(landmarks, self.ids, t)
+        if self.history is not None:
+            self.history.push(landmarks, self.ids, t)
+        self.landmarks = landmarks
+        self.labels, self.scores = labels, scores
+        self.features = FrameFeatures(self.landmarks, self.labels,
+                                      thumb_sides=[THUMB_SIDE] * len(self.landmarks),
+                                      finger_margin=FINGER_MARGIN, ids=self.ids)
+        return self.features
+
+    def drawHands(self, img):
+        if self.results is not None and self.results.multi_hand_landmarks:
             for handLms in self.results.multi_hand_landmarks:
-                if draw:
-                    self.mpDraw.draw_landmarks(img, handLms, self.mpHands.HAND_CONNECTIONS)
+                self.mpDraw.draw_landmarks(img, handLms, self.mpHands.HAND_CONNECTIONS)
         return img
 
     def findPosition(self, img, handNo=0, draw=False):
-        lmList = []
-        if self.results.multi_hand_landmarks and len(self.results.multi_hand_landmarks) > handNo:
-            myHand = self.results.multi_hand_landmarks[handNo]
-            h, w, _ = img.shape
-            for id, lm in enumerate(myHand.landmark):
-                cx, cy = int(lm.x * w), int(lm.y * h)
-                lmList.append([id, cx, cy])
-                if draw:
-                    cv2.circle(img, (cx, cy), 7, (255, 0, 255), -1)
-        return lmList
+        if handNo >= len(self.landmarks):
+            return None
+        lm = self.landmarks[handNo]
+        if draw:
+            for cx, cy in lm[:, :2].astype(int):
+                cv2.circle(img, (cx, cy), 7, (255, 0, 255), -1)
+        return lm
 
     def getHandedness(self, handNo=0):
         if self.results.multi_handedness and len(self.results.multi_handedness) > handNo:
             return self.results.multi_handedness[handNo].classification[0].label
         return "Unknown"
 
-    def fingersUp(self, lmList):
-        if not lmList:
+    def fingersUp(self, lm):
+        if lm is None or len(lm) == 0:
             return [0, 0, 0, 0, 0]
-
-        fingers = []
-
-        # Thumb
-        if lmList[4][1] < lmList[3][1]:        # tip left of IP joint → thumb up
-            fingers.append(1)
-        else:
-            fingers.append(0)
-
-        # Index to Pinky
-        for i in range(1, 5):
-            tip_y = lmList[self.tipIds[i]][2]
-            pip_y = lmList[self.tipIds[i] - 2][2]
-            fingers.append(1 if tip_y < pip_y - 15 else 0)
-
-        return fingers
+        features = FrameFeatures(lm[None], thumb_sides=[THUMB_SIDE], finger_margin=FINGER_MARGIN)
+        return features.hand(0).fingers
 
 
 class GestureManager:
-    def __init__(self, cam_width=640, cam_height=480, frame_reduction=120):
+    def __init__(self, cam_width=640, cam_height=480, frame_reduction=120, gesture_map=GESTURE_MAP):
         self.cam_width = cam_width
         self.cam_height = cam_height
         self.frame_reduction = frame_reduction
         self.is_drawing = False
 
-        # Anti-spam cooldown
-        self.cooldown = 1.4
-        self.last_next = 0
-        self.last_prev = 0
-        self.last_undo = 0
+        # Slide changes fire once per pose, after it has been held for SLIDE_RISE
+        # (a wrong slide costs more than a late one); let go to step again
+        self.triggers = TriggerSet(prev_slide=(SLIDE_RISE, SLIDE_FALL), next_slide=(SLIDE_RISE, SLIDE_FALL))
 
         self.auto_pen = True   # automatically press Ctrl+P when you start drawing
 
-    def process_gesture(self, lmList_left, lmList_right, fingers_left, fingers_right):
-        now = time.time()
-
+        # Pose -> action lookup compiled from the gesture map (one hand: right, else left)
+        self.gestures = gesture_table.load(gesture_map, self, hands=("hand",))
+        self.motions = []  # common.motion events since the last frame, see queue_motion()
+
+    def process_gesture(self, hand_left, hand_right, now=None, captured=None):
+        """
+        hand_left / hand_right are common.features.HandFeatures (or None).
+        now overrides the clock, e.g. with trace timestamps during replay.
+        captured is the camera frame's time.monotonic(), for cursor prediction.
+        """
+        now = time.time() if now is None else now
+        self.triggers.begin(now)
+        result = self._dispatch(hand_left, hand_right, now, captured)
+        self.triggers.end()
+        return result
+
+    def _dispatch(self, hand_left, hand_right, now, captured):
         # Use ANY hand (left or right)
-        hand_lm = lmList_right or lmList_left
-        hand_fingers = fingers_right or fingers_left
+        hand = hand_right if hand_right is not None else hand_left
+        events, self.motions = self.motions, []
 
-        if not hand_lm:
+        if hand is None:
+            cursor.hold()
             if self.is_drawing:
-                pyautogui.mouseUp()
+                output.mouse_up()
                 self.is_drawing = False
             return "NO HAND", False
 
-        idx_x, idx_y = hand_lm[8][1], hand_lm[8][2]
-
-        # PREV SLIDE — Thumb only
-        if hand_fingers == [1, 0, 0, 0, 0]:
-            if now - self.last_next > self.cooldown:
-                pyautogui.press('left')
-                self.last_next = now
-            if self.is_drawing:
-                pyautogui.mouseUp()
-                self.is_drawing = False
-            return "PREV SLIDE", False
-
-        # NEXT SLIDE — Fist
-        elif hand_fingers == [0, 0, 0, 0, 0]:
-            if now - self.last_prev > self.cooldown:
-                pyautogui.press('right')
-                self.last_prev = now
-            if self.is_drawing:
-                pyautogui.mouseUp()
-                self.is_drawing = False
-            return "NEXT SLIDE", False
-
-        # DOODLE — Index + Middle
-        # elif hand_fingers == [0, 1, 1, 0, 0]:
-        #     if not self.is_drawing and self.auto_pen:
-        #         pyautogui.hotkey('ctrl', 'p')   # PowerPoint pen mode
-        #     if not self.is_drawing:
-        #         pyautogui.mouseDown(button='left')
-        #         self.is_drawing = True
-        #     cursor.move_cursor(idx_x, idx_y, self.cam_width, self.cam_height)
-        #     return "DOODLING", False
-
-        # CURSOR — Index only
-        elif hand_fingers == [0, 1, 0, 0, 0]:
-            if self.is_drawing:
-                pyautogui.mouseUp()
-                self.is_drawing = False
-            cursor.move_cursor(idx_x, idx_y, self.cam_width, self.cam_height)
-            return "CURSOR", False
-
-        # UNDO — Open palm
-        # elif hand_fingers == [1, 1, 1, 1, 1]:
-        #     if now - self.last_undo > self.cooldown:
-        #         pyautogui.hotkey('ctrl', 'z')
-        #         self.last_undo = now
-        #     return "UNDO", False
-
-        # Anything else → stop drawing
-        # if self.is_drawing:
-        #     pyautogui.mouseUp()
-        #     self.is_drawing = False
-
-        return "SHOW HAND", False
+        # A finished swipe wins the frame over the pose it ended in
+        for event in events:
+            result = self.gestures.dispatch_motion(event.name, (hand.mask,), hand, now, captured)
+            if result is not None:
+                return result
+
+        result = self.gestures.dispatch((hand.mask,), hand, now, captured)
+        if result is None:
+            cursor.hold()  # pointer stays put for every non-cursor gesture
+            # Anything else → stop drawing
+            # self._stop_drawing()
+            return "SHOW HAND", False
+        return result
+
+    def queue_motion(self, event):
+        """MotionRecognizer callback: handled by the next process_gesture()."""
+        self.motions.append(event)
+
+    def _stop_drawing(self):
+        if self.is_drawing:
+            output.mouse_up()
+            self.is_drawing = False
+
+    # ============================
+    # ACTIONS (named in presentation_gestures.json)
+    # ============================
+    # PREV SLIDE — Thumb only
+    def on_prev_slide(self, hand, now, captured):
+        cursor.hold()
+        if self.triggers.fire("prev_slide"):
+            output.press('left')
+        self._stop_drawing()
+        return "PREV SLIDE", False
+
+    # NEXT SLIDE — Fist
+    def on_next_slide(self, hand, now, captured):
+        cursor.hold()
+        if self.triggers.fire("next_slide"):
+            output.press('right')
+        self._stop_drawing()
+        return "NEXT SLIDE", False
+
+    # SWIPES — open palm moved sideways (motions, see common/motion.py).
+    # The recognizer fires once per swipe, so these step straight away.
+    def on_swipe_next(self, hand, now, captured):
+        cursor.hold()
+        output.press('right')
+        self._stop_drawing()
+        return "NEXT SLIDE", False
+
+    def on_swipe_prev(self, hand, now, captured):
+        cursor.hold()
+        output.press('left')
+        self._stop_drawing()
+        return "PREV SLIDE", False
+
+    # DOODLE — Index + Middle
+    # def on_doodle(self, hand, now, captured):
+    #     cursor.hold()
+    #     if not self.is_drawing and self.auto_pen:
+    #         pyautogui.hotkey('ctrl', 'p')   # PowerPoint pen mode
+    #     if not self.is_drawing:
+    #         pyautogui.mouseDown(button='left')
+    #         self.is_drawing = True
+    #     cursor.move_cursor(idx_x, idx_y, self.cam_width, self.cam_height)
+    #     return "DOODLING", False
+
+    # CURSOR — Index only
+    def on_cursor(self, hand, now, captured):
+        self._stop_drawing()
+        idx_x, idx_y = hand.index_tip
+        cursor.move_cursor(idx_x, idx_y, self.cam_width, self.cam_height, captured)
+        return "CURSOR", False
+
+    # UNDO — Open palm
+    # def on_undo(self, hand, now, captured):
+    #     cursor.hold()
+    #     if self.triggers.fire("undo"):
+    #         pyautogui.hotkey('ctrl', 'z')
+    #     return "UNDO", False
 
 
 # UI helpers
@@ -169,5 +244,9 @@ class FPSCounter:
         self.prev = now
         return self.fps
 
-    def draw(self, img, pos=(20, 50)):
-        cv2.putText(img, f'FPS: {self.fps}', pos, cv2.FONT_HERSHEY_SIMPLEX, 1.2, (0, 255, 0), 3)
\ No newline at end of file
+    def draw(self, img, pos=(20, 50), note="", fps=None):
+        """fps: a value read earlier, when drawing on another thread"""
+        fps = self.fps if fps is None else fps
+        cv2.putText(img, f'FPS: {fps}', pos, cv2.FONT_HERSHEY_SIMPLEX, 1.2, (0, 255, 0), 3)
+        if note:  # e.g. idle state / wake latency
+            cv2.putText(img, note, (pos[0], pos[1] + 32), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 200, 255), 2)
\ No newline at end of file
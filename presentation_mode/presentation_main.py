@@ -4,9 +4,26 @@ import cv2
 import pyautogui
 import argparse
 import time
-from presentation_gestures import handDetector, GestureManager, draw_status, draw_active_zone, FPSCounter
 import ctypes
+import os
 import sys
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.capture import LatestFrameCapture, camera_source
+from common.trace import TraceWriter
+from common.pipeline import ModePipeline
+from common import metrics as stage_metrics
+from common import roi
+from common import scheduler as load_scheduler
+from common import idle
+from common import preview
+from common import gesture_table
+from common import motion
+from common import output
+from common.cursor_engine import engine as cursor_engine
+
+from presentation_gestures import handDetector, GestureManager, draw_status, draw_active_zone, FPSCounter, GESTURE_MAP
 
 
 def change_cursor_to_hand():
@@ -32,61 +49,163 @@ def restore_cursor():
     except:
         pass
 
-# Call at start
-change_cursor_to_hand()
-
 pyautogui.FAILSAFE = True
 pyautogui.PAUSE = 0
 
-parser = argparse.ArgumentParser()
-parser.add_argument("--cam", type=int, required=True)
-args = parser.parse_args()
-
-cap = cv2.VideoCapture(args.cam, cv2.CAP_DSHOW)
-cap.set(3, 640)
-cap.set(4, 480)
-
-detector = handDetector()
-manager = GestureManager()
-fps = FPSCounter()
-
-print("\nAIR PRESENTATION CONTROLLER READY!")
-print("Thumb → Next | Fist → Prev | Index+Middle → Draw | Open Palm → Undo\n")
-
-while True:
-    ret, img = cap.read()
-    if not ret: break
-    img = cv2.flip(img, 1)
-
-    img = detector.findHands(img)
-    lmlist_l = lmlist_r = fingers_l = fingers_r = None
-
-    if detector.results.multi_hand_landmarks:
-        for i in range(len(detector.results.multi_hand_landmarks)):
-            lm = detector.findPosition(img, i)
-            fingers = detector.fingersUp(lm)
-            hand = detector.getHandedness(i)
-            if hand == "Left":
-                lmlist_l, fingers_l = lm, fingers
+CAM_WIDTH, CAM_HEIGHT = 640, 480
+WINDOW_NAME = "AirInteract - Presentation Controller"
+DISPATCH_CALLS = ("moveTo", "mouseDown", "mouseUp", "press", "hotkey")
+
+
+class PresentationMode(ModePipeline):
+    """One frame of Presentation Mode, split into stages so each can be timed."""
+    name = "Presentation"
+
+    def __init__(self, max_hands=2, detection_con=0.8, tracking_con=0.8, model_complexity=1,
+                 cam_width=CAM_WIDTH, cam_height=CAM_HEIGHT, load_model=True, model=None,
+                 gesture_map=GESTURE_MAP):
+        self.detector = handDetector(maxHands=max_hands, detectionCon=detection_con,
+                                     trackCon=tracking_con, modelComplexity=model_complexity,
+                                     loadModel=load_model, model=model)
+        self.manager = GestureManager(cam_width, cam_height, gesture_map=gesture_map)
+        self.motion = motion.attach(self.detector, self.manager)  # swipes in the gesture map
+        self.work_size = (cam_width, cam_height)
+        self.zone_margin = self.manager.frame_reduction
+        self.fps = FPSCounter()
+
+    def activate(self):
+        pyautogui.FAILSAFE = True
+        change_cursor_to_hand()
+
+    def extract(self, img):
+        return self.detector.updateLandmarks(img, self.captured)
+
+    def load_hands(self, landmarks, labels, scores, width, height, t=None):
+        """Stand-in for infer + extract when landmarks come from a recorded trace"""
+        return self.detector.setHands(landmarks, labels, scores, t)
+
+    def decide(self, features, now=None):
+        hand_l = hand_r = None
+        for hand in features.hands:
+            if hand.label == "Left":
+                hand_l = hand
             else:
-                lmlist_r, fingers_r = lm, fingers
-
-    status, _ = manager.process_gesture(lmlist_l, lmlist_r, fingers_l, fingers_r)
-
-    draw_active_zone(img)
-    draw_status(img, status)
-    fps.draw(img)
-
-    cv2.imshow("AirInteract - Presentation Controller", img)
-    if cv2.waitKey(1) == 27:  # ESC
-        if manager.is_drawing:
-            pyautogui.mouseUp()
-        break
-
-cap.release()
-cv2.destroyAllWindows()
-
-# Call at end
-restore_cursor()
-
-print("Goodbye!")
\ No newline at end of file
+                hand_r = hand
+
+        if self.motion:
+            self.motion.update()  # queues finished swipes on the manager
+        status, _ = self.manager.process_gesture(hand_l, hand_r, now, self.captured)
+        self.fps.update()  # gesture loop rate, not the preview's
+        return status
+
+    def snapshot(self):
+        """Hands, FPS and idle note for render(); the preview thread draws them after this frame."""
+        return self.detector.landmarks.copy(), self.fps.fps, self.idle.label() if self.idle else ""
+
+    def render(self, img, status, state):
+        landmarks, fps, note = state
+        preview.draw_hands(img, landmarks)
+        draw_active_zone(img)
+        draw_status(img, status)
+        self.fps.draw(img, note=note, fps=fps)
+        return img
+
+    def close(self):
+        if self.manager.is_drawing:
+            output.mouse_up()
+            self.manager.is_drawing = False
+        self.manager.motions.clear()
+        self.manager.triggers.reset()
+        if self.motion:
+            self.motion.reset()
+        restore_cursor()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cam", type=camera_source, required=True, help="Camera index, or a video file")
+    parser.add_argument("--record-landmarks", metavar="PATH", help="Append every frame's landmarks to a trace file")
+    stage_metrics.add_arguments(parser)
+    roi.add_arguments(parser)
+    load_scheduler.add_arguments(parser)
+    idle.add_arguments(parser)
+    parser.add_argument("--mirror-landmarks", action="store_true",
+                        help="Run the model on the unmirrored frame and mirror the landmarks instead")
+    preview.add_arguments(parser)
+    gesture_table.add_arguments(parser, GESTURE_MAP)
+    args = parser.parse_args()
+    metrics = stage_metrics.from_args(args)
+    metrics.instrument(pyautogui, DISPATCH_CALLS)
+    output.dispatcher.start()  # mouse / keyboard calls leave the vision thread
+    cursor_engine.start()      # pointer updates at display rate
+
+    # Camera opens on its own thread while the model loads and warms up here
+    cap = LatestFrameCapture(args.cam, *(args.capture or (CAM_WIDTH, CAM_HEIGHT))).start()
+    mode = PresentationMode(gesture_map=args.gestures)
+    mode.warm_up(CAM_WIDTH, CAM_HEIGHT)
+    mode.metrics = metrics
+    mode.roi = roi.from_args(args, mode)
+    mode.scheduler = load_scheduler.from_args(args)
+    mode.idle = idle.from_args(args, mode.zone_margin)
+    mode.mirror_landmarks = args.mirror_landmarks
+    mode.headless = args.headless
+    mode.activate()  # hand cursor until close()
+    recorder = TraceWriter(args.record_landmarks, CAM_WIDTH, CAM_HEIGHT) if args.record_landmarks else None
+
+    print("\nAIR PRESENTATION CONTROLLER READY!")
+    print("Thumb → Next | Fist → Prev | Index+Middle → Draw | Open Palm → Undo\n")
+
+    # Preview draws and shows frames on its own thread; Ctrl+C / SIGTERM stop headless runs
+    view = preview.from_args(args, WINDOW_NAME, metrics)
+    stop = threading.Event()
+    preview.on_shutdown_signal(stop.set)
+
+    while not stop.is_set():
+        t = time.perf_counter()
+        ret, frame, ts = cap.read()
+        metrics.lap("capture_wait", t)
+        if not ret:
+            if cap.ended:
+                break  # a video file ran out
+            continue  # capture thread is reconnecting
+
+        img, status = mode.step(frame, captured=ts)
+        if recorder:
+            recorder.write_results(ts, mode.detector.results)
+
+        if view:
+            view.submit(img, status, mode.render, mode.snapshot)
+            view.publish(metrics)
+        cap.publish(metrics)
+        if mode.roi:
+            mode.roi.publish(metrics)
+        if mode.scheduler:
+            mode.scheduler.publish(metrics)
+        if mode.idle:
+            mode.idle.publish(metrics)
+        if mode.motion:
+            mode.motion.publish(metrics)
+        output.dispatcher.publish(metrics)
+        cursor_engine.publish(metrics)
+        if view and view.exit_requested.is_set():  # ESC in the preview window
+            break
+        if mode.idle and mode.idle.sleeping:
+            stop.wait(mode.idle.wait_ms() / 1000)  # idle: poll slowly
+
+    if view:
+        view.stop()
+    cursor_engine.stop()
+    mode.close()
+    output.dispatcher.stop()
+    if args.metrics_dump:
+        metrics.dump(args.metrics_dump)
+    if recorder:
+        recorder.close()
+    cap.release()
+    cv2.destroyAllWindows()
+
+    print("Goodbye!")
+
+
+if __name__ == "__main__":
+    main()
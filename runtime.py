@@ -0,0 +1,343 @@
+# runtime.py - Resident AirInteract runtime: every mode in one warm process
+#
+# The launcher starts this once per camera. It imports all three modes, loads
+# and warms the hand model(s) and keeps the camera open, then takes commands
+# on stdin, one per line:
+#
+#   mode General|Game|Presentation   drive input with that mode
+#   idle                             stop gestures and hide the preview
+#   quit                             (EOF on stdin does the same)
+#
+# Switching only closes one pipeline object and activates another, so it costs
+# milliseconds instead of a new interpreter, model load and camera open. Each
+# switch is reported to the launcher as a telemetry event. The preview window
+# runs on its own thread (none with --headless); SIGTERM / Ctrl+C quit.
+#
+# With --subscribe the runtime opens neither camera nor model: it reads hand
+# landmarks from a running perception_service.py over the landmark bus, and
+# the preview shows the image the service shares with them. With --cams it
+# starts one perception_service.py per camera (or video file) itself and fuses
+# their landmarks per hand (common/fusion.py); the service processes stop with
+# it.
+
+import argparse
+import importlib
+import inspect
+import os
+import queue
+import sys
+import threading
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, ROOT)
+from common.capture import LatestFrameCapture, camera_source
+from common.pipeline import load_hands_model, model_settings
+from common import metrics as stage_metrics
+from common import roi
+from common import scheduler as load_scheduler
+from common import idle as idle_monitor
+from common import preview
+from common import landmark_bus
+from common import fusion
+from common import output
+from common.cursor_engine import engine as cursor_engine
+
+MODES = {
+    "General": ("general_mode", "general_main", "GeneralMode"),
+    "Game": ("game_mode", "game_main", "GameMode"),
+    "Presentation": ("presentation_mode", "presentation_main", "PresentationMode"),
+}
+CAM_WIDTH, CAM_HEIGHT = 640, 480
+WINDOW_NAME = "AirInteract"
+EXIT_KEYS = (27, ord('q'))  # ESC (General / Presentation), q (Game)
+
+
+def load_mode_module(name):
+    folder, module_name, class_name = MODES[name]
+    mode_dir = os.path.join(ROOT, folder)
+    if mode_dir not in sys.path:
+        sys.path.insert(0, mode_dir)
+    module = importlib.import_module(module_name)
+    return module, getattr(module, class_name)
+
+
+def read_commands(commands):
+    for line in sys.stdin:
+        if line.strip():
+            commands.put(line.strip())
+    commands.put("quit")  # launcher closed our stdin
+
+
+class ResidentRuntime:
+    def __init__(self, cam, metrics, capture=None, scheduler=None, idle=True, mirror_landmarks=False,
+                 view=None, source=None, gestures_dir=None):
+        self.metrics = metrics
+        self.view = view                 # PreviewThread, None = headless
+        self.source = source             # LandmarkSubscriber; None = own camera and model
+        if source is None:
+            self.cap = LatestFrameCapture(cam, *(capture or (CAM_WIDTH, CAM_HEIGHT))).start()
+        else:
+            self.cap = None
+            self.canvas = np.zeros((source.height, source.width, 3), dtype=np.uint8)
+            capture = scheduler = None
+            idle = False
+
+        # One model per distinct setting; modes with equal defaults share it
+        # (and, with a capture size, the crop tracker that feeds it)
+        models = {}
+        rois = {}
+        self.pipelines = {}
+        self.titles = {}
+        for name in MODES:
+            module, cls = load_mode_module(name)
+            settings = model_settings(cls)
+            if source is not None:
+                kwargs = {"load_model": False}
+                rois[settings] = None
+            else:
+                if settings not in models:
+                    models[settings] = load_hands_model(*settings)
+                    rois[settings] = roi.RoiInference(models[settings], settings[0]) if capture else None
+                kwargs = {"model": models[settings]}
+            params = inspect.signature(cls).parameters
+            if gestures_dir:
+                # A deployment's gesture maps replace the modes' own, file by file
+                custom = os.path.join(gestures_dir, os.path.basename(params["gesture_map"].default))
+                if os.path.exists(custom):
+                    kwargs["gesture_map"] = custom
+            pipeline = cls(**kwargs)
+            pipeline.metrics = metrics
+            pipeline.roi = rois[settings]
+            pipeline.scheduler = scheduler
+            pipeline.idle = idle_monitor.IdleMonitor(pipeline.zone_margin) if idle else None
+            pipeline.mirror_landmarks = mirror_landmarks
+            pipeline.headless = view is None
+            self.pipelines[name] = pipeline
+            self.titles[name] = module.WINDOW_NAME
+            calls = getattr(module, "DISPATCH_CALLS", ())
+            if calls:
+                import pyautogui  # output backend of the modes that use it; Game sends its own keys
+                metrics.instrument(pyautogui, calls)
+
+        output.dispatcher.start()
+        cursor_engine.start()
+        self.active = None
+        self.switch_started = None
+        self.commands = queue.Queue()
+        threading.Thread(target=read_commands, args=(self.commands,), name="commands", daemon=True).start()
+
+    # ============================
+    # SWITCHING
+    # ============================
+    def switch(self, name):
+        self.switch_started = time.perf_counter()
+        if self.active is not None:
+            self.pipelines[self.active].close()
+            cursor_engine.reset()
+            if self.pipelines[self.active].roi:
+                self.pipelines[self.active].roi.reset()
+            if self.pipelines[self.active].scheduler:
+                self.pipelines[self.active].scheduler.reset()
+            if self.pipelines[self.active].idle:
+                self.pipelines[self.active].idle.reset()
+        if name is None:
+            if self.view:
+                self.view.hide()
+            self.active = None
+            self.switch_started = None
+            self.report({"event": "idle"})
+            return
+        self.pipelines[name].activate()
+        self.active = name
+        if self.view:
+            self.view.set_title(self.titles[name])
+
+    def handle(self, command):
+        """Returns False on quit."""
+        verb, _, arg = command.partition(" ")
+        if verb == "quit":
+            return False
+        if verb == "idle":
+            if self.active is not None:
+                self.switch(None)
+        elif verb == "mode" and arg in self.pipelines:
+            if arg != self.active:
+                self.switch(arg)
+        else:
+            print(f"Unknown command: {command}")
+        return True
+
+    def report(self, record):
+        telemetry = getattr(self.metrics, "telemetry", None)
+        if telemetry is not None:
+            telemetry.send(record)
+        print(" ".join(f"{k}={v}" for k, v in record.items()), flush=True)
+
+    # ============================
+    # FRAME LOOP
+    # ============================
+    def run(self):
+        try:
+            while True:
+                try:
+                    # Idle: nothing to do until the launcher asks for a mode. An idle
+                    # pipeline polls slowly, waiting here so commands still get through.
+                    wait = self.poll_wait()
+                    command = self.commands.get(timeout=wait) if wait else self.commands.get_nowait()
+                    if not self.handle(command):
+                        break
+                    continue
+                except queue.Empty:
+                    if self.active is None:
+                        continue
+                self.process_frame()
+        finally:
+            if self.view:
+                self.view.stop()
+            if self.active is not None:
+                self.pipelines[self.active].close()
+            cursor_engine.stop()
+            output.dispatcher.stop()
+            if self.cap:
+                self.cap.release()
+            if self.source:
+                self.source.close()
+            if self.view:
+                import cv2  # only the preview opens windows
+                cv2.destroyAllWindows()
+
+    def poll_wait(self):
+        """Seconds to wait for a command before the next frame (0 = don't wait)."""
+        if self.active is None:
+            return 0.1
+        idle = self.pipelines[self.active].idle
+        return idle.wait_ms() / 1000 if idle and idle.sleeping else 0
+
+    def process_frame(self):
+        if self.source is not None:
+            return self.process_landmarks()
+        metrics = self.metrics
+        t = time.perf_counter()
+        ret, frame, ts = self.cap.read()
+        metrics.lap("capture_wait", t)
+        if not ret:
+            if self.cap.ended:
+                print("Video file ended.", flush=True)
+                self.commands.put("quit")
+            return
+
+        pipeline = self.pipelines[self.active]
+        img, status = pipeline.step(frame, captured=ts)
+        self.cap.publish(metrics)
+        self.finish_frame(pipeline, img, status)
+
+    def process_landmarks(self):
+        """process_frame() for --subscribe: the newest frame off the landmark bus."""
+        metrics = self.metrics
+        t = time.perf_counter()
+        frame = self.source.read(timeout=0.1, latest=True)
+        metrics.lap("capture_wait", t)
+        if frame is None:
+            if self.source.closed:
+                print("Landmark bus closed; perception service stopped.", flush=True)
+                self.commands.put("quit")
+            return
+
+        pipeline = self.pipelines[self.active]
+        self.source.publish(metrics)
+        if self.view:
+            self.source.image(self.canvas)  # else the canvas keeps the last image it got
+        ts, landmarks, labels, scores = self.source.hands(frame)
+        status = pipeline.step_hands(landmarks, labels, scores, self.source.width, self.source.height,
+                                     captured=ts)
+        self.finish_frame(pipeline, self.canvas, status)
+
+    def finish_frame(self, pipeline, img, status):
+        metrics = self.metrics
+        if self.view:
+            self.view.submit(img, status, pipeline.render, pipeline.snapshot)
+            self.view.publish(metrics)
+        if pipeline.roi:
+            pipeline.roi.publish(metrics)
+        if pipeline.scheduler:
+            pipeline.scheduler.publish(metrics)
+        if pipeline.idle:
+            pipeline.idle.publish(metrics)
+        if pipeline.motion:
+            pipeline.motion.publish(metrics)
+        output.dispatcher.publish(metrics)
+        cursor_engine.publish(metrics)
+
+        if self.switch_started is not None:
+            # Switch time = command received -> first frame processed by the new mode
+            elapsed = time.perf_counter() - self.switch_started
+            metrics.observe("mode_switch", elapsed)
+            self.report({"event": "mode", "mode": self.active, "switch_ms": round(elapsed * 1000, 1)})
+            self.switch_started = None
+
+        if self.view and self.view.exit_requested.is_set():
+            self.view.exit_requested.clear()
+            self.switch(None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Resident runtime that hot-swaps between modes")
+    cams = parser.add_mutually_exclusive_group()  # one of them unless --subscribe
+    cams.add_argument("--cam", type=camera_source, help="Camera index passed from launcher, or a video file")
+    fusion.add_arguments(cams)
+    parser.add_argument("--mode", choices=sorted(MODES), help="Mode to start in (default: idle)")
+    stage_metrics.add_arguments(parser)
+    roi.add_arguments(parser)
+    load_scheduler.add_arguments(parser)
+    idle_monitor.add_arguments(parser)
+    parser.add_argument("--mirror-landmarks", action="store_true",
+                        help="Run the model on the unmirrored frame and mirror the landmarks instead")
+    preview.add_arguments(parser)
+    parser.add_argument("--subscribe", action="store_true",
+                        help="Take landmarks from a running perception_service.py instead of the camera")
+    landmark_bus.add_arguments(parser)
+    parser.add_argument("--gestures-dir", metavar="DIR",
+                        help="Folder with gestures.json / presentation_gestures.json / game_gestures.json "
+                             "to use instead of the modes' own")
+    args = parser.parse_args()
+    if args.cams and args.subscribe:
+        parser.error("--cams starts its own perception services; drop --subscribe")
+    if args.cam is None and not args.cams and not args.subscribe:
+        parser.error("one of --cam, --cams or --subscribe is required")
+    metrics = stage_metrics.from_args(args)
+
+    start = time.perf_counter()
+    source = None
+    if args.subscribe:
+        source = landmark_bus.LandmarkSubscriber("runtime", args.bus_port)
+    elif args.cams:
+        worker_args = ["--mirror-landmarks"] if args.mirror_landmarks else []
+        if args.capture:
+            worker_args += ["--capture", "x".join(map(str, args.capture))]
+        source = fusion.start(args.cams, args.bus_port, worker_args)
+    view = preview.from_args(args, WINDOW_NAME, metrics, EXIT_KEYS)
+    runtime = ResidentRuntime(args.cam, metrics, args.capture, load_scheduler.from_args(args),
+                              not args.no_idle, args.mirror_landmarks, view, source, args.gestures_dir)
+    preview.on_shutdown_signal(lambda: runtime.commands.put("quit"))
+    if args.subscribe:
+        cameras = f"landmark bus on 127.0.0.1:{args.bus_port}"
+    elif args.cams:
+        cameras = f"cameras {', '.join(map(str, args.cams))}"
+    else:
+        cameras = f"camera {args.cam}"
+    print(f"Runtime ready in {time.perf_counter() - start:.2f}s ({cameras})", flush=True)
+    runtime.report({"event": "ready"})
+    if args.mode:
+        runtime.switch(args.mode)
+
+    runtime.run()
+    if args.metrics_dump:
+        metrics.dump(args.metrics_dump)
+    print("Runtime stopped.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+# test_gamekeys.py - KeyState over the in-memory backend: transitions only, one batch per frame
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "game_mode"))
+from gamedirectkeys import W, A, S, D, SPACE
+from gamekeys import KeyState, RecordingBackend
+
+
+class KeyStateTest(unittest.TestCase):
+    def setUp(self):
+        self.backend = RecordingBackend()
+        self.keys = KeyState(self.backend)
+
+    def frame(self, *held):
+        """One frame holding these keys; the batches it sent."""
+        sent = len(self.backend.batches)
+        self.keys.begin()
+        for code in held:
+            self.keys.hold(code)
+        self.keys.flush()
+        return self.backend.batches[sent:]
+
+    def test_only_transitions_are_sent(self):
+        self.assertEqual(self.frame(W), [[(W, True)]])
+        self.assertEqual(self.frame(W), [])
+        self.assertEqual(self.frame(W, A), [[(A, True)]])
+        self.assertEqual(self.frame(W, A), [])
+        self.assertEqual(self.frame(A), [[(W, False)]])
+        self.assertEqual(self.backend.presses, {W: 1, A: 1})
+
+    def test_one_batch_per_frame_releases_first(self):
+        self.frame(W, A)
+        self.assertEqual(self.frame(S, D), [[(W, False), (A, False), (S, True), (D, True)]])
+        self.assertEqual(self.keys.flushes, 2)
+        self.assertEqual(self.keys.transitions, 6)
+
+    def test_hold_twice_in_a_frame_is_one_press(self):
+        self.assertEqual(self.frame(SPACE, SPACE), [[(SPACE, True)]])
+
+    def test_close_releases_everything_held(self):
+        self.frame(W, D, SPACE)
+        self.keys.close()
+        self.assertEqual(self.backend.batches[-1], [(W, False), (D, False), (SPACE, False)])
+        self.assertEqual(self.keys.down, set())
+
+    def test_close_with_nothing_held_sends_nothing(self):
+        self.frame(W)
+        self.frame()
+        sent = len(self.backend.batches)
+        self.keys.close()
+        self.assertEqual(len(self.backend.batches), sent)
+
+
+if __name__ == "__main__":
+    unittest.main()